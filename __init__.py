@@ -1,13 +1,43 @@
-from binaryninja import *
-from .pdparch import PDP11, BSD2
-from .pdpview import PDP11View
+# The decoder modules (pdpopcodes, pdpdisasm) don't need binja, so only register the plugin
+# when we're actually running inside it
+try:
+    import binaryninja
+except ImportError:
+    binaryninja = None
 
-# Arch
-PDP11.register()
+if binaryninja is not None:
+    from binaryninja import *
+    from .pdparch import PDP11, BSD2
+    from .pdpview import PDP11View, PDP11ImageView
+    from .pdpopcodes import CPU_MODELS, DEFAULT_CPU_MODEL
+    import json
 
-# Platform
-bsd2 = BSD2(Architecture['pdp11'])
-bsd2.register('2.11bsd')
+    # Settings
+    settings = Settings()
+    settings.register_group('pdp11', 'PDP-11')
+    settings.register_setting('pdp11.cpuModel', json.dumps({
+        'title': 'CPU model',
+        'description': 'Which instruction set to decode. Instructions the model lacks show as unknown, '
+                       'the selection applies to every open PDP-11 view',
+        'type': 'string',
+        'enum': list(CPU_MODELS),
+        'default': DEFAULT_CPU_MODEL,
+    }))
+    settings.register_setting('pdp11.matchImageNames', json.dumps({
+        'title': 'Open images by file name',
+        'description': 'Open files named core or ending in .core, .dmp, .dsk, .img, .rk05 or .rl02 as '
+                       'PDP-11 images. When off, images only open through Open with Options',
+        'type': 'boolean',
+        'default': False,
+    }))
 
-# View
-PDP11View.register()
\ No newline at end of file
+    # Arch
+    PDP11.register()
+
+    # Platform
+    bsd2 = BSD2(Architecture['pdp11'])
+    bsd2.register('2.11bsd')
+
+    # View
+    PDP11View.register()
+    PDP11ImageView.register()
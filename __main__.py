@@ -0,0 +1,105 @@
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+import sys
+
+from .pdplisting import file_listing
+from .pdpopcodes import CPU_MODELS, DEFAULT_CPU_MODEL, set_cpu_model
+from .pdpsigs import SignatureIndex, default_index_path, index_binaries, lookup_file
+
+def listing_or_error(path):
+    try:
+        return file_listing(path), None
+    except (OSError, ValueError) as e:
+        return None, '%s: %s' % (path, e)
+
+def write_listings(out, results):
+    # results come back in argument order, so the output is the same for any --jobs
+    status = 0
+    for listing, error in results:
+        if error is not None:
+            print(error, file=sys.stderr)
+            status = 1
+            continue
+        out.write(listing)
+        out.write('\n')
+    return status
+
+def add_model_argument(parser):
+    parser.add_argument('-m', '--model', choices=list(CPU_MODELS), default=DEFAULT_CPU_MODEL,
+                        help='CPU model whose instruction set to decode (default: %s)' % DEFAULT_CPU_MODEL)
+
+def index_main(argv):
+    parser = ArgumentParser(prog='python -m pdp11 index', description='Add the named functions in unstripped a.out files to a signature index')
+    parser.add_argument('paths', nargs='+', help='a.out files, or directories to search for them')
+    parser.add_argument('--db', help='signature index (default: %s)' % default_index_path())
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='number of worker processes (default: one per CPU)')
+    add_model_argument(parser)
+    args = parser.parse_args(argv)
+    set_cpu_model(args.model)
+
+    errors = []
+    def progress(path, error):
+        if error is not None:
+            errors.append('%s: %s' % (path, error))
+
+    with SignatureIndex(args.db) as index:
+        added = index_binaries(index, args.paths, args.jobs, progress)
+        stats = index.stats()
+    for error in errors:
+        print(error, file=sys.stderr)
+    print('added %d binaries, index has %d binaries and %d signatures' % (added, stats['binaries'], stats['signatures']))
+    return 1 if errors else 0
+
+def lookup_main(argv):
+    parser = ArgumentParser(prog='python -m pdp11 lookup', description='Name the functions of stripped a.out files from a signature index')
+    parser.add_argument('files', nargs='+', help='a.out files to name functions in')
+    parser.add_argument('--db', help='signature index (default: %s)' % default_index_path())
+    add_model_argument(parser)
+    args = parser.parse_args(argv)
+    set_cpu_model(args.model)
+
+    status = 0
+    with SignatureIndex(args.db) as index:
+        for path in args.files:
+            try:
+                names = lookup_file(index, path)
+            except (OSError, ValueError) as e:
+                print('%s: %s' % (path, e), file=sys.stderr)
+                status = 1
+                continue
+            print('; %s' % path)
+            for addr, name in sorted(names.items()):
+                print('%06o: %s' % (addr, name))
+    return status
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    # Signature indexing has its own commands, anything else is a listing
+    commands = {'index': index_main, 'lookup': lookup_main}
+    if argv and argv[0] in commands:
+        return commands[argv[0]](argv[1:])
+
+    parser = ArgumentParser(prog='python -m pdp11', description='Disassemble 2.11BSD PDP-11 a.out files',
+                            epilog='see also: python -m pdp11 index|lookup --help')
+    parser.add_argument('files', nargs='+', help='a.out files to disassemble')
+    parser.add_argument('-o', '--output', help='write the listing to this file instead of stdout')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes (default: 1)')
+    add_model_argument(parser)
+    args = parser.parse_args(argv)
+    set_cpu_model(args.model)
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        if args.jobs > 1 and len(args.files) > 1:
+            with ProcessPoolExecutor(max_workers=args.jobs, initializer=set_cpu_model, initargs=(args.model,)) as pool:
+                status = write_listings(out, pool.map(listing_or_error, args.files))
+        else:
+            status = write_listings(out, map(listing_or_error, args.files))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+from struct import pack
+import os
+
+from plugin import load_plugin
+
+load_plugin()
+from pdp11.pdpaout import A_MAGIC1, N_TEXT, N_DATA, N_EXT
+from pdp11.pdpopcodes import pdp11_op_table
+
+# Filler for immediate words, picked so PC-relative targets land inside a small text segment
+IMMEDIATES = (0o000010, 0o000020)
+
+def all_instructions():
+    # Every instruction word the decoder recognises, which covers every opcode with every
+    # addressing mode and register, with immediates appended where the encoding takes them.
+    # Three words are always returned, the decoder only reads what it needs
+    tail = pack('<HH', *IMMEDIATES)
+    return [pack('<H', word) + tail for word in range(0x10000) if pdp11_op_table[word] is not None]
+
+def text_segment(instructions):
+    # Lays the instructions out back to back, each followed by exactly the immediates it uses
+    from pdp11.pdpdisasm import pdp11_decode
+    text = bytearray()
+    for data in instructions:
+        instr = pdp11_decode(data, len(text))
+        text += data[:instr.length]
+    return bytes(text)
+
+def build_aout(text, data=b'', syms=(), entry=0):
+    # Minimal 0407 image without relocation info, syms is (name, n_type, n_value)
+    strtab = bytearray()
+    symtab = bytearray()
+    for name, n_type, n_value in syms:
+        symtab += pack('<HHBBH', 0, 4 + len(strtab), n_type, 0, n_value)
+        strtab += name.encode() + b'\x00'
+    strsiz = len(strtab) + 4
+    header = pack('<8H', A_MAGIC1, len(text), len(data), 0, len(symtab), entry, 0, 1)
+    return header + text + data + bytes(symtab) + pack('<HH', strsiz >> 16, strsiz & 0xffff) + bytes(strtab)
+
+def synthetic_aout(text, nsyms):
+    # Image with nsyms symbols spread over text and data, roughly the mix of a big kernel. Text
+    # is cut down so everything still fits in the 16-bit address space. a_syms is 16 bits too,
+    # which caps nsyms at 8191
+    data = bytes(nsyms * 2)
+    text = text[:max(0, 0xfffe - len(data)) & ~1]
+    syms = []
+    for i in range(nsyms):
+        if i % 2 == 0:
+            syms.append(('_f%d' % i, N_TEXT | N_EXT, (i * 2) % max(len(text), 2)))
+        else:
+            syms.append(('_v%d' % i, N_DATA | N_EXT, len(text) + i * 2))
+    return build_aout(text, data, syms)
+
+def emulator_loop(iterations):
+    # Checksum loop over a buffer in data, exits with the sum. Per iteration: a load with
+    # autoincrement, an add, a rotate, a compare, a conditional branch and SOB, plus a pointer
+    # reset at the last word of the buffer
+    text = pack('<19H',
+        0o012701, iterations,   # mov #iterations, r1
+        0o012702, 0,            # mov #data, r2 (patched below)
+        0o005000,               # clr r0
+        0o012203,               # loop: mov (r2)+, r3
+        0o060300,               # add r3, r0
+        0o006100,               # rol r0
+        0o020327, 0o177776,     # cmp r3, #177776
+        0o001002,               # bne 1f
+        0o012702, 0,            # mov #data, r2 (patched below)
+        0o077111,               # 1: sob r1, loop
+        0o010046,               # mov r0, -(sp)
+        0o005746,               # tst -(sp)
+        0o104401,               # sys exit
+        0o000000, 0o000000)
+    data = bytes(range(256))
+    text = bytearray(text)
+    data_addr = len(text)
+    text[6:8] = pack('<H', data_addr)
+    text[24:26] = pack('<H', data_addr)
+    return build_aout(bytes(text), data)
+
+def sample_files(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if not name.startswith('.'))
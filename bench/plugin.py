@@ -0,0 +1,21 @@
+import importlib
+import importlib.util
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PLUGIN_DIR = os.path.dirname(BENCH_DIR)
+
+def load_plugin(stub=True):
+    # Imports the plugin as the 'pdp11' package whatever its directory is called. With stub the
+    # stand-in binaryninja module is put first on the path, so this works without a license
+    if 'pdp11' in sys.modules:
+        return sys.modules['pdp11']
+    if stub:
+        sys.path.insert(0, os.path.join(BENCH_DIR, 'stubs'))
+    spec = importlib.util.spec_from_file_location('pdp11', os.path.join(PLUGIN_DIR, '__init__.py'),
+                                                  submodule_search_locations=[PLUGIN_DIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['pdp11'] = module
+    spec.loader.exec_module(module)
+    return module
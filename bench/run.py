@@ -0,0 +1,152 @@
+# Decoder and loader benchmarks. Runs headless against the binaryninja stub and writes JSON:
+#
+#   python bench/run.py [-o results.json] [--repeat N] [--samples DIR] [--symbols N]
+#
+# The corpus is every instruction word the decoder knows, plus a synthetic a.out image. Real a.out
+# files dropped into bench/samples (or --samples) are timed through PDP11View.init as well
+from argparse import ArgumentParser
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from plugin import BENCH_DIR, load_plugin
+
+load_plugin()
+import binaryninja
+from corpus import all_instructions, text_segment, synthetic_aout, emulator_loop, sample_files
+from pdp11.pdparch import PDP11
+from pdp11.pdpemu import Emulator
+from pdp11.pdpdisasm import pdp11_decode, pdp11_disasm_iter, pdp11_cache
+from pdp11.pdprender import pdp11_disasm
+from pdp11.pdpview import PDP11View
+
+def measure(fn, ops, repeat):
+    # Best of repeat runs for time, peak traced memory from a separate run so tracing doesn't
+    # skew the timing
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'ops': ops,
+        'seconds': best,
+        'ops_per_sec': ops / best if best else None,
+        'peak_bytes': peak,
+    }
+
+def bench_decode(instructions):
+    def run():
+        for data in instructions:
+            pdp11_decode(data, 0o1000)
+    return run
+
+def bench_disasm(instructions):
+    def run():
+        # Cold cache, so this is decode + render
+        pdp11_cache.clear()
+        for data in instructions:
+            pdp11_disasm(data, 0o1000)
+    return run
+
+def bench_instruction_info(instructions):
+    arch = PDP11()
+    def run():
+        pdp11_cache.clear()
+        for data in instructions:
+            arch.get_instruction_info(data, 0o1000)
+    return run
+
+def bench_disasm_iter(text):
+    def run():
+        for _ in pdp11_disasm_iter(text):
+            pass
+    return run
+
+def bench_view_init(image):
+    def run():
+        view = PDP11View(binaryninja.BufferView(image))
+        view.init()
+    return run
+
+def bench_view_init_cached(image, cache_dir):
+    class CachedView(PDP11View):
+        analysis_cache = True
+    CachedView.cache_dir = cache_dir
+    def run():
+        view = CachedView(binaryninja.BufferView(image))
+        view.init()
+    # Populate the cache, so every timed run replays from it
+    run()
+    return run
+
+def bench_emulate(image):
+    def run():
+        emu = Emulator.from_aout(image)
+        emu.run()
+        return emu.instructions
+    return run
+
+def main(argv=None):
+    parser = ArgumentParser(description='PDP-11 decoder and loader benchmarks')
+    parser.add_argument('-o', '--output', help='write JSON results here instead of stdout')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per benchmark, the best is reported (default: 3)')
+    parser.add_argument('--samples', default=os.path.join(BENCH_DIR, 'samples'), help='directory of a.out files to time')
+    parser.add_argument('--symbols', type=int, default=8000, help='symbols in the synthetic a.out, at most 8191 (default: 8000)')
+    args = parser.parse_args(argv)
+    if not 0 < args.symbols <= 8191:
+        parser.error('--symbols must be between 1 and 8191')
+
+    instructions = all_instructions()
+    text = text_segment(instructions)
+    ninstrs = len(instructions)
+    image = synthetic_aout(text, args.symbols)
+    # Timings are of a first open, the cache gets its own benchmark in a scratch directory
+    PDP11View.analysis_cache = False
+    # and of the whole load, which otherwise carries on in a background task after init returns
+    PDP11View.background_load = False
+    cache_dir = tempfile.mkdtemp(prefix='pdp11-bench-')
+
+    results = {
+        'pdp11_decode': measure(bench_decode(instructions), ninstrs, args.repeat),
+        'pdp11_disasm': measure(bench_disasm(instructions), ninstrs, args.repeat),
+        'get_instruction_info': measure(bench_instruction_info(instructions), ninstrs, args.repeat),
+        'pdp11_disasm_iter': measure(bench_disasm_iter(text), ninstrs, args.repeat),
+        'view_init_synthetic': measure(bench_view_init(image), args.symbols, args.repeat),
+        'view_init_synthetic_cached': measure(bench_view_init_cached(image, cache_dir), args.symbols, args.repeat),
+    }
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    emulate = bench_emulate(emulator_loop(50000))
+    results['emulate'] = measure(emulate, emulate(), args.repeat)
+    for path in sample_files(args.samples):
+        with open(path, 'rb') as f:
+            sample = f.read()
+        results['view_init:%s' % os.path.basename(path)] = measure(bench_view_init(sample), 1, args.repeat)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'corpus': {'instructions': ninstrs, 'text_bytes': len(text), 'symbols': args.symbols},
+        'results': results,
+    }
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(out + '\n')
+    else:
+        print(out)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# Just enough of the binaryninja API for the plugin to import and for the benchmarked paths to run
+# headless. Nothing here does any analysis
+
+class _EnumMember(str):
+    def __or__(self, other):
+        return _EnumMember('%s|%s' % (self, other))
+
+class _Enum(type):
+    def __getattr__(cls, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _EnumMember(name)
+
+class InstructionTextTokenType(metaclass=_Enum): pass
+class BranchType(metaclass=_Enum): pass
+class FlagRole(metaclass=_Enum): pass
+class LowLevelILFlagCondition(metaclass=_Enum): pass
+class SegmentFlag(metaclass=_Enum): pass
+class SectionSemantics(metaclass=_Enum): pass
+class SymbolType(metaclass=_Enum): pass
+
+class InstructionTextToken:
+    def __init__(self, type, text, value=0, size=0):
+        self.type = type
+        self.text = text
+        self.value = value
+        self.size = size
+
+class InstructionInfo:
+    def __init__(self):
+        self.length = 0
+        self.branches = []
+
+    def add_branch(self, branch_type, target=None):
+        self.branches.append((branch_type, target))
+
+class RegisterInfo:
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+class Symbol:
+    def __init__(self, type, address, name):
+        self.type = type
+        self.address = address
+        self.name = name
+
+class Function:
+    def __init__(self, start):
+        self.start = start
+
+class LowLevelILLabel:
+    pass
+
+class _Registry(type):
+    registered = {}
+
+    def __getitem__(cls, name):
+        return _Registry.registered[name]
+
+class Architecture(metaclass=_Registry):
+    def __init__(self):
+        pass
+
+    @classmethod
+    def register(cls):
+        _Registry.registered[cls.name] = cls()
+
+class Platform(metaclass=_Registry):
+    def __init__(self, arch=None):
+        self.arch = arch
+
+    def register(self, os):
+        _Registry.registered[self.name] = self
+
+class BinaryView:
+    def __init__(self, parent_view=None, file_metadata=None):
+        self.parent_view = parent_view
+        self.file = file_metadata
+        self.segments = []
+        self.sections = []
+        self.functions = []
+        self.symbols = []
+        self.data_vars = []
+        self.notifications = []
+
+    @classmethod
+    def register(cls):
+        pass
+
+    def add_auto_segment(self, start, length, data_offset, data_length, flags):
+        self.segments.append((start, length, data_offset, data_length, flags))
+
+    def add_auto_section(self, name, start, length, semantics=None):
+        self.sections.append((name, start, length, semantics))
+
+    def add_function(self, addr, plat=None):
+        self.functions.append(Function(addr))
+
+    def get_function_at(self, addr, plat=None):
+        return None
+
+    def define_auto_symbol(self, sym):
+        self.symbols.append(sym)
+
+    def define_data_var(self, addr, var_type, name=None):
+        self.data_vars.append((addr, var_type, name))
+
+    def set_analysis_hold(self, enable):
+        pass
+
+    def begin_bulk_modify_symbols(self):
+        pass
+
+    def end_bulk_modify_symbols(self):
+        pass
+
+    def update_analysis(self):
+        pass
+
+    def add_analysis_completion_event(self, callback):
+        return callback
+
+    def register_notification(self, notify):
+        self.notifications.append(notify)
+
+class BinaryDataNotification:
+    def __init__(self):
+        pass
+
+class BufferView:
+    # Stands in for the raw parent view a BinaryView gets handed
+    def __init__(self, data, filename=None):
+        self.buffer = data
+        self.file = FileMetadata(filename)
+
+    def read(self, addr, length):
+        return self.buffer[addr:addr + length]
+
+    def __len__(self):
+        return len(self.buffer)
+
+class Settings:
+    # Registered settings keep their default, there's no way to change them headless
+    values = {}
+
+    def register_group(self, group, title):
+        return True
+
+    def register_setting(self, key, properties):
+        import json
+        Settings.values[key] = json.loads(properties).get('default')
+        return True
+
+    def get_string(self, key, resource=None):
+        return Settings.values.get(key, '')
+
+    def get_bool(self, key, resource=None):
+        return bool(Settings.values.get(key, False))
+
+class FileMetadata:
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.original_filename = filename
+        self.offset = 0
+
+class BackgroundTaskThread:
+    # Runs the task inline when started
+    def __init__(self, initial_progress_text='', can_cancel=False):
+        self.progress = initial_progress_text
+        self.can_cancel = can_cancel
+        self.cancelled = False
+        self.finished = False
+
+    def start(self):
+        self.run()
+        self.finish()
+
+    def run(self):
+        pass
+
+    def join(self):
+        pass
+
+    def cancel(self):
+        self.cancelled = True
+
+    def finish(self):
+        self.finished = True
+
+def log_info(msg):
+    pass
+
+def log_warn(msg):
+    pass
+
+def log_error(msg):
+    pass
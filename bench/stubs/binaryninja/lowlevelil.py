@@ -0,0 +1,2 @@
+def LLIL_TEMP(n):
+    return 0x80000000 | n
@@ -0,0 +1,215 @@
+from array import array
+from collections import namedtuple
+from struct import unpack_from, iter_unpack
+import sys
+
+# See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/sys/h/exec.h#L39-L44
+A_MAGIC1 = 0o407 # normal
+A_MAGIC2 = 0o410 # read-only text
+A_MAGIC3 = 0o411 # separated I&D
+A_MAGIC4 = 0o405 # overlay
+A_MAGIC5 = 0o430 # auto-overlay (nonseparate)
+A_MAGIC6 = 0o431 # auto-overlay (separate)
+A_MAGICS = (A_MAGIC1, A_MAGIC2, A_MAGIC3, A_MAGIC4, A_MAGIC5, A_MAGIC6)
+
+# See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/sys/h/exec.h#L26-L32
+NOVL = 15
+
+# Segments start on 8KB page boundaries (one PAR each)
+PAGE_SIZE = 0o20000
+
+# The view has a single address space, so D space and each overlay get a synthetic 64KB bank of
+# their own above the 16-bit I space. Addresses within a bank are the real 16-bit ones
+D_SPACE_BASE = 0x10000
+
+def overlay_base(ovly):
+    return (ovly + 1) << 16
+
+def page_round(size):
+    return (size + PAGE_SIZE - 1) & ~(PAGE_SIZE - 1)
+
+# See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/include/nlist.h#L66-L78
+N_UNDF = 0x0
+N_ABS = 0x1
+N_TEXT = 0x2
+N_DATA = 0x3
+N_BSS = 0x4
+N_TYPE = 0x1f
+N_EXT = 0x20
+
+# name: section name, vaddr: address in the view, file_offset/file_size: where its contents are
+# in the file (file_size 0 for bss), ovly: overlay number, 0 outside overlays
+Segment = namedtuple('Segment', ['name', 'kind', 'vaddr', 'size', 'file_offset', 'file_size', 'ovly'])
+
+class AOutHeader:
+    # See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/sys/h/exec.h#L14C1-L23C3
+    size = 0x10
+    # struct ovlhdr follows the exec header in auto-overlay files
+    ovlhdr_size = 2 + 2 * NOVL
+    max_size = size + ovlhdr_size
+
+    def __init__(self, data):
+        if len(data) < self.size:
+            raise ValueError('truncated a.out header')
+        (self.a_magic, self.a_text, self.a_data, self.a_bss,
+         self.a_syms, self.a_entry, self.a_unused, self.a_flag) = unpack_from('<8H', data, 0)
+        if self.a_magic not in A_MAGICS:
+            raise ValueError('unsupported a.out magic %o' % self.a_magic)
+        self.max_ovl = 0
+        self.ov_siz = (0,) * NOVL
+        if self.is_overlaid():
+            if len(data) < self.max_size:
+                raise ValueError('truncated a.out overlay header')
+            self.max_ovl, *ov_siz = unpack_from('<%dH' % (1 + NOVL), data, self.size)
+            self.ov_siz = tuple(ov_siz)
+
+    def is_overlaid(self):
+        return self.a_magic in (A_MAGIC5, A_MAGIC6)
+
+    def is_split(self):
+        return self.a_magic in (A_MAGIC3, A_MAGIC6)
+
+    def txtoff(self):
+        # See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/include/a.out.h#L46-L48
+        if self.is_overlaid():
+            return self.max_size # sizeof(exec) + sizeof(ovlhdr)
+        return self.size # sizeof(exec)
+
+    def ovloff(self, ovly):
+        # Overlays are stored in order right after the base text
+        return self.txtoff() + self.a_text + sum(self.ov_siz[:ovly - 1])
+
+    def dataoff(self):
+        return self.txtoff() + self.a_text + sum(self.ov_siz)
+
+    def symoff(self):
+        # See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/lib/libc/pdp/gen/nsym.c#L79
+        l = self.txtoff()
+        sum = self.a_text + self.a_data + self.ovlsum()
+        l += sum
+        if (self.a_flag & 1) == 0:
+            l += sum
+        return l
+
+    def ovlsum(self):
+        return sum(self.ov_siz)
+
+    def ovl_vaddr(self):
+        # Overlays are all linked at the first page after the base text
+        return page_round(self.a_text)
+
+    def data_vaddr(self):
+        # See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/sys/sys/kern_exec.c (getxfile)
+        if self.is_split():
+            return D_SPACE_BASE
+        if self.a_magic == A_MAGIC2:
+            return page_round(self.a_text)
+        if self.a_magic == A_MAGIC5:
+            return page_round(self.ovl_vaddr() + self.max_ovl)
+        return self.a_text
+
+    def segments(self):
+        segments = [Segment('.text', 'text', 0, self.a_text, self.txtoff(), self.a_text, 0)]
+        for ovly, size in enumerate(self.ov_siz, 1):
+            if size:
+                vaddr = overlay_base(ovly) + self.ovl_vaddr()
+                segments.append(Segment('.ovly%d' % ovly, 'text', vaddr, size, self.ovloff(ovly), size, ovly))
+        data_vaddr = self.data_vaddr()
+        segments.append(Segment('.data', 'data', data_vaddr, self.a_data, self.dataoff(), self.a_data, 0))
+        if self.a_bss:
+            segments.append(Segment('.bss', 'bss', data_vaddr + self.a_data, self.a_bss, 0, 0, 0))
+        return segments
+
+    def symbol_address(self, n_type, n_ovly, n_value):
+        # Where a symbol's n_value ends up in the view's address space
+        n_type &= N_TYPE
+        if n_type == N_TEXT and n_ovly:
+            return overlay_base(n_ovly) + n_value
+        if n_type in (N_DATA, N_BSS) and self.is_split():
+            return D_SPACE_BASE + n_value
+        return n_value
+
+    def stroff(self):
+        return self.symoff() + self.a_syms
+
+class AddressMap:
+    # Where the 16-bit address an instruction computes lands in the view. Code targets in the
+    # overlay range stay in the bank of the overlay doing the referencing, everything below it
+    # is base text. Data references go to D space in split binaries. The default is a flat map
+    # for images, where every address is already the real one
+    def __init__(self, header=None):
+        self.split = header is not None and header.is_split()
+        self.ovl_start = self.ovl_end = 0
+        if header is not None and header.is_overlaid():
+            self.ovl_start = header.ovl_vaddr()
+            self.ovl_end = self.ovl_start + header.max_ovl
+
+    def code(self, addr, target):
+        target &= 0xffff
+        bank = addr & ~0xffff
+        if bank >= overlay_base(1) and self.ovl_start <= target < self.ovl_end:
+            return bank | target
+        return target
+
+    def data(self, addr, target):
+        if self.split:
+            return D_SPACE_BASE + (target & 0xffff)
+        return self.code(addr, target)
+
+def read_cstr(strtab, offset):
+    end = strtab.find(b'\x00', offset)
+    if end < 0:
+        end = len(strtab)
+    return strtab[offset:end].decode(errors='replace')
+
+class SymbolTable:
+    # nlist entries stored column-wise: n_value/n_type/n_ovly in arrays and names as indices into
+    # a table of interned strings, so symbols sharing a string table entry share one str.
+    # Indexing and iterating give (n_name, n_type, n_ovly, n_value) tuples
+    def __init__(self, symtab, strtab):
+        symtab = bytes(symtab)
+        symtab = symtab[:len(symtab) & ~7]
+        strtab = bytes(strtab)
+        self.values = array('H')
+        self.types = array('B')
+        self.ovlys = array('B')
+        self.name_ids = array('I')
+        self.names = []
+        strx_ids = {}
+        for _, n_strx, n_type, n_ovly, n_value in iter_unpack('<HHBBH', symtab):
+            name_id = strx_ids.get(n_strx)
+            if name_id is None:
+                name_id = strx_ids[n_strx] = len(self.names)
+                self.names.append(sys.intern(read_cstr(strtab, n_strx)))
+            self.values.append(n_value)
+            self.types.append(n_type)
+            self.ovlys.append(n_ovly)
+            self.name_ids.append(name_id)
+
+    @classmethod
+    def from_columns(cls, values, types, ovlys, name_ids, names):
+        # Rebuilds a table from its columns, as stored by the analysis cache
+        table = cls.__new__(cls)
+        table.values = values
+        table.types = types
+        table.ovlys = ovlys
+        table.name_ids = name_ids
+        table.names = names
+        return table
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, i):
+        return (self.names[self.name_ids[i]], self.types[i], self.ovlys[i], self.values[i])
+
+    def __iter__(self):
+        names = self.names
+        return zip((names[i] for i in self.name_ids), self.types, self.ovlys, self.values)
+
+    def name(self, i):
+        return self.names[self.name_ids[i]]
+
+def read_symbols(data, header):
+    symoff = header.symoff()
+    return SymbolTable(data[symoff:symoff + header.a_syms], data[header.stroff():])
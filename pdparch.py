@@ -1,5 +1,8 @@
 from binaryninja import *
-from .pdpdisasm import *
+from .pdprender import *
+from .pdplift import *
+from .pdpmetrics import metrics
+from time import perf_counter
 
 class BSD2(Platform):
     name = '2.11bsd'
@@ -21,63 +24,82 @@ class PDP11(Architecture):
         'r5': RegisterInfo('r5', 2),
         
         'sp': RegisterInfo('sp', 2),
+        'pc': RegisterInfo('pc', 2),
     }
     
     stack_pointer = 'sp'
+
+    flags = ['n', 'z', 'v', 'c']
+    flag_roles = {
+        'n': FlagRole.NegativeSignFlagRole,
+        'z': FlagRole.ZeroFlagRole,
+        'v': FlagRole.OverflowFlagRole,
+        'c': FlagRole.CarryFlagRole,
+    }
+    flag_write_types = ['*', 'nzv', 'nzv*', 'zv']
+    flags_written_by_flag_write_type = {
+        '*': ['n', 'z', 'v', 'c'],
+        'nzv': ['n', 'z', 'v'],
+        'nzv*': ['n', 'z', 'v'],
+        'zv': ['z', 'v'],
+    }
+    flags_required_for_flag_condition = {
+        LowLevelILFlagCondition.LLFC_E: ['z'],
+        LowLevelILFlagCondition.LLFC_NE: ['z'],
+        LowLevelILFlagCondition.LLFC_SGE: ['n', 'v'],
+        LowLevelILFlagCondition.LLFC_SLT: ['n', 'v'],
+        LowLevelILFlagCondition.LLFC_SGT: ['n', 'v', 'z'],
+        LowLevelILFlagCondition.LLFC_SLE: ['n', 'v', 'z'],
+        LowLevelILFlagCondition.LLFC_POS: ['n'],
+        LowLevelILFlagCondition.LLFC_NEG: ['n'],
+        LowLevelILFlagCondition.LLFC_UGT: ['c', 'z'],
+        LowLevelILFlagCondition.LLFC_ULE: ['c', 'z'],
+        LowLevelILFlagCondition.LLFC_NO: ['v'],
+        LowLevelILFlagCondition.LLFC_O: ['v'],
+        LowLevelILFlagCondition.LLFC_UGE: ['c'],
+        LowLevelILFlagCondition.LLFC_ULT: ['c'],
+    }
     
     def __init__(self):
         Architecture.__init__(self)
     
     def get_instruction_info(self, data, addr):
-        op = pdp11_decode(data, addr)
-        if op == None:
+        if metrics.enabled:
+            metrics.count('instruction_info')
+        instr, branches = pdp11_cache.decode(data, addr)
+        if instr == None:
             return None
-        
-        mnem, args = op
 
         info = InstructionInfo()
-        info.length = 2
-        for arg in args:
-            if arg.has_imm():
-                info.length += 2
-        if addr == 0:
-            print('0',info.length)
+        info.length = instr.length
 
-        if mnem in ['RTS', 'MARK', 'HALT']:
-            info.add_branch(BranchType.FunctionReturn)
-        elif mnem in ['JSR']:
-            target = args[1].get_value(addr, info.length)
-            if target is None:
-                info.add_branch(BranchType.IndirectBranch)
-            else:
-                info.add_branch(BranchType.CallDestination, target)
-        elif mnem in ['JMP']:
-            target = args[0].get_value(addr, info.length)
+        for branch_type, target in branches:
             if target is None:
-                info.add_branch(BranchType.IndirectBranch)
+                info.add_branch(getattr(BranchType, branch_type))
             else:
-                info.add_branch(BranchType.UnconditionalBranch, target)
-        elif mnem in ['BR']:
-            target = args[0].value
-            info.add_branch(BranchType.UnconditionalBranch, addr + info.length + target*2)
-        elif mnem in ['BNE', 'BEQ', 'BGE', 'BLT', 'BGT', 'BLE', 'BPL', 'BMI', 'BHI', 'BLOS', 'BVC', 'BVS', 'BCC', 'BCS']:
-            target = args[0].value
-            info.add_branch(BranchType.TrueBranch, addr + info.length + target*2)
-            info.add_branch(BranchType.FalseBranch, addr + info.length)
-        elif mnem in ['SOB']:
-            target = args[1].value
-            info.add_branch(BranchType.TrueBranch, addr + info.length - target*2)
-            info.add_branch(BranchType.FalseBranch, addr + info.length)
-        elif mnem in ['MOV'] and args[1].reg_idx == 7:
-            info.add_branch(BranchType.FunctionReturn)
+                info.add_branch(getattr(BranchType, branch_type), target)
 
         return info
     
     def get_instruction_text(self, data, addr):
+        if metrics.enabled:
+            metrics.count('instruction_text')
         disasm = pdp11_disasm(data, addr)
         if disasm == None:
             return None
         return disasm
     
+    def get_flag_write_low_level_il(self, op, size, write_type, flag, operands, il):
+        # Everything using these classes clears V rather than computing it. 'nzv*' (INC, DEC)
+        # falls through to the default, which computes V from the add or sub
+        if flag == 'v' and write_type in ['nzv', 'zv']:
+            return il.const(0, 0)
+        return Architecture.get_flag_write_low_level_il(self, op, size, write_type, flag, operands, il)
+
     def get_instruction_low_level_il(self, data, addr, il):
-        return None
\ No newline at end of file
+        if not metrics.enabled:
+            return pdp11_lift(self, data, addr, il)
+        start = perf_counter()
+        length = pdp11_lift(self, data, addr, il)
+        metrics.add_time('lift', perf_counter() - start)
+        return length
\ No newline at end of file
@@ -0,0 +1,150 @@
+from array import array
+from collections import namedtuple
+from struct import pack, unpack_from, error as StructError
+import hashlib
+import os
+import re
+import sys
+import zlib
+
+from .pdpaout import SymbolTable
+from . import pdpopcodes
+
+# On-disk cache of a binary's load-time analysis, keyed on a hash of the file's contents:
+# the parsed symbol table and the function starts and jump tables found by discovery. Entries
+# are a small header followed by zlib compressed columns
+CACHE_MAGIC = b'PDPC'
+# Bump when the entry layout changes. Decoder changes are caught by the fingerprint
+CACHE_VERSION = 1
+
+def decoder_fingerprint(opcodes, model, options):
+    # Changes whenever any column of the opcode table (flow included, since it drives discovery)
+    # or the selected CPU model does, so entries decoded by another decoder are thrown away
+    # rather than replayed
+    return zlib.crc32(repr((model, options, opcodes)).encode())
+
+fingerprints = {}
+
+def current_fingerprint():
+    model = pdpopcodes.cpu_model
+    fingerprint = fingerprints.get(model)
+    if fingerprint is None:
+        fingerprint = fingerprints[model] = decoder_fingerprint(pdpopcodes.pdp11_opcodes, model, pdpopcodes.CPU_MODELS[model])
+    return fingerprint
+
+# symtab: SymbolTable, functions: sorted function starts, jump_tables: {jmp address: (function
+# start, targets)}
+AnalysisEntry = namedtuple('AnalysisEntry', ['symtab', 'functions', 'jump_tables'])
+
+def content_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+def cache_key(*parts):
+    # Keys become file names, so anything but letters, digits, '.', '_' and '-' is replaced
+    return re.sub(r'[^A-Za-z0-9._-]', '_', '-'.join(parts))
+
+def default_cache_dir():
+    cache_dir = os.environ.get('PDP11_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'pdp11')
+
+def pack_array(out, arr):
+    if sys.byteorder != 'little':
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    out.append(pack('<cI', arr.typecode.encode(), len(arr)))
+    out.append(arr.tobytes())
+
+def unpack_array(buf, offset):
+    typecode, count = unpack_from('<cI', buf, offset)
+    arr = array(typecode.decode())
+    offset += 5
+    end = offset + count * arr.itemsize
+    if end > len(buf):
+        raise ValueError('truncated cache entry')
+    arr.frombytes(buf[offset:end])
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr, end
+
+def encode_entry(entry):
+    symtab = entry.symtab
+    names = '\x00'.join(symtab.names).encode()
+    jmp_addrs = sorted(entry.jump_tables)
+    targets = [target for addr in jmp_addrs for target in entry.jump_tables[addr][1]]
+
+    out = []
+    pack_array(out, symtab.values)
+    pack_array(out, symtab.types)
+    pack_array(out, symtab.ovlys)
+    pack_array(out, symtab.name_ids)
+    pack_array(out, array('I', entry.functions))
+    pack_array(out, array('I', jmp_addrs))
+    pack_array(out, array('I', [entry.jump_tables[addr][0] for addr in jmp_addrs]))
+    pack_array(out, array('I', [len(entry.jump_tables[addr][1]) for addr in jmp_addrs]))
+    pack_array(out, array('I', targets))
+    out.append(pack('<I', len(symtab.names)))
+    out.append(names)
+    payload = zlib.compress(b''.join(out))
+    return CACHE_MAGIC + pack('<HI', CACHE_VERSION, current_fingerprint()) + payload
+
+def decode_entry(blob):
+    # None if the entry is from another cache or decoder version
+    if blob[:4] != CACHE_MAGIC or len(blob) < 10:
+        return None
+    version, fingerprint = unpack_from('<HI', blob, 4)
+    if version != CACHE_VERSION or fingerprint != current_fingerprint():
+        return None
+    buf = zlib.decompress(blob[10:])
+    offset = 0
+    columns = []
+    for _ in range(9):
+        arr, offset = unpack_array(buf, offset)
+        columns.append(arr)
+    values, types, ovlys, name_ids, functions, jmp_addrs, jmp_funcs, jmp_counts, targets = columns
+    count, = unpack_from('<I', buf, offset)
+    names = [sys.intern(name) for name in buf[offset + 4:].decode().split('\x00')] if count else []
+    if len(names) != count:
+        raise ValueError('corrupt cache entry')
+
+    jump_tables = {}
+    pos = 0
+    for addr, func, n in zip(jmp_addrs, jmp_funcs, jmp_counts):
+        jump_tables[addr] = (func, list(targets[pos:pos + n]))
+        pos += n
+    symtab = SymbolTable.from_columns(values, types, ovlys, name_ids, names)
+    return AnalysisEntry(symtab, list(functions), jump_tables)
+
+class AnalysisCache:
+    def __init__(self, directory=None):
+        self.directory = directory or default_cache_dir()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pdpc')
+
+    def load(self, key):
+        try:
+            with open(self.path(key), 'rb') as f:
+                return decode_entry(f.read())
+        except (OSError, ValueError, StructError, zlib.error):
+            # Missing and damaged entries are both just misses
+            return None
+
+    def store(self, key, entry):
+        # Written to a temporary file and renamed, so a concurrent load never sees half an entry
+        path = self.path(key)
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(encode_entry(entry))
+            os.replace(tmp, path)
+            return True
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return False
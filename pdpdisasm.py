@@ -1,38 +1,201 @@
-from binaryninja import *
+from .pdpaout import AddressMap
 from .pdpopcodes import *
+from .pdpmetrics import metrics
+from array import array
+from collections import namedtuple, OrderedDict
 from struct import unpack
+from threading import Lock
+from time import perf_counter
+import sys
+
+# op_id indexes pdp11_ops, length is in bytes including any immediate words
+Instruction = namedtuple('Instruction', ['op_id', 'mnem', 'args', 'length'])
 
 def read_word(data):
     return unpack('<H', data[:2])[0]
 
 def pdp11_decode(instr_data, addr):
-    word, = unpack('<H', instr_data[:2])
-    for op in pdp11_ops:
-        mnem, bits, group = op
-        if bits == (word >> group.shift):
-            args = group.parse_args(instr_data)
-            return mnem, args
-    return None
-
-def pdp11_disasm(instr_data, addr):
-    op = pdp11_decode(instr_data, addr)
-    if op == None:
-        print('Unknown op', bin(read_word(instr_data)), '@', hex(addr))
+    word, imm, next_imm = read_instr_words(instr_data)
+    op = pdp11_op_table[word]
+    if op is None:
         return None
-    mnem, args = op
-    result = [InstructionTextToken(InstructionTextTokenType.OpcodeToken, mnem)]
+    op_id, mnem, group = op
+    return make_instruction(op_id, mnem, group.parse_words(word, imm, next_imm))
+
+def make_instruction(op_id, mnem, args):
     length = 2
     for arg in args:
-        length += 2 if arg.has_imm() else 0
-    pc = addr + length
+        if arg.imm_word:
+            length += 2
+    return Instruction(op_id, mnem, args, length)
+
+def operand_pc(instr, addr, arg):
+    # PC as arg sees it: past the instruction word and every immediate word fetched up to and
+    # including arg's own. Operands without an immediate may be shared, but then any earlier
+    # operand that is the same object has no immediate either, so the first match is right
+    pc = addr + 2
+    for other in instr.args:
+        if other.imm_word:
+            pc += 2
+        if other is arg:
+            return pc
+    raise ValueError('operand not in instruction')
+
+def read_words(buf):
+    # 16-bit little-endian view over buf. This is a zero-copy memoryview cast except on
+    # big-endian hosts, where the words have to be swapped into an array first
+    data = memoryview(buf).cast('B')
+    data = data[:len(data) & ~1]
+    if sys.byteorder == 'little':
+        return data.cast('H')
+    words = array('H', data.tobytes())
+    words.byteswap()
+    return words
+
+def pdp11_disasm_iter(buf, base=0):
+    # Linear sweep over a whole segment, yielding (addr, Instruction) pairs. Words that don't
+    # decode yield (addr, None) and the sweep carries on from the next word. Immediates past
+    # the end of buf read as zero, same as pdp11_decode on a short buffer
+    words = read_words(buf)
+    count = len(words)
+    table = pdp11_op_table
+    i = 0
+    while i < count:
+        word = words[i]
+        addr = base + i*2
+        op = table[word]
+        if op is None:
+            yield addr, None
+            i += 1
+            continue
+        op_id, mnem, group = op
+        imm = words[i + 1] if i + 1 < count else 0
+        next_imm = words[i + 2] if i + 2 < count else 0
+        instr = make_instruction(op_id, mnem, group.parse_words(word, imm, next_imm))
+        yield addr, instr
+        i += instr.length // 2
+
+def pdp11_branches(instr, addr, addresses=None):
+    # Branch type names match binja's BranchType members. Which instructions branch, and how, is
+    # the flow column of the opcode table. Targets are resolved through addresses, the current
+    # address map by default
+    if addresses is None:
+        addresses = address_map
+    mnem, args, length = instr.mnem, instr.args, instr.length
+    flow = pdp11_flows.get(mnem)
+    if flow is None:
+        # Only a register write to PC transfers control, mov r0,_x (mode 6) is a plain store
+        if mnem == 'MOV' and args[1].reg_idx == 7 and args[1].mode == 0:
+            return [('FunctionReturn', None)]
+        return []
+    if flow == 'return':
+        return [('FunctionReturn', None)]
+    elif flow == 'call':
+        target = operand_address(instr, addr, args[1], addresses)
+        if target is None:
+            return [('IndirectBranch', None)]
+        return [('CallDestination', target)]
+    elif flow == 'jump':
+        target = operand_address(instr, addr, args[0], addresses)
+        if target is None:
+            return [('IndirectBranch', None)]
+        return [('UnconditionalBranch', target)]
+    elif flow == 'branch':
+        target = args[0].value
+        return [('UnconditionalBranch', addresses.code(addr, addr + length + target*2))]
+    elif flow == 'cond':
+        target = args[0].value
+        return [('TrueBranch', addresses.code(addr, addr + length + target*2)), ('FalseBranch', addr + length)]
+    elif flow == 'sob':
+        target = args[1].value
+        return [('TrueBranch', addresses.code(addr, addr + length - target*2)), ('FalseBranch', addr + length)]
+    return []
+
+def operand_address(instr, addr, arg, addresses):
+    # Where a JMP/JSR operand sends control in the view, None when it's only known at run time
+    value = arg.get_value(operand_pc(instr, addr, arg))
+    if value is None:
+        return None
+    return addresses.code(addr, value)
+
+class DecodeCache:
+    # Bounded LRU of decoded instructions and their branches, keyed on the instruction bytes
+    # and address. binja asks for info and text of the same instruction separately, and
+    # re-analysis asks again, so most lookups after the first pass are hits
+    def __init__(self, size=8192):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def decode(self, instr_data, addr):
+        key = (bytes(instr_data[:6]), addr)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        timing = metrics.enabled
+        if timing:
+            start = perf_counter()
+        instr = pdp11_decode(instr_data, addr)
+        if instr is None:
+            entry = (None, [])
+            metrics.unknown_op(read_word(bytes(instr_data[:2]).ljust(2, b'\x00')))
+        else:
+            entry = (instr, pdp11_branches(instr, addr))
+        if timing:
+            metrics.add_time('decode', perf_counter() - start)
+
+        with self.lock:
+            self.entries[key] = entry
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries), 'size': self.size}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+pdp11_cache = DecodeCache()
+# Entries decoded under one CPU model are stale under another
+cpu_model_hooks.append(lambda model: pdp11_cache.clear())
+
+# Address map of the binary being analysed. Like the CPU model it is shared by every view, since
+# the architecture callbacks aren't told which view they are decoding for
+address_map = AddressMap()
+
+def set_address_map(addresses):
+    global address_map
+    address_map = addresses
+    # Cached branches were resolved through the old map
+    pdp11_cache.clear()
+metrics.add_source('decode_cache', pdp11_cache.stats)
+
+def pdp11_tokens(instr, addr):
+    args = instr.args
+    result = [('OpcodeToken', instr.mnem, None)]
+    pc = addr + instr.length
     if len(args) > 0:
-        result.append(InstructionTextToken(InstructionTextTokenType.TextToken, ' '))
+        result.append(('TextToken', ' ', None))
         if len(args) == 1:
             result += args[0].render(pc)
         elif len(args) == 2:
             result += args[0].render(pc)
-            result.append(InstructionTextToken(InstructionTextTokenType.OperandSeparatorToken, ','))
-            result.append(InstructionTextToken(InstructionTextTokenType.TextToken, ' '))
+            result.append(('OperandSeparatorToken', ',', None))
+            result.append(('TextToken', ' ', None))
             result += args[1].render(pc)
 
-    return result, length
+    return result
+
+def pdp11_text(instr, addr):
+    return ''.join(text for _, text, _ in pdp11_tokens(instr, addr))
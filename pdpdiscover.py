@@ -0,0 +1,117 @@
+from .pdpdisasm import *
+from . import pdpdisasm
+
+# Longest jump table accepted when its size can't be read off a bounds check
+MAX_JUMP_TABLE = 256
+
+def decode_at(text, base, addr):
+    offset = addr - base
+    if offset < 0 or offset + 2 > len(text) or addr & 1:
+        return None
+    return pdp11_decode(text[offset:offset + 6], addr)
+
+def in_text(text, base, addr):
+    return addr is not None and addr & 1 == 0 and base <= addr < base + len(text)
+
+def word_at(segments, addr):
+    for base, data in segments:
+        offset = addr - base
+        if 0 <= offset and offset + 2 <= len(data) and addr & 1 == 0:
+            return data[offset] | (data[offset + 1] << 8)
+    return None
+
+def jump_table_size(text, base, asl_addr, reg_idx):
+    # pcc bounds checks the index before scaling it:
+    #   cmp rN, $max; bhi default; asl rN; jmp *table(rN)
+    # so the table has max + 1 entries
+    cmp_addr = asl_addr - 2 - 4
+    if not in_text(text, base, cmp_addr):
+        return None
+    bhi = decode_at(text, base, asl_addr - 2)
+    cmp = decode_at(text, base, cmp_addr)
+    if bhi is None or bhi.mnem != 'BHI' or cmp is None or cmp.mnem != 'CMP' or cmp.length != 4:
+        return None
+    src, dst = cmp.args
+    if src.mode != 0 or src.reg_idx != reg_idx or dst.mode != 2 or dst.reg_idx != 7:
+        return None
+    return (dst.imm & 0xffff) + 1
+
+def jump_table(text, base, segments, addr, instr, addresses):
+    # Recognises the switch idiom 'asl rN; jmp *table(rN)' and returns the targets in the table,
+    # which is read from whichever of segments holds it
+    arg = instr.args[0]
+    if arg.mode != 7 or arg.reg_idx == 7:
+        return None
+    asl = decode_at(text, base, addr - 2)
+    if asl is None or asl.mnem != 'ASL' or asl.args[0].mode != 0 or asl.args[0].reg_idx != arg.reg_idx:
+        return None
+
+    table = addresses.data(addr, arg.imm)
+    count = jump_table_size(text, base, addr - 2, arg.reg_idx)
+    targets = []
+    for i in range(count if count is not None else MAX_JUMP_TABLE):
+        target = word_at(segments, table + i*2)
+        if target is None:
+            break
+        target = addresses.code(addr, target)
+        if not in_text(text, base, target):
+            if count is not None:
+                continue
+            break
+        targets.append(target)
+    return targets or None
+
+def discover_code(text, base, entries, data=None, data_base=0, addresses=None):
+    # Recursive descent over the text segment from entries, following branches and JSR calls
+    # and recovering jump tables, which may live in text or data. Returns the function starts
+    # found (entries plus every call target) and the jump tables as
+    # {jmp address: (function start, targets)}. Addresses the code computes are resolved through
+    # addresses, the current address map by default, so in split binaries jump tables are only
+    # read from data, which is in D space
+    if addresses is None:
+        addresses = pdpdisasm.address_map
+    text = memoryview(text).cast('B')
+    segments = [] if addresses.split else [(base, text)]
+    if data is not None:
+        segments.append((data_base, memoryview(data).cast('B')))
+    functions = set(addr for addr in entries if in_text(text, base, addr))
+    jump_tables = {}
+    visited = set()
+    worklist = [(addr, addr) for addr in sorted(functions)]
+    while worklist:
+        addr, func = worklist.pop()
+        while in_text(text, base, addr) and addr not in visited:
+            instr = decode_at(text, base, addr)
+            if instr is None:
+                break
+            visited.add(addr)
+            next_addr = addr + instr.length
+
+            falls_through = True
+            for branch_type, target in pdp11_branches(instr, addr, addresses):
+                if branch_type == 'CallDestination':
+                    if in_text(text, base, target) and target not in functions:
+                        functions.add(target)
+                        worklist.append((target, target))
+                elif branch_type in ['TrueBranch', 'FalseBranch']:
+                    if in_text(text, base, target):
+                        worklist.append((target, func))
+                    falls_through = False
+                elif branch_type == 'UnconditionalBranch':
+                    if in_text(text, base, target):
+                        worklist.append((target, func))
+                    falls_through = False
+                elif branch_type == 'FunctionReturn':
+                    falls_through = False
+                elif branch_type == 'IndirectBranch' and instr.mnem == 'JMP':
+                    targets = jump_table(text, base, segments, addr, instr, addresses)
+                    if targets is not None:
+                        jump_tables[addr] = (func, targets)
+                        worklist.extend((target, func) for target in targets)
+                    falls_through = False
+
+            if not falls_through:
+                break
+            addr = next_addr
+
+    return sorted(functions), jump_tables
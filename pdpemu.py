@@ -0,0 +1,962 @@
+from io import BytesIO
+
+from .pdpaout import AOutHeader, D_SPACE_BASE
+from .pdpdisasm import operand_pc, pdp11_decode
+from .pdpopcodes import pdp11_ops
+
+# Headless user-mode emulator for 2.11BSD binaries, for getting past code that unpacks or decrypts
+# itself at run time. Instructions are decoded through the same tables as the disassembler and
+# compiled once into closures, grouped into basic blocks cached by address, so running a loop
+# doesn't decode anything after the first time round. Writes over compiled code flush the cache
+#
+#   emu = Emulator.from_aout(open('a.out', 'rb').read(), stdin=b'input')
+#   emu.run()
+#   emu.stdout.getvalue(), emu.exit_status
+#   emu.snapshot(bv) # copies unpacked memory back into the view
+
+# Longest run of straight-line instructions compiled into one block
+MAX_BLOCK = 64
+
+# Byte variants of word instructions, MOVB -> MOV etc
+BYTE_OPS = dict((mnem, mnem[:-1]) for mnem, _, _ in pdp11_ops if mnem.endswith('B') and any(m == mnem[:-1] for m, _, _ in pdp11_ops))
+
+# See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/include/errno.h
+EBADF = 9
+EFAULT = 14
+
+class EmulationError(Exception):
+    pass
+
+def signed(value, sign=0x8000):
+    return value - (sign << 1) if value & sign else value
+
+class Emulator:
+    def __init__(self, split=False):
+        # I and D space are the same memory unless the binary is split I&D
+        self.imem = bytearray(0x10000)
+        self.dmem = bytearray(0x10000) if split else self.imem
+        self.split = split
+        self.r = [0] * 8
+        self.n = self.z = self.v = self.c = 0
+        self.blocks = {}
+        # One flag per word of I space that's part of a compiled block
+        self.code = bytearray(0x8000)
+        # Iterator over the ops of the block being run, so a write over code can cut the block
+        # short, see flush. cut_short is how many of its ops were left unrun when it did
+        self.running = None
+        self.cut_short = None
+        self.until = None
+        self.halted = False
+        self.exit_status = None
+        self.instructions = 0
+        self.stdin = BytesIO()
+        self.stdout = BytesIO()
+        self.stderr = BytesIO()
+        self.syscalls = dict(bsd_syscalls)
+
+    @classmethod
+    def from_aout(cls, data, argv=('a.out',), stdin=b''):
+        header = AOutHeader(data)
+        if header.is_overlaid():
+            raise ValueError('overlaid a.out files are not supported')
+        emu = cls(split=header.is_split())
+        txtoff, dataoff = header.txtoff(), header.dataoff()
+        emu.imem[0:header.a_text] = data[txtoff:txtoff + header.a_text]
+        data_vaddr = header.data_vaddr() & 0xffff
+        emu.dmem[data_vaddr:data_vaddr + header.a_data] = data[dataoff:dataoff + header.a_data]
+        emu.setup_stack(argv)
+        emu.r[7] = header.a_entry
+        emu.stdin = BytesIO(stdin)
+        return emu
+
+    def setup_stack(self, argv, envp=()):
+        # Same layout exec leaves for crt0: argc at sp, then argv and envp, each NULL terminated,
+        # with the strings above them at the top of memory
+        top = 0x10000
+        ptrs = []
+        for s in list(argv) + list(envp):
+            s = s.encode() + b'\x00' if isinstance(s, str) else bytes(s) + b'\x00'
+            top -= len(s)
+            self.dmem[top:top + len(s)] = s
+            ptrs.append(top)
+        top &= ~1
+        words = [len(argv)] + ptrs[:len(argv)] + [0] + ptrs[len(argv):] + [0]
+        sp = top - 2 * len(words)
+        for i, word in enumerate(words):
+            self.write_word(sp + 2 * i, word)
+        self.r[6] = sp
+
+    # Memory. Data accesses go to D space, instruction fetches and immediates to I space
+
+    def read_word(self, addr):
+        if addr & 1:
+            raise EmulationError('odd address %06o' % addr)
+        m = self.dmem
+        return m[addr] | (m[addr + 1] << 8)
+
+    def read_byte(self, addr):
+        return self.dmem[addr]
+
+    def write_word(self, addr, value):
+        if addr & 1:
+            raise EmulationError('odd address %06o' % addr)
+        m = self.dmem
+        m[addr] = value & 0xff
+        m[addr + 1] = value >> 8
+        if not self.split and self.code[addr >> 1]:
+            self.flush()
+
+    def write_byte(self, addr, value):
+        self.dmem[addr] = value
+        if not self.split and self.code[addr >> 1]:
+            self.flush()
+
+    def push(self, value):
+        sp = self.r[6] = (self.r[6] - 2) & 0xffff
+        self.write_word(sp, value)
+
+    def pop(self):
+        sp = self.r[6]
+        self.r[6] = (sp + 2) & 0xffff
+        return self.read_word(sp)
+
+    def psw(self):
+        return (self.n << 3) | (self.z << 2) | (self.v << 1) | self.c
+
+    def set_psw(self, value):
+        self.n, self.z, self.v, self.c = (value >> 3) & 1, (value >> 2) & 1, (value >> 1) & 1, value & 1
+
+    def flush(self):
+        # Drop every compiled block, something has written over code. If that was one of the
+        # ops of a running block, the rest of its ops may be stale too, so the block stops after
+        # this op and run carries on from the next instruction
+        self.blocks.clear()
+        self.code[:] = bytes(len(self.code))
+        running = self.running
+        if running is not None:
+            self.running = None
+            self.cut_short = running.__length_hint__()
+            for _ in running:
+                pass
+
+    # Execution
+
+    def run(self, max_instructions=None, until=None):
+        # Runs until the program exits or halts, max_instructions have run, or pc reaches until.
+        # Returns the number of instructions run
+        if until != self.until:
+            # Blocks end before the stop address, so ones compiled for another one are stale
+            self.until = until
+            self.flush()
+        blocks = self.blocks
+        pc = self.r[7]
+        count = 0
+        try:
+            while not self.halted:
+                if max_instructions is not None and count >= max_instructions:
+                    break
+                if pc == until and count:
+                    break
+                block = blocks.get(pc)
+                if block is None:
+                    block = self.compile_block(pc)
+                ops, exit, size, ends = block
+                running = self.running = iter(ops)
+                for op in running:
+                    op()
+                self.running = None
+                if self.cut_short is not None:
+                    done = len(ops) - self.cut_short
+                    self.cut_short = None
+                    pc = ends[done - 1]
+                    count += done
+                    continue
+                pc = exit()
+                count += size
+        except EmulationError as e:
+            raise EmulationError('%s (in block at %06o)' % (e, pc)) from None
+        finally:
+            self.running = None
+            self.r[7] = pc
+            self.instructions += count
+        return count
+
+    def step(self):
+        # Runs exactly one instruction, without touching the block cache
+        ops, exit, _, _ = self.compile_block(self.r[7], 1, cache=False)
+        for op in ops:
+            op()
+        self.r[7] = exit()
+        self.instructions += 1
+
+    def compile_block(self, pc, limit=MAX_BLOCK, cache=True):
+        if pc & 1:
+            raise EmulationError('odd pc %06o' % pc)
+        ops = []
+        # Address after each op, where to carry on if it writes over code
+        ends = []
+        addr = pc
+        exit = None
+        while len(ops) < limit:
+            instr = pdp11_decode(self.imem[addr:addr + 6], addr)
+            if instr is None:
+                exit = illegal(addr)
+                break
+            next_pc = (addr + instr.length) & 0xffff
+            if cache:
+                for word in range(addr >> 1, (addr + instr.length) >> 1):
+                    self.code[word & 0x7fff] = 1
+            op, terminates = compile_instruction(self, instr, addr, next_pc)
+            if terminates:
+                exit = op
+                break
+            ops.append(op)
+            ends.append(next_pc)
+            addr = next_pc
+            if addr == self.until:
+                break
+        count = len(ops)
+        if exit is None:
+            exit = fall_through(addr)
+        else:
+            count += 1
+        block = (tuple(ops), exit, count, tuple(ends))
+        if cache:
+            self.blocks[pc] = block
+        return block
+
+    # 2.11BSD system calls pass their arguments on the stack, above the return address
+
+    def arg(self, i):
+        return self.read_word((self.r[6] + 2 + 2 * i) & 0xffff)
+
+    def syscall(self, number):
+        handler = self.syscalls.get(number)
+        if handler is None:
+            raise EmulationError('unhandled system call %d' % number)
+        result = handler(self)
+        if result is None:
+            return
+        if result < 0:
+            # Errors come back as errno in r0 with carry set
+            self.r[0] = -result
+            self.c = 1
+        else:
+            self.r[0] = result & 0xffff
+            self.c = 0
+
+    def snapshot(self, view):
+        # Writes memory that differs from the view back into it, I space where PDP11View maps text
+        # and D space at D_SPACE_BASE for split I&D. Returns the number of bytes written
+        spaces = [(0, self.imem)]
+        if self.split:
+            spaces.append((D_SPACE_BASE, self.dmem))
+        written = 0
+        for base, mem in spaces:
+            for start in range(0, 0x10000, 0x1000):
+                old = view.read(base + start, 0x1000)
+                new = bytes(mem[start:start + len(old)])
+                if old == new:
+                    continue
+                i = 0
+                while i < len(old):
+                    if old[i] == new[i]:
+                        i += 1
+                        continue
+                    j = i
+                    while j < len(old) and old[j] != new[j]:
+                        j += 1
+                    written += view.write(base + start + i, new[i:j])
+                    i = j
+        return written
+
+def sys_exit(emu):
+    emu.exit_status = emu.arg(0)
+    emu.halted = True
+
+def sys_read(emu):
+    fd, buf, count = emu.arg(0), emu.arg(1), emu.arg(2)
+    if fd != 0:
+        return -EBADF
+    if buf + count > 0x10000:
+        return -EFAULT
+    data = emu.stdin.read(count)
+    for i, b in enumerate(data):
+        emu.write_byte(buf + i, b)
+    return len(data)
+
+def sys_write(emu):
+    fd, buf, count = emu.arg(0), emu.arg(1), emu.arg(2)
+    out = {1: emu.stdout, 2: emu.stderr}.get(fd)
+    if out is None:
+        return -EBADF
+    if buf + count > 0x10000:
+        return -EFAULT
+    out.write(bytes(emu.dmem[buf:buf + count]))
+    return count
+
+# See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/src/sys/sys/syscalls.c
+bsd_syscalls = {
+    1: sys_exit,
+    3: sys_read,
+    4: sys_write,
+}
+
+# Compilation. Each instruction becomes a closure over the emulator's registers and memory
+# accessors. Immediates and PC relative addresses are resolved to constants here, so only
+# instructions that use PC as a general register need it kept up to date
+
+def illegal(addr):
+    def exit():
+        raise EmulationError('illegal instruction at %06o' % addr)
+    return exit
+
+def fall_through(next_pc):
+    return lambda: next_pc
+
+def uses_pc_register(instr):
+    for arg in instr.args:
+        if getattr(arg, 'reg_idx', None) == 7 and getattr(arg, 'mode', 0) in (0, 1, 4, 5):
+            return True
+    return False
+
+def effective_address(emu, instr, addr, arg, byte):
+    # Function computing the operand's address, with its autoincrement/decrement side effects
+    r = emu.r
+    rw = emu.read_word
+    reg, mode = arg.reg_idx, arg.mode
+    if reg == 7 and mode in (2, 3, 6, 7):
+        at = operand_pc(instr, addr, arg)
+        if mode == 2:
+            # Immediate as a destination, the word in the instruction stream
+            a = (at - 2) & 0xffff
+            return lambda: a
+        if mode == 3:
+            a = arg.imm & 0xffff
+            return lambda: a
+        a = (at + arg.imm) & 0xffff
+        if mode == 6:
+            return lambda: a
+        return lambda: rw(a)
+    if reg == 7 and mode == 1:
+        a = operand_pc(instr, addr, arg) & 0xffff
+        return lambda: a
+    step = 1 if byte and reg < 6 else 2
+    if mode == 1:
+        return lambda: r[reg]
+    if mode == 2:
+        def ea():
+            a = r[reg]
+            r[reg] = (a + step) & 0xffff
+            return a
+    elif mode == 3:
+        def ea():
+            a = r[reg]
+            r[reg] = (a + 2) & 0xffff
+            return rw(a)
+    elif mode == 4:
+        def ea():
+            a = r[reg] = (r[reg] - step) & 0xffff
+            return a
+    elif mode == 5:
+        def ea():
+            a = r[reg] = (r[reg] - 2) & 0xffff
+            return rw(a)
+    else:
+        x = arg.imm
+        if mode == 6:
+            return lambda: (r[reg] + x) & 0xffff
+        return lambda: rw((r[reg] + x) & 0xffff)
+    return ea
+
+def reader(emu, instr, addr, arg, byte):
+    r = emu.r
+    if arg.mode == 0 and arg.reg_idx == 7:
+        # r7 holds the next instruction's address by now, the operand saw PC as it was read
+        value = operand_pc(instr, addr, arg) & (0xff if byte else 0xffff)
+        return lambda: value
+    if arg.mode == 0:
+        reg = arg.reg_idx
+        if byte:
+            return lambda: r[reg] & 0xff
+        return lambda: r[reg]
+    if arg.reg_idx == 7 and arg.mode == 2:
+        value = arg.imm & (0xff if byte else 0xffff)
+        return lambda: value
+    ea = effective_address(emu, instr, addr, arg, byte)
+    if byte:
+        rb = emu.read_byte
+        return lambda: rb(ea())
+    rw = emu.read_word
+    return lambda: rw(ea())
+
+def writer(emu, instr, addr, arg, byte, extend=False):
+    # Store-only access. extend sign extends byte stores to registers, as MOVB does
+    r = emu.r
+    if arg.mode == 0:
+        reg = arg.reg_idx
+        if byte and extend:
+            def store(value):
+                r[reg] = value | 0xff00 if value & 0x80 else value
+        elif byte:
+            def store(value):
+                r[reg] = (r[reg] & 0xff00) | value
+        else:
+            def store(value):
+                r[reg] = value
+        return store
+    ea = effective_address(emu, instr, addr, arg, byte)
+    if byte:
+        wb = emu.write_byte
+        return lambda value: wb(ea(), value)
+    ww = emu.write_word
+    return lambda value: ww(ea(), value)
+
+def accessor(emu, instr, addr, arg, byte):
+    # (load, store) for read-modify-write, the address is computed once by load
+    r = emu.r
+    if arg.mode == 0:
+        reg = arg.reg_idx
+        if byte:
+            def store(value):
+                r[reg] = (r[reg] & 0xff00) | value
+            return (lambda: r[reg] & 0xff), store
+        def store(value):
+            r[reg] = value
+        return (lambda: r[reg]), store
+    ea = effective_address(emu, instr, addr, arg, byte)
+    cell = [0]
+    read = emu.read_byte if byte else emu.read_word
+    write = emu.write_byte if byte else emu.write_word
+    def load():
+        a = cell[0] = ea()
+        return read(a)
+    def store(value):
+        write(cell[0], value)
+    return load, store
+
+def compile_instruction(emu, instr, addr, next_pc):
+    # Returns (op, terminates). Terminating ops end a block and return the next pc
+    mnem = instr.mnem
+    byte = mnem in BYTE_OPS
+    base = BYTE_OPS.get(mnem, mnem)
+    compiler = terminators.get(base)
+    if compiler is not None:
+        return compiler(emu, instr, addr, next_pc), True
+    compiler = straight_line.get(base)
+    if compiler is None:
+        return illegal(addr), True
+    op = compiler(emu, instr, addr, byte)
+    if uses_pc_register(instr):
+        # PC used as a general register, keep r7 current and leave the block through it
+        r = emu.r
+        def exit():
+            r[7] = next_pc
+            op()
+            return r[7]
+        return exit, True
+    return op, False
+
+# Straight-line instructions, compiler(emu, instr, addr, byte) -> op
+
+def compile_mov(emu, instr, addr, byte):
+    src = reader(emu, instr, addr, instr.args[0], byte)
+    store = writer(emu, instr, addr, instr.args[1], byte, extend=True)
+    shift = 7 if byte else 15
+    def op():
+        value = src()
+        store(value)
+        emu.n = value >> shift
+        emu.z = value == 0
+        emu.v = 0
+    return op
+
+def compile_cmp(emu, instr, addr, byte):
+    src = reader(emu, instr, addr, instr.args[0], byte)
+    dst = reader(emu, instr, addr, instr.args[1], byte)
+    mask, shift = (0xff, 7) if byte else (0xffff, 15)
+    def op():
+        s = src()
+        d = dst()
+        t = (s - d) & mask
+        emu.n = t >> shift
+        emu.z = t == 0
+        emu.v = (((s ^ d) & (s ^ t)) >> shift) & 1
+        emu.c = s < d
+    return op
+
+def compile_logic(fn, store_result=True):
+    def compile(emu, instr, addr, byte):
+        src = reader(emu, instr, addr, instr.args[0], byte)
+        load, store = accessor(emu, instr, addr, instr.args[1], byte)
+        shift = 7 if byte else 15
+        if store_result:
+            def op():
+                s = src()
+                t = fn(s, load())
+                store(t)
+                emu.n = t >> shift
+                emu.z = t == 0
+                emu.v = 0
+        else:
+            def op():
+                s = src()
+                t = fn(s, load())
+                emu.n = t >> shift
+                emu.z = t == 0
+                emu.v = 0
+        return op
+    return compile
+
+def compile_add(emu, instr, addr, byte):
+    src = reader(emu, instr, addr, instr.args[0], False)
+    load, store = accessor(emu, instr, addr, instr.args[1], False)
+    def op():
+        s = src()
+        d = load()
+        t = s + d
+        result = t & 0xffff
+        store(result)
+        emu.n = result >> 15
+        emu.z = result == 0
+        emu.v = ((~(s ^ d) & (s ^ t)) >> 15) & 1
+        emu.c = t >> 16
+    return op
+
+def compile_sub(emu, instr, addr, byte):
+    src = reader(emu, instr, addr, instr.args[0], False)
+    load, store = accessor(emu, instr, addr, instr.args[1], False)
+    def op():
+        s = src()
+        d = load()
+        t = (d - s) & 0xffff
+        store(t)
+        emu.n = t >> 15
+        emu.z = t == 0
+        emu.v = (((d ^ s) & (d ^ t)) >> 15) & 1
+        emu.c = d < s
+    return op
+
+def compile_single(fn):
+    # fn(emu, value, mask, sign) -> result, setting whatever flags the instruction sets
+    def compile(emu, instr, addr, byte):
+        load, store = accessor(emu, instr, addr, instr.args[0], byte)
+        mask, sign = (0xff, 0x80) if byte else (0xffff, 0x8000)
+        def op():
+            store(fn(emu, load(), mask, sign))
+        return op
+    return compile
+
+def nz(emu, value, sign):
+    emu.n = (value & sign) != 0
+    emu.z = value == 0
+    return value
+
+def op_com(emu, d, mask, sign):
+    emu.v, emu.c = 0, 1
+    return nz(emu, ~d & mask, sign)
+
+def op_inc(emu, d, mask, sign):
+    emu.v = d == sign - 1
+    return nz(emu, (d + 1) & mask, sign)
+
+def op_dec(emu, d, mask, sign):
+    emu.v = d == sign
+    return nz(emu, (d - 1) & mask, sign)
+
+def op_neg(emu, d, mask, sign):
+    t = -d & mask
+    emu.v = t == sign
+    emu.c = t != 0
+    return nz(emu, t, sign)
+
+def op_adc(emu, d, mask, sign):
+    c = emu.c
+    emu.v = c and d == sign - 1
+    emu.c = c and d == mask
+    return nz(emu, (d + c) & mask, sign)
+
+def op_sbc(emu, d, mask, sign):
+    c = emu.c
+    emu.v = d == sign
+    # C is the borrow, same as SUB
+    emu.c = c and d == 0
+    return nz(emu, (d - c) & mask, sign)
+
+def op_ror(emu, d, mask, sign):
+    t = (d >> 1) | (sign if emu.c else 0)
+    emu.c = d & 1
+    nz(emu, t, sign)
+    emu.v = emu.n ^ emu.c
+    return t
+
+def op_rol(emu, d, mask, sign):
+    t = ((d << 1) | (1 if emu.c else 0)) & mask
+    emu.c = (d & sign) != 0
+    nz(emu, t, sign)
+    emu.v = emu.n ^ emu.c
+    return t
+
+def op_asr(emu, d, mask, sign):
+    t = (d >> 1) | (d & sign)
+    emu.c = d & 1
+    nz(emu, t, sign)
+    emu.v = emu.n ^ emu.c
+    return t
+
+def op_asl(emu, d, mask, sign):
+    t = (d << 1) & mask
+    emu.c = (d & sign) != 0
+    nz(emu, t, sign)
+    emu.v = emu.n ^ emu.c
+    return t
+
+def op_swab(emu, d, mask, sign):
+    t = ((d >> 8) | (d << 8)) & 0xffff
+    emu.n = (t & 0x80) != 0
+    emu.z = (t & 0xff) == 0
+    emu.v = emu.c = 0
+    return t
+
+def compile_clr(emu, instr, addr, byte):
+    store = writer(emu, instr, addr, instr.args[0], byte)
+    def op():
+        store(0)
+        emu.n, emu.z, emu.v, emu.c = 0, 1, 0, 0
+    return op
+
+def compile_tst(emu, instr, addr, byte):
+    src = reader(emu, instr, addr, instr.args[0], byte)
+    sign = 0x80 if byte else 0x8000
+    def op():
+        nz(emu, src(), sign)
+        emu.v = emu.c = 0
+    return op
+
+def compile_sxt(emu, instr, addr, byte):
+    store = writer(emu, instr, addr, instr.args[0], False)
+    def op():
+        store(0xffff if emu.n else 0)
+        emu.z = not emu.n
+        emu.v = 0
+    return op
+
+def compile_mfps(emu, instr, addr, byte):
+    store = writer(emu, instr, addr, instr.args[0], True, extend=True)
+    def op():
+        value = emu.psw()
+        store(value)
+        emu.n = value >> 7
+        emu.z = value == 0
+        emu.v = 0
+    return op
+
+def compile_mtps(emu, instr, addr, byte):
+    # Only the condition codes, user mode can't change the priority
+    src = reader(emu, instr, addr, instr.args[0], True)
+    def op():
+        emu.set_psw(src() & 0o17)
+    return op
+
+def compile_mfp(emu, instr, addr, byte):
+    # There's only the one mode, so previous space is the current one
+    src = reader(emu, instr, addr, instr.args[0], False)
+    def op():
+        value = src()
+        emu.push(value)
+        nz(emu, value, 0x8000)
+        emu.v = 0
+    return op
+
+def compile_mtp(emu, instr, addr, byte):
+    store = writer(emu, instr, addr, instr.args[0], False)
+    def op():
+        value = emu.pop()
+        store(value)
+        nz(emu, value, 0x8000)
+        emu.v = 0
+    return op
+
+def compile_xor(emu, instr, addr, byte):
+    r = emu.r
+    reg = instr.args[0].reg_idx
+    load, store = accessor(emu, instr, addr, instr.args[1], False)
+    def op():
+        t = r[reg] ^ load()
+        store(t)
+        nz(emu, t, 0x8000)
+        emu.v = 0
+    return op
+
+def compile_mul(emu, instr, addr, byte):
+    r = emu.r
+    reg = instr.args[0].reg_idx
+    src = reader(emu, instr, addr, instr.args[1], False)
+    def op():
+        product = signed(r[reg]) * signed(src())
+        if reg & 1:
+            r[reg] = product & 0xffff
+        else:
+            r[reg] = (product >> 16) & 0xffff
+            r[reg | 1] = product & 0xffff
+        emu.n = product < 0
+        emu.z = product == 0
+        emu.v = 0
+        emu.c = not -0x8000 <= product < 0x8000
+    return op
+
+def compile_div(emu, instr, addr, byte):
+    r = emu.r
+    reg = instr.args[0].reg_idx
+    src = reader(emu, instr, addr, instr.args[1], False)
+    def op():
+        divisor = signed(src())
+        dividend = signed((r[reg] << 16) | r[reg | 1], 0x80000000)
+        if divisor == 0:
+            emu.v = emu.c = 1
+            return
+        quotient = abs(dividend) // abs(divisor)
+        if (dividend < 0) != (divisor < 0):
+            quotient = -quotient
+        remainder = dividend - quotient * divisor
+        emu.c = 0
+        if not -0x8000 <= quotient < 0x8000:
+            emu.v = 1
+            return
+        r[reg] = quotient & 0xffff
+        r[reg | 1] = remainder & 0xffff
+        emu.n = quotient < 0
+        emu.z = quotient == 0
+        emu.v = 0
+    return op
+
+def shift(value, count, bits):
+    # Arithmetic shift of a signed value, left for positive counts. Returns (result, carry)
+    if count > 0:
+        result = value << count
+        carry = (result >> bits) & 1
+    elif count < 0:
+        result = value >> -count
+        carry = (value >> (-count - 1)) & 1
+    else:
+        result, carry = value, 0
+    return result, carry
+
+def compile_ash(emu, instr, addr, byte):
+    r = emu.r
+    reg = instr.args[0].reg_idx
+    src = reader(emu, instr, addr, instr.args[1], False)
+    def op():
+        value = signed(r[reg])
+        result, carry = shift(value, signed(src() & 0o77, 0o40), 16)
+        t = result & 0xffff
+        r[reg] = t
+        nz(emu, t, 0x8000)
+        # The sign changing at any point during the shift means the result doesn't fit
+        emu.v = not -0x8000 <= result < 0x8000
+        emu.c = carry
+    return op
+
+def compile_ashc(emu, instr, addr, byte):
+    r = emu.r
+    reg = instr.args[0].reg_idx
+    src = reader(emu, instr, addr, instr.args[1], False)
+    def op():
+        low = r[reg | 1] if not reg & 1 else r[reg]
+        value = signed((r[reg] << 16) | low, 0x80000000)
+        result, carry = shift(value, signed(src() & 0o77, 0o40), 32)
+        t = result & 0xffffffff
+        if reg & 1:
+            r[reg] = t & 0xffff
+        else:
+            r[reg] = t >> 16
+            r[reg | 1] = t & 0xffff
+        emu.n = t >> 31
+        emu.z = t == 0
+        emu.v = not -0x80000000 <= result < 0x80000000
+        emu.c = carry
+    return op
+
+def compile_condition_codes(value):
+    def compile(emu, instr, addr, byte):
+        mask = instr.args[0].value
+        def op():
+            psw = emu.psw()
+            emu.set_psw(psw | mask if value else psw & ~mask)
+        return op
+    return compile
+
+def compile_nop(emu, instr, addr, byte):
+    return lambda: None
+
+straight_line = {
+    'MOV': compile_mov,
+    'CMP': compile_cmp,
+    'BIT': compile_logic(lambda s, d: s & d, store_result=False),
+    'BIC': compile_logic(lambda s, d: d & ~s),
+    'BIS': compile_logic(lambda s, d: d | s),
+    'ADD': compile_add,
+    'SUB': compile_sub,
+    'CLR': compile_clr,
+    'COM': compile_single(op_com),
+    'INC': compile_single(op_inc),
+    'DEC': compile_single(op_dec),
+    'NEG': compile_single(op_neg),
+    'ADC': compile_single(op_adc),
+    'SBC': compile_single(op_sbc),
+    'TST': compile_tst,
+    'ROR': compile_single(op_ror),
+    'ROL': compile_single(op_rol),
+    'ASR': compile_single(op_asr),
+    'ASL': compile_single(op_asl),
+    'SWAB': compile_single(op_swab),
+    'SXT': compile_sxt,
+    'MFPS': compile_mfps,
+    'MTPS': compile_mtps,
+    'MFPI': compile_mfp,
+    'MFPD': compile_mfp,
+    'MTPI': compile_mtp,
+    'MTPD': compile_mtp,
+    'XOR': compile_xor,
+    'MUL': compile_mul,
+    'DIV': compile_div,
+    'ASH': compile_ash,
+    'ASHC': compile_ashc,
+    'CCC': compile_condition_codes(0),
+    'SCC': compile_condition_codes(1),
+    'WAIT': compile_nop,
+    'RESET': compile_nop,
+}
+
+# Block terminators, compiler(emu, instr, addr, next_pc) -> exit returning the next pc
+
+BRANCH_TESTS = {
+    'BR': lambda e: True,
+    'BNE': lambda e: not e.z,
+    'BEQ': lambda e: e.z,
+    'BGE': lambda e: e.n == e.v,
+    'BLT': lambda e: e.n != e.v,
+    'BGT': lambda e: not e.z and e.n == e.v,
+    'BLE': lambda e: e.z or e.n != e.v,
+    'BPL': lambda e: not e.n,
+    'BMI': lambda e: e.n,
+    'BHI': lambda e: not e.c and not e.z,
+    'BLOS': lambda e: e.c or e.z,
+    'BVC': lambda e: not e.v,
+    'BVS': lambda e: e.v,
+    'BCC': lambda e: not e.c,
+    'BCS': lambda e: e.c,
+}
+
+def compile_branch(emu, instr, addr, next_pc):
+    target = (next_pc + instr.args[0].value * 2) & 0xffff
+    test = BRANCH_TESTS[instr.mnem]
+    if instr.mnem == 'BR':
+        return lambda: target
+    return lambda: target if test(emu) else next_pc
+
+def compile_sob(emu, instr, addr, next_pc):
+    r = emu.r
+    reg = instr.args[0].reg_idx
+    target = (next_pc - instr.args[1].value * 2) & 0xffff
+    def exit():
+        value = r[reg] = (r[reg] - 1) & 0xffff
+        return target if value else next_pc
+    return exit
+
+def compile_jmp(emu, instr, addr, next_pc):
+    arg = instr.args[0]
+    if arg.mode == 0:
+        return illegal(addr)
+    ea = effective_address(emu, instr, addr, arg, False)
+    r = emu.r
+    def exit():
+        r[7] = next_pc
+        return ea()
+    return exit
+
+def compile_jsr(emu, instr, addr, next_pc):
+    reg = instr.args[0].reg_idx
+    arg = instr.args[1]
+    if arg.mode == 0:
+        return illegal(addr)
+    ea = effective_address(emu, instr, addr, arg, False)
+    r = emu.r
+    push = emu.push
+    if reg == 7:
+        def exit():
+            r[7] = next_pc
+            target = ea()
+            push(next_pc)
+            return target
+    else:
+        def exit():
+            r[7] = next_pc
+            target = ea()
+            push(r[reg])
+            r[reg] = next_pc
+            return target
+    return exit
+
+def compile_rts(emu, instr, addr, next_pc):
+    reg = instr.args[0].reg_idx
+    r = emu.r
+    pop = emu.pop
+    if reg == 7:
+        return lambda: pop()
+    def exit():
+        target = r[reg]
+        r[reg] = pop()
+        return target
+    return exit
+
+def compile_mark(emu, instr, addr, next_pc):
+    r = emu.r
+    count = instr.args[0].value
+    def exit():
+        r[6] = (next_pc + 2 * count) & 0xffff
+        target = r[5]
+        r[5] = emu.pop()
+        return target
+    return exit
+
+def compile_rti(emu, instr, addr, next_pc):
+    def exit():
+        target = emu.pop()
+        emu.set_psw(emu.pop() & 0o17)
+        return target
+    return exit
+
+def compile_trap(emu, instr, addr, next_pc):
+    number = instr.args[0].value & 0xff
+    def exit():
+        emu.r[7] = next_pc
+        emu.syscall(number)
+        return next_pc
+    return exit
+
+def compile_halt(emu, instr, addr, next_pc):
+    def exit():
+        emu.halted = True
+        return addr
+    return exit
+
+def compile_unhandled_trap(emu, instr, addr, next_pc):
+    # Trap vectors aren't emulated, only TRAP as a system call is
+    return illegal(addr)
+
+terminators = dict((mnem, compile_branch) for mnem in BRANCH_TESTS)
+terminators.update({
+    'SOB': compile_sob,
+    'JMP': compile_jmp,
+    'JSR': compile_jsr,
+    'RTS': compile_rts,
+    'MARK': compile_mark,
+    'RTI': compile_rti,
+    'RTT': compile_rti,
+    'TRAP': compile_trap,
+    'HALT': compile_halt,
+    'EMT': compile_unhandled_trap,
+    'BPT': compile_unhandled_trap,
+    'IOT': compile_unhandled_trap,
+})
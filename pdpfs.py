@@ -0,0 +1,188 @@
+from collections import namedtuple
+from itertools import repeat
+from struct import unpack_from
+
+# Reads V7 and 2.11BSD file systems out of a disk image buffer (bytes, mmap or memoryview).
+# Nothing is parsed up front, inodes, block maps and directories are read when asked for, so
+# opening a large image costs nothing until something is looked up
+
+# See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/sys/h/inode.h
+IFMT = 0o170000
+IFDIR = 0o040000
+IFREG = 0o100000
+ROOTINO = 2
+INODE_SIZE = 64
+
+def pdp_long(buf, offset):
+    # longs are stored high word first
+    hi, lo = unpack_from('<HH', buf, offset)
+    return (hi << 16) | lo
+
+def v7_addr(buf, offset):
+    # V7 packs inode block numbers into 3 bytes, see l3tol
+    b0, b1, b2 = buf[offset], buf[offset + 1], buf[offset + 2]
+    return (b0 << 16) | b1 | (b2 << 8)
+
+def v7_entries(data):
+    # struct direct { ino_t d_ino; char d_name[14]; }
+    for offset in range(0, len(data) - 15, 16):
+        ino, = unpack_from('<H', data, offset)
+        if ino:
+            name = bytes(data[offset + 2:offset + 16]).split(b'\x00', 1)[0]
+            yield name.decode(errors='replace'), ino
+
+def bsd_entries(data):
+    # struct direct { ino_t d_ino; short d_reclen; short d_namlen; char d_name[]; }
+    offset = 0
+    while offset + 6 <= len(data):
+        ino, reclen, namlen = unpack_from('<HHH', data, offset)
+        if reclen < 6:
+            break
+        if ino:
+            yield bytes(data[offset + 6:offset + 6 + namlen]).decode(errors='replace'), ino
+        offset += reclen
+
+# block_size: DEV_BSIZE, ndaddr: direct block addresses in an inode, naddr: all of them
+# (the rest are single, double and triple indirect), addr_size/read_addr: how di_addr is packed
+FsLayout = namedtuple('FsLayout', ['name', 'block_size', 'ndaddr', 'naddr', 'addr_size', 'read_addr', 'entries'])
+
+V7_FS = FsLayout('v7', 512, 10, 13, 3, v7_addr, v7_entries)
+BSD211_FS = FsLayout('2.11bsd', 1024, 4, 7, 4, pdp_long, bsd_entries)
+FS_LAYOUTS = (BSD211_FS, V7_FS)
+
+Inode = namedtuple('Inode', ['ino', 'mode', 'nlink', 'uid', 'gid', 'size', 'addrs'])
+
+class FileSystem:
+    def __init__(self, image, layout, offset=0):
+        self.image = memoryview(image).cast('B')
+        self.layout = layout
+        self.offset = offset
+        self.inodes = {}
+        # Superblock is block 1, s_isize is the first block past the inode list
+        self.isize, = unpack_from('<H', self.image, offset + layout.block_size)
+        self.fsize = pdp_long(self.image, offset + layout.block_size + 2)
+
+    @classmethod
+    def detect(cls, image, offset=0):
+        # Returns a FileSystem if the image holds one of the known layouts at offset, else None
+        for layout in FS_LAYOUTS:
+            try:
+                fs = cls(image, layout, offset)
+                if fs.looks_valid():
+                    return fs
+            except (ValueError, IndexError):
+                continue
+        return None
+
+    def looks_valid(self):
+        block_size = self.layout.block_size
+        if not 2 < self.isize < self.fsize or self.offset + self.fsize * block_size > len(self.image) + block_size:
+            return False
+        root = self.inode(ROOTINO)
+        return (root.mode & IFMT) == IFDIR and 0 < root.size and root.addrs[0] != 0
+
+    def ninodes(self):
+        return (self.isize - 2) * (self.layout.block_size // INODE_SIZE)
+
+    def block(self, bno):
+        start = self.offset + bno * self.layout.block_size
+        return self.image[start:start + self.layout.block_size]
+
+    def inode(self, ino):
+        inode = self.inodes.get(ino)
+        if inode is not None:
+            return inode
+        if not 0 < ino <= self.ninodes():
+            raise ValueError('bad inode number %d' % ino)
+        layout = self.layout
+        offset = self.offset + 2 * layout.block_size + (ino - 1) * INODE_SIZE
+        mode, nlink, uid, gid = unpack_from('<4H', self.image, offset)
+        size = pdp_long(self.image, offset + 8)
+        addrs = tuple(layout.read_addr(self.image, offset + 12 + i * layout.addr_size) for i in range(layout.naddr))
+        inode = self.inodes[ino] = Inode(ino, mode, nlink, uid, gid, size, addrs)
+        return inode
+
+    def indirect(self, bno, level):
+        # Yields the data block numbers under an indirect block. A missing one is a hole
+        if bno == 0:
+            yield from repeat(0, (self.layout.block_size // 4) ** level)
+            return
+        block = self.block(bno)
+        for i in range(0, len(block), 4):
+            addr = pdp_long(block, i)
+            if level == 1:
+                yield addr
+            else:
+                yield from self.indirect(addr, level - 1)
+
+    def blocks(self, inode):
+        # Block numbers of a file's contents in order, 0 for holes
+        count = (inode.size + self.layout.block_size - 1) // self.layout.block_size
+        ndaddr = self.layout.ndaddr
+
+        def walk():
+            yield from inode.addrs[:ndaddr]
+            for level, bno in enumerate(inode.addrs[ndaddr:], 1):
+                yield from self.indirect(bno, level)
+
+        for i, bno in enumerate(walk()):
+            if i >= count:
+                break
+            yield bno
+
+    def extents(self, inode):
+        # (image offset, length) runs of a file's contents, so callers can slice the image
+        # directly rather than copy the file out
+        block_size = self.layout.block_size
+        remaining = inode.size
+        extents = []
+        for bno in self.blocks(inode):
+            length = min(block_size, remaining)
+            remaining -= length
+            if bno == 0:
+                extents.append((None, length))
+                continue
+            start = self.offset + bno * block_size
+            if extents and extents[-1][0] is not None and extents[-1][0] + extents[-1][1] == start:
+                extents[-1] = (extents[-1][0], extents[-1][1] + length)
+            else:
+                extents.append((start, length))
+        return extents
+
+    def read(self, inode):
+        if isinstance(inode, int):
+            inode = self.inode(inode)
+        parts = []
+        for start, length in self.extents(inode):
+            parts.append(b'\x00' * length if start is None else self.image[start:start + length])
+        return b''.join(parts)
+
+    def listdir(self, inode):
+        if isinstance(inode, int):
+            inode = self.inode(inode)
+        if (inode.mode & IFMT) != IFDIR:
+            raise ValueError('inode %d is not a directory' % inode.ino)
+        return dict(self.layout.entries(self.read(inode)))
+
+    def lookup(self, path):
+        inode = self.inode(ROOTINO)
+        for name in path.strip('/').split('/'):
+            if not name:
+                continue
+            ino = self.listdir(inode).get(name)
+            if ino is None:
+                raise ValueError('%s: no such file' % path)
+            inode = self.inode(ino)
+        return inode
+
+    def walk(self, path='/'):
+        # Yields (path, inode) for everything under path, depth first
+        def walk(path, inode):
+            yield path, inode
+            if (inode.mode & IFMT) != IFDIR:
+                return
+            for name, ino in sorted(self.listdir(inode).items()):
+                if name not in ('.', '..'):
+                    yield from walk(path.rstrip('/') + '/' + name, self.inode(ino))
+
+        return walk(path, self.lookup(path))
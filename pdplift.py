@@ -0,0 +1,619 @@
+from binaryninja import *
+from binaryninja.lowlevelil import LLIL_TEMP
+from .pdpdisasm import *
+from . import pdpdisasm
+
+IL_REGISTERS = [
+    'r0', 'r1', 'r2', 'r3', 'r4', 'r5', 'sp', 'pc'
+]
+
+# Mnemonics that work on bytes, the rest work on words
+BYTE_OPS = [
+    'MOVB', 'CMPB', 'BITB', 'BICB', 'BISB',
+    'CLRB', 'COMB', 'INCB', 'DECB', 'NEGB', 'ADCB', 'SBCB', 'TSTB', 'RORB', 'ROLB', 'ASRB', 'ASLB',
+]
+
+# Flag write class used by each mnemonic, see the PDP-11 processor handbook. 'nzv' and 'zv' always
+# clear V (PDP11.get_flag_write_low_level_il), 'nzv*' computes it and leaves C alone, as INC and
+# DEC do. Mnemonics that aren't listed either leave the condition codes alone or set them
+# explicitly in their lifter, as the shifts, rotates and EIS instructions do since binja's
+# default flags don't follow the PDP-11 rules for them
+FLAG_WRITES = {
+    'MOV': 'nzv', 'MOVB': 'nzv',
+    'CMP': '*', 'CMPB': '*',
+    'BIT': 'nzv', 'BITB': 'nzv',
+    'BIC': 'nzv', 'BICB': 'nzv',
+    'BIS': 'nzv', 'BISB': 'nzv',
+    'ADD': '*',
+    'SUB': '*',
+
+    'XOR': 'nzv',
+
+    'COM': 'nzv', 'COMB': 'nzv',
+    'INC': 'nzv*', 'INCB': 'nzv*',
+    'DEC': 'nzv*', 'DECB': 'nzv*',
+    'NEG': '*', 'NEGB': '*',
+    'ADC': '*', 'ADCB': '*',
+    'SBC': '*', 'SBCB': '*',
+    'TST': '*', 'TSTB': '*',
+    'MTPI': 'nzv', 'MTPD': 'nzv',
+    'SXT': 'zv',
+}
+
+BRANCH_CONDITIONS = {
+    'BNE': LowLevelILFlagCondition.LLFC_NE,
+    'BEQ': LowLevelILFlagCondition.LLFC_E,
+    'BGE': LowLevelILFlagCondition.LLFC_SGE,
+    'BLT': LowLevelILFlagCondition.LLFC_SLT,
+    'BGT': LowLevelILFlagCondition.LLFC_SGT,
+    'BLE': LowLevelILFlagCondition.LLFC_SLE,
+    'BPL': LowLevelILFlagCondition.LLFC_POS,
+    'BMI': LowLevelILFlagCondition.LLFC_NEG,
+    'BHI': LowLevelILFlagCondition.LLFC_UGT,
+    'BLOS': LowLevelILFlagCondition.LLFC_ULE,
+    'BVC': LowLevelILFlagCondition.LLFC_NO,
+    'BVS': LowLevelILFlagCondition.LLFC_O,
+    'BCC': LowLevelILFlagCondition.LLFC_UGE,
+    'BCS': LowLevelILFlagCondition.LLFC_ULT,
+}
+
+class Operand:
+    # Where an operand lives once its addressing mode has been applied: a register, a memory
+    # address held in an IL expression, or an immediate
+    def __init__(self, kind, reg=None, addr=None, value=None):
+        self.kind = kind
+        self.reg = reg
+        self.addr = addr
+        self.value = value
+
+class PDP11Lifter:
+    def __init__(self, arch, il, instr, addr):
+        self.arch = arch
+        self.il = il
+        self.instr = instr
+        self.addr = addr
+        self.next_addr = addr + instr.length
+        self.size = 1 if instr.mnem in BYTE_OPS else 2
+        self.flags = FLAG_WRITES.get(instr.mnem)
+        self.temps = 0
+
+    def lift(self):
+        handler = pdp11_lifters.get(self.instr.mnem)
+        if handler is None:
+            self.il.append(self.il.unimplemented())
+        elif any(isinstance(arg, AddressedArg) and arg.reg_idx == 7 and arg.mode in [4, 5] for arg in self.instr.args):
+            # Autodecrementing the PC runs whatever is before the instruction, not worth modelling
+            self.il.append(self.il.undefined())
+        else:
+            handler(self)
+
+    def temp(self, value, size=2):
+        reg = LLIL_TEMP(self.temps)
+        self.temps += 1
+        self.il.append(self.il.set_reg(size, reg, value))
+        return self.il.reg(size, reg)
+
+    def operand(self, arg, size, code=False):
+        # Applies the addressing mode, including autoincrement/decrement side effects, and returns
+        # where the operand lives. Addresses are copied into temps so later side effects on the
+        # same register don't change them. Constant addresses go through the address map, as
+        # code for JMP/JSR targets and as data otherwise. Addresses held in registers are left
+        # as the 16-bit ones, binja's stack analysis needs sp and friends to stay that way
+        il = self.il
+        reg, mode = arg.reg_idx, arg.mode
+        imm = arg.imm & 0xffff if arg.has_imm() else 0
+
+        if reg == 7:
+            addresses = pdpdisasm.address_map
+            resolve = addresses.code if code else addresses.data
+            pc = operand_pc(self.instr, self.addr, arg)
+            if mode == 0:
+                return Operand('pc', value=il.const_pointer(2, pc))
+            if mode == 1:
+                return Operand('mem', addr=il.const_pointer(2, resolve(self.addr, pc)))
+            if mode == 2:
+                # Immediates live in the instruction stream, so they can be written as well
+                value = il.const(size, imm & (0xff if size == 1 else 0xffff))
+                return Operand('imm', addr=il.const_pointer(2, pc - 2), value=value)
+            if mode == 3:
+                return Operand('mem', addr=il.const_pointer(2, resolve(self.addr, imm)))
+            if mode == 6:
+                return Operand('mem', addr=il.const_pointer(2, resolve(self.addr, pc + imm)))
+            if mode == 7:
+                # The pointer is data even when what it points at is code
+                pointer = il.const_pointer(2, addresses.data(self.addr, pc + imm))
+                return Operand('mem', addr=self.temp(il.load(2, pointer)))
+            return None
+
+        name = IL_REGISTERS[reg]
+        # SP always steps by a word to stay aligned
+        step = 2 if size == 2 or reg == 6 else 1
+        if mode == 0:
+            return Operand('reg', reg=name)
+        if mode == 1:
+            return Operand('mem', addr=self.temp(il.reg(2, name)))
+        if mode == 2:
+            addr = self.temp(il.reg(2, name))
+            il.append(il.set_reg(2, name, il.add(2, il.reg(2, name), il.const(2, step))))
+            return Operand('mem', addr=addr)
+        if mode == 3:
+            addr = self.temp(il.load(2, il.reg(2, name)))
+            il.append(il.set_reg(2, name, il.add(2, il.reg(2, name), il.const(2, 2))))
+            return Operand('mem', addr=addr)
+        if mode == 4:
+            il.append(il.set_reg(2, name, il.sub(2, il.reg(2, name), il.const(2, step))))
+            return Operand('mem', addr=self.temp(il.reg(2, name)))
+        if mode == 5:
+            il.append(il.set_reg(2, name, il.sub(2, il.reg(2, name), il.const(2, 2))))
+            return Operand('mem', addr=self.temp(il.load(2, il.reg(2, name))))
+        if mode == 6:
+            return Operand('mem', addr=self.temp(il.add(2, il.reg(2, name), il.const(2, imm))))
+        if mode == 7:
+            return Operand('mem', addr=self.temp(il.load(2, il.add(2, il.reg(2, name), il.const(2, imm)))))
+        return None
+
+    def read(self, op, size):
+        il = self.il
+        if op.kind in ('imm', 'pc'):
+            return op.value
+        if op.kind == 'reg':
+            if size == 1:
+                return il.low_part(1, il.reg(2, op.reg))
+            return il.reg(2, op.reg)
+        return il.load(size, op.addr)
+
+    def write(self, op, size, value, flags=None):
+        il = self.il
+        if op.kind == 'reg':
+            if size == 1:
+                # Byte writes to a register only touch the low byte, except MOVB which sign extends
+                # (handled by the caller)
+                high = il.and_expr(2, il.reg(2, op.reg), il.const(2, 0xff00))
+                value = il.or_expr(2, high, il.zero_extend(2, value))
+                il.append(il.set_reg(2, op.reg, value, flags=flags))
+            else:
+                il.append(il.set_reg(2, op.reg, value, flags=flags))
+        elif op.kind == 'pc':
+            il.append(il.jump(value))
+        else:
+            il.append(il.store(size, op.addr, value, flags=flags))
+
+    def source_dest(self):
+        # Double operand instructions evaluate the source fully before the destination, so the
+        # source value is snapshotted if the destination has side effects it could observe
+        src_arg, dst_arg = self.instr.args
+        src = self.operand(src_arg, self.size)
+        value = self.read(src, self.size)
+        if 2 <= dst_arg.mode <= 5 and src.kind == 'reg':
+            if self.size == 1:
+                value = self.il.low_part(1, self.temp(self.il.zero_extend(2, value)))
+            else:
+                value = self.temp(value)
+        dst = self.operand(dst_arg, self.size)
+        return value, dst
+
+    def label_for(self, target):
+        return self.il.get_label_for_address(self.arch, target)
+
+    def goto(self, target):
+        il = self.il
+        label = self.label_for(target)
+        if label is None:
+            il.append(il.jump(il.const_pointer(2, target)))
+        else:
+            il.append(il.goto(label))
+
+    def branch(self, cond, target):
+        il = self.il
+        t = self.label_for(target)
+        indirect = t is None
+        if indirect:
+            t = LowLevelILLabel()
+        f = self.label_for(self.next_addr)
+        f_found = f is not None
+        if not f_found:
+            f = LowLevelILLabel()
+
+        il.append(il.if_expr(cond, t, f))
+        if indirect:
+            il.mark_label(t)
+            il.append(il.jump(il.const_pointer(2, target)))
+        if not f_found:
+            il.mark_label(f)
+
+    def target(self, arg):
+        # Branch target of a JMP/JSR operand, which is the operand's address rather than its value
+        op = self.operand(arg, 2, code=True)
+        if op is None or op.kind != 'mem':
+            return None
+        return op.addr
+
+    def const_target(self, arg):
+        if arg.reg_idx != 7 or arg.mode not in [3, 6]:
+            return None
+        return pdpdisasm.address_map.code(self.addr, arg.get_value(operand_pc(self.instr, self.addr, arg)))
+
+def lift_mov(l):
+    il = l.il
+    src_arg, dst_arg = l.instr.args
+    if dst_arg.mode == 0 and dst_arg.reg_idx == 7:
+        src = l.operand(src_arg, 2)
+        if src_arg.mode == 2 and src_arg.reg_idx == 6:
+            il.append(il.ret(l.read(src, 2)))
+        else:
+            il.append(il.jump(l.read(src, 2)))
+        return
+    value, dst = l.source_dest()
+    if l.size == 1 and dst.kind == 'reg':
+        # MOVB to a register sign extends into the whole register
+        il.append(il.set_reg(2, dst.reg, il.sign_extend(2, value), flags=l.flags))
+    else:
+        l.write(dst, l.size, value, flags=l.flags)
+
+def lift_cmp(l):
+    value, dst = l.source_dest()
+    # Unlike most architectures CMP is src - dst
+    l.il.append(l.il.sub(l.size, value, l.read(dst, l.size), flags=l.flags))
+
+def lift_bit(l):
+    value, dst = l.source_dest()
+    l.il.append(l.il.and_expr(l.size, value, l.read(dst, l.size), flags=l.flags))
+
+def lift_bic(l):
+    il = l.il
+    value, dst = l.source_dest()
+    l.write(dst, l.size, il.and_expr(l.size, l.read(dst, l.size), il.not_expr(l.size, value), flags=l.flags))
+
+def lift_bis(l):
+    value, dst = l.source_dest()
+    l.write(dst, l.size, l.il.or_expr(l.size, l.read(dst, l.size), value, flags=l.flags))
+
+def lift_add(l):
+    value, dst = l.source_dest()
+    l.write(dst, l.size, l.il.add(l.size, l.read(dst, l.size), value, flags=l.flags))
+
+def lift_sub(l):
+    value, dst = l.source_dest()
+    l.write(dst, l.size, l.il.sub(l.size, l.read(dst, l.size), value, flags=l.flags))
+
+def lift_jsr(l):
+    il = l.il
+    reg_arg, dst_arg = l.instr.args
+    target = l.target(dst_arg)
+    if target is None:
+        il.append(il.undefined())
+        return
+    if reg_arg.reg_idx == 7:
+        il.append(il.call(target))
+        return
+    # Linkage register: old value goes on the stack and it gets the return address
+    reg = IL_REGISTERS[reg_arg.reg_idx]
+    il.append(il.push(2, il.reg(2, reg)))
+    il.append(il.set_reg(2, reg, il.const_pointer(2, l.next_addr)))
+    il.append(il.call(target))
+
+def lift_rts(l):
+    il = l.il
+    reg_idx = l.instr.args[0].reg_idx
+    if reg_idx == 7:
+        il.append(il.ret(il.pop(2)))
+        return
+    reg = IL_REGISTERS[reg_idx]
+    link = l.temp(il.reg(2, reg))
+    il.append(il.set_reg(2, reg, il.pop(2)))
+    il.append(il.ret(link))
+
+def lift_jmp(l):
+    il = l.il
+    arg = l.instr.args[0]
+    target = l.const_target(arg)
+    if target is not None:
+        l.goto(target)
+        return
+    addr = l.target(arg)
+    if addr is None:
+        il.append(il.undefined())
+    else:
+        il.append(il.jump(addr))
+
+def bit_set(il, size, value, bit):
+    return il.compare_not_equal(size, il.and_expr(size, value, il.const(size, 1 << bit)), il.const(size, 0))
+
+def overflows(il, size, value, fit):
+    # Whether a signed value of size bytes doesn't fit in fit bytes
+    return il.compare_not_equal(size, value, il.sign_extend(size, il.low_part(fit, value)))
+
+def set_nz(il, size, value):
+    set_flags(il, n=il.compare_signed_less_than(size, value, il.const(size, 0)), z=il.compare_equal(size, value, il.const(size, 0)))
+
+def lift_mul(l):
+    # C is set when the product doesn't fit in one word, V is always cleared
+    il = l.il
+    reg_arg, src_arg = l.instr.args
+    reg_idx = reg_arg.reg_idx
+    src = l.read(l.operand(src_arg, 2), 2)
+    reg = IL_REGISTERS[reg_idx]
+    product = l.temp(il.mult(4, il.sign_extend(4, il.reg(2, reg)), il.sign_extend(4, src)), 4)
+    if reg_idx % 2 == 0:
+        # Even register gets the high word and the next register the low word
+        il.append(il.set_reg_split(2, reg, IL_REGISTERS[reg_idx + 1], product))
+    else:
+        il.append(il.set_reg(2, reg, il.low_part(2, product)))
+    set_nz(il, 4, product)
+    set_flags(il, v=il.const(0, 0), c=overflows(il, 4, product, 2))
+
+def lift_div(l):
+    # A zero divisor sets V and C, a quotient that doesn't fit in a word sets V. Either way the
+    # registers are left alone
+    il = l.il
+    reg_arg, src_arg = l.instr.args
+    reg_idx = reg_arg.reg_idx
+    if reg_idx % 2 != 0:
+        il.append(il.undefined())
+        return
+    hi, lo = IL_REGISTERS[reg_idx], IL_REGISTERS[reg_idx + 1]
+    divisor = l.temp(l.read(l.operand(src_arg, 2), 2))
+    by_zero, divide, fits, overflow, done = [LowLevelILLabel() for _ in range(5)]
+
+    il.append(il.if_expr(il.compare_equal(2, divisor, il.const(2, 0)), by_zero, divide))
+    il.mark_label(by_zero)
+    set_flags(il, v=il.const(0, 1), c=il.const(0, 1))
+    il.append(il.goto(done))
+
+    il.mark_label(divide)
+    quotient = l.temp(il.div_signed(4, il.reg_split(2, hi, lo), il.sign_extend(4, divisor)), 4)
+    remainder = l.temp(il.mod_signed(4, il.reg_split(2, hi, lo), il.sign_extend(4, divisor)), 4)
+    il.append(il.if_expr(overflows(il, 4, quotient, 2), overflow, fits))
+    il.mark_label(overflow)
+    set_flags(il, v=il.const(0, 1), c=il.const(0, 0))
+    il.append(il.goto(done))
+
+    il.mark_label(fits)
+    il.append(il.set_reg(2, hi, il.low_part(2, quotient)))
+    il.append(il.set_reg(2, lo, il.low_part(2, remainder)))
+    set_nz(il, 2, il.reg(2, hi))
+    set_flags(il, v=il.const(0, 0), c=il.const(0, 0))
+    il.mark_label(done)
+
+def shift_count(arg):
+    # ASH/ASHC shift by the low 6 bits of the source as a signed count, only immediate counts lift
+    if arg.mode != 2 or arg.reg_idx != 7:
+        return None
+    return sign_extend(arg.imm & 0o77, 6)
+
+def arith_shift(l, size, value, count):
+    # value (size bytes) shifted left by a positive count or right by a negative one, returning
+    # the result. V is set if the sign changes at any point during the shift, C is the last bit
+    # shifted out
+    il = l.il
+    bits = size * 8
+    if count > 0:
+        # Counts go up to 31, so shift at 64 bits where nothing gets lost
+        wide = l.temp(il.shift_left(8, il.sign_extend(8, value), il.const(1, count)), 8)
+        result = il.low_part(size, wide)
+        v, c = overflows(il, 8, wide, size), bit_set(il, 8, wide, bits)
+    elif count < 0:
+        old = l.temp(value, size)
+        result = il.arith_shift_right(size, old, il.const(1, -count))
+        v, c = il.const(0, 0), bit_set(il, size, old, min(-count - 1, bits - 1))
+    else:
+        result = value
+        v, c = il.const(0, 0), il.const(0, 0)
+    return result, v, c
+
+def lift_ash(l):
+    il = l.il
+    reg_arg, src_arg = l.instr.args
+    count = shift_count(src_arg)
+    if count is None:
+        il.append(il.unimplemented())
+        return
+    reg = IL_REGISTERS[reg_arg.reg_idx]
+    result, v, c = arith_shift(l, 2, il.reg(2, reg), count)
+    il.append(il.set_reg(2, reg, result))
+    set_nz(il, 2, il.reg(2, reg))
+    set_flags(il, v=v, c=c)
+
+def lift_ashc(l):
+    il = l.il
+    reg_arg, src_arg = l.instr.args
+    count = shift_count(src_arg)
+    reg_idx = reg_arg.reg_idx
+    if count is None or reg_idx % 2 != 0:
+        il.append(il.unimplemented())
+        return
+    hi, lo = IL_REGISTERS[reg_idx], IL_REGISTERS[reg_idx + 1]
+    result, v, c = arith_shift(l, 4, il.reg_split(2, hi, lo), count)
+    il.append(il.set_reg_split(2, hi, lo, result))
+    set_nz(il, 4, il.reg_split(2, hi, lo))
+    set_flags(il, v=v, c=c)
+
+def lift_xor(l):
+    il = l.il
+    reg_arg, dst_arg = l.instr.args
+    value = il.reg(2, IL_REGISTERS[reg_arg.reg_idx])
+    dst = l.operand(dst_arg, 2)
+    l.write(dst, 2, il.xor_expr(2, l.read(dst, 2), value, flags=l.flags))
+
+def single(op):
+    # Lifter for a single operand read-modify-write instruction, op builds the new value
+    def lift(l):
+        dst = l.operand(l.instr.args[0], l.size)
+        if dst is None:
+            l.il.append(l.il.undefined())
+            return
+        l.write(dst, l.size, op(l, l.read(dst, l.size)))
+    return lift
+
+def set_flags(il, **values):
+    for flag, value in values.items():
+        il.append(il.set_flag(flag, value))
+
+def shift_one(op, carry_bit):
+    # ASR/ASL/ROR/ROL: C gets the bit shifted out, bit 0 or the sign bit, and V is N xor C after
+    # the shift. op builds the result from the old value, reading the old C for rotates
+    def lift(l):
+        il = l.il
+        size = l.size
+        dst = l.operand(l.instr.args[0], size)
+        if dst is None:
+            il.append(il.undefined())
+            return
+        old = l.temp(l.read(dst, size), size)
+        result = l.temp(op(il, size, old), size)
+        l.write(dst, size, result)
+        set_nz(il, size, result)
+        set_flags(il, c=bit_set(il, size, old, 0 if carry_bit == 'low' else size * 8 - 1))
+        set_flags(il, v=il.xor_expr(0, il.flag('n'), il.flag('c')))
+    return lift
+
+def lift_clr(l):
+    il = l.il
+    dst = l.operand(l.instr.args[0], l.size)
+    l.write(dst, l.size, il.const(l.size, 0))
+    set_flags(il, n=il.const(0, 0), z=il.const(0, 1), v=il.const(0, 0), c=il.const(0, 0))
+
+def lift_com(l):
+    il = l.il
+    single(lambda l, v: il.not_expr(l.size, v, flags=l.flags))(l)
+    set_flags(il, c=il.const(0, 1))
+
+lift_ror = shift_one(lambda il, size, v: il.rotate_right_carry(size, v, il.const(1, 1), il.flag('c')), 'low')
+lift_rol = shift_one(lambda il, size, v: il.rotate_left_carry(size, v, il.const(1, 1), il.flag('c')), 'sign')
+lift_asr = shift_one(lambda il, size, v: il.arith_shift_right(size, v, il.const(1, 1)), 'low')
+lift_asl = shift_one(lambda il, size, v: il.shift_left(size, v, il.const(1, 1)), 'sign')
+
+def lift_swab(l):
+    # N and Z come from the low byte of the result, which a flag write class can't express
+    il = l.il
+    dst = l.operand(l.instr.args[0], 2)
+    value = l.temp(il.rotate_left(2, l.read(dst, 2), il.const(1, 8)))
+    l.write(dst, 2, value)
+    low = il.low_part(1, value)
+    set_flags(il, n=il.compare_signed_less_than(1, low, il.const(1, 0)), z=il.compare_equal(1, low, il.const(1, 0)),
+              v=il.const(0, 0), c=il.const(0, 0))
+
+def lift_tst(l):
+    dst = l.operand(l.instr.args[0], l.size)
+    l.il.append(l.il.sub(l.size, l.read(dst, l.size), l.il.const(l.size, 0), flags=l.flags))
+
+def lift_sxt(l):
+    il = l.il
+    dst = l.operand(l.instr.args[0], 2)
+    l.write(dst, 2, il.neg_expr(2, il.bool_to_int(2, il.flag('n'))), flags=l.flags)
+
+def lift_mfp(l):
+    # Previous address space isn't modelled, so these act like a push/pop in the current one
+    il = l.il
+    src = l.operand(l.instr.args[0], 2)
+    il.append(il.push(2, l.read(src, 2)))
+
+def lift_mtp(l):
+    il = l.il
+    dst = l.operand(l.instr.args[0], 2)
+    l.write(dst, 2, il.pop(2), flags=l.flags)
+
+def lift_br(l):
+    l.goto(l.addr + l.instr.length + l.instr.args[0].value*2)
+
+def lift_conditional(l):
+    cond = l.il.flag_condition(BRANCH_CONDITIONS[l.instr.mnem])
+    l.branch(cond, l.addr + l.instr.length + l.instr.args[0].value*2)
+
+def lift_sob(l):
+    il = l.il
+    reg_arg, offset_arg = l.instr.args
+    reg = IL_REGISTERS[reg_arg.reg_idx]
+    il.append(il.set_reg(2, reg, il.sub(2, il.reg(2, reg), il.const(2, 1))))
+    cond = il.compare_not_equal(2, il.reg(2, reg), il.const(2, 0))
+    l.branch(cond, l.addr + l.instr.length - offset_arg.value*2)
+
+def lift_rti(l):
+    il = l.il
+    pc = l.temp(il.pop(2))
+    l.temp(il.pop(2)) # PSW
+    il.append(il.ret(pc))
+
+def lift_trap(l):
+    # 2.11BSD system calls are TRAP with the syscall number in the low byte
+    l.il.append(l.il.system_call())
+
+def lift_emt(l):
+    l.il.append(l.il.trap(l.instr.args[0].value & 0xff))
+
+def set_condition_codes(value):
+    def lift(l):
+        il = l.il
+        mask = l.instr.args[0].value
+        for bit, flag in [(1, 'c'), (2, 'v'), (4, 'z'), (8, 'n')]:
+            if mask & bit:
+                il.append(il.set_flag(flag, il.const(0, value)))
+        if mask == 0:
+            il.append(il.nop())
+    return lift
+
+pdp11_lifters = {
+    'MOV': lift_mov, 'MOVB': lift_mov,
+    'CMP': lift_cmp, 'CMPB': lift_cmp,
+    'BIT': lift_bit, 'BITB': lift_bit,
+    'BIC': lift_bic, 'BICB': lift_bic,
+    'BIS': lift_bis, 'BISB': lift_bis,
+    'ADD': lift_add,
+    'SUB': lift_sub,
+
+    'JSR': lift_jsr,
+    'MUL': lift_mul,
+    'DIV': lift_div,
+    'ASH': lift_ash,
+    'ASHC': lift_ashc,
+    'XOR': lift_xor,
+
+    'JMP': lift_jmp,
+    'SWAB': lift_swab,
+    'CLR': lift_clr, 'CLRB': lift_clr,
+    'COM': lift_com, 'COMB': lift_com,
+    'INC': single(lambda l, v: l.il.add(l.size, v, l.il.const(l.size, 1), flags=l.flags)),
+    'INCB': single(lambda l, v: l.il.add(l.size, v, l.il.const(l.size, 1), flags=l.flags)),
+    'DEC': single(lambda l, v: l.il.sub(l.size, v, l.il.const(l.size, 1), flags=l.flags)),
+    'DECB': single(lambda l, v: l.il.sub(l.size, v, l.il.const(l.size, 1), flags=l.flags)),
+    'NEG': single(lambda l, v: l.il.neg_expr(l.size, v, flags=l.flags)),
+    'NEGB': single(lambda l, v: l.il.neg_expr(l.size, v, flags=l.flags)),
+    'ADC': single(lambda l, v: l.il.add_carry(l.size, v, l.il.const(l.size, 0), l.il.flag('c'), flags=l.flags)),
+    'ADCB': single(lambda l, v: l.il.add_carry(l.size, v, l.il.const(l.size, 0), l.il.flag('c'), flags=l.flags)),
+    'SBC': single(lambda l, v: l.il.sub_borrow(l.size, v, l.il.const(l.size, 0), l.il.flag('c'), flags=l.flags)),
+    'SBCB': single(lambda l, v: l.il.sub_borrow(l.size, v, l.il.const(l.size, 0), l.il.flag('c'), flags=l.flags)),
+    'TST': lift_tst, 'TSTB': lift_tst,
+    'ROR': lift_ror, 'RORB': lift_ror,
+    'ROL': lift_rol, 'ROLB': lift_rol,
+    'ASR': lift_asr, 'ASRB': lift_asr,
+    'ASL': lift_asl, 'ASLB': lift_asl,
+    'MFPI': lift_mfp, 'MFPD': lift_mfp,
+    'MTPI': lift_mtp, 'MTPD': lift_mtp,
+    'SXT': lift_sxt,
+
+    'BR': lift_br,
+    **{mnem: lift_conditional for mnem in BRANCH_CONDITIONS},
+    'EMT': lift_emt,
+    'TRAP': lift_trap,
+
+    'SOB': lift_sob,
+    'RTS': lift_rts,
+
+    'HALT': lambda l: l.il.append(l.il.no_ret()),
+    'WAIT': lambda l: l.il.append(l.il.nop()),
+    'RTI': lift_rti,
+    'BPT': lambda l: l.il.append(l.il.trap(0o14)),
+    'IOT': lambda l: l.il.append(l.il.trap(0o20)),
+    'RESET': lambda l: l.il.append(l.il.nop()),
+    'RTT': lift_rti,
+
+    'CCC': set_condition_codes(0),
+    'SCC': set_condition_codes(1),
+}
+
+def pdp11_lift(arch, data, addr, il):
+    instr, _ = pdp11_cache.decode(data, addr)
+    if instr is None:
+        return None
+    PDP11Lifter(arch, il, instr, addr).lift()
+    return instr.length
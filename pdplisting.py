@@ -0,0 +1,60 @@
+from .pdpaout import *
+from .pdpdisasm import *
+
+def text_labels(syms, ovly=0):
+    labels = {}
+    for n_name, n_type, n_ovly, n_value in syms:
+        if (n_type & N_TYPE) == N_TEXT and n_ovly == ovly:
+            labels.setdefault(n_value, n_name)
+    return labels
+
+def text_listing(lines, text, base, labels):
+    words = read_words(text)
+    for addr, instr in pdp11_disasm_iter(text, base):
+        index = (addr - base) // 2
+        if addr in labels:
+            lines.append('%s:' % labels[addr])
+        if instr is None:
+            word = words[index]
+            lines.append('%06o: %-22s .word %06o' % (addr, '%06o' % word, word))
+            continue
+        raw = ' '.join('%06o' % words[i] for i in range(index, min(index + instr.length // 2, len(words))))
+        line = '%06o: %-22s %s' % (addr, raw, pdp11_text(instr, addr))
+        targets = [labels[target] for _, target in pdp11_branches(instr, addr) if target in labels]
+        if targets:
+            line += ' ; ' + ', '.join(targets)
+        lines.append(line)
+
+def aout_listing(data, name):
+    header = AOutHeader(data)
+    syms = read_symbols(data, header)
+
+    lines = [
+        '; %s' % name,
+        '; magic=%o text=%o data=%o bss=%o syms=%o entry=%o' % (header.a_magic, header.a_text, header.a_data, header.a_bss, header.a_syms, header.a_entry),
+        '',
+    ]
+
+    # Addresses are the real 16-bit ones, overlays are listed one after another since they
+    # all share the same range
+    for seg in header.segments():
+        if seg.kind != 'text':
+            continue
+        if seg.ovly:
+            lines.append('')
+            lines.append('; overlay %d' % seg.ovly)
+        text = memoryview(data)[seg.file_offset:seg.file_offset + seg.file_size]
+        text_listing(lines, text, seg.vaddr & 0xffff, text_labels(syms, seg.ovly))
+
+    data_syms = [(n_value, n_name) for n_name, n_type, _, n_value in syms if (n_type & N_TYPE) in (N_DATA, N_BSS)]
+    if data_syms:
+        lines.append('')
+        for n_value, n_name in sorted(data_syms):
+            lines.append('%06o: %s' % (n_value, n_name))
+
+    return '\n'.join(lines) + '\n'
+
+def file_listing(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    return aout_listing(data, path)
@@ -0,0 +1,132 @@
+from collections import Counter
+from contextlib import contextmanager
+from threading import Lock
+from time import monotonic, perf_counter
+import json
+import os
+
+# Opt-in counters and timers for the decoder, renderer and view. Off by default, instrumented code
+# only checks metrics.enabled. From the binja console:
+#
+#   from pdp11.pdpmetrics import metrics
+#   metrics.enable()
+#   ... # analyse something
+#   print(metrics.report())
+#   metrics.dump('/tmp/pdp11-metrics.json')
+#
+# Setting PDP11_METRICS=1 in the environment turns them on at load
+#
+# Undecodable words are always aggregated, by opcode bits (operand field masked off) and mode, and
+# summarised through reporter on the first one, then at most once every report_interval seconds,
+# since analysis asks about every word of a data region that ends up inside a function
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.lock = Lock()
+        # Called with a summary line about unknown opcodes, straight away for the first one and
+        # then at most once per report_interval
+        self.reporter = None
+        self.report_interval = 10.0
+        # name -> callable returning a dict, included in snapshots (e.g. decode cache stats)
+        self.sources = {}
+        self.reset()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self.lock:
+            self.counters = Counter()
+            # name -> [calls, total seconds, longest]
+            self.timers = {}
+            self.unknown = Counter()
+            self.unknown_since_report = 0
+            # None until the first report
+            self.last_report = None
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += n
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+
+    @contextmanager
+    def timer(self, name):
+        # For coarse sections like view init. Hot paths check enabled and call add_time themselves
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, perf_counter() - start)
+
+    def add_source(self, name, stats):
+        self.sources[name] = stats
+
+    def unknown_op(self, word):
+        key = ('%06o' % (word & 0o177700), (word >> 3) & 7)
+        with self.lock:
+            self.unknown[key] += 1
+            self.unknown_since_report += 1
+            now = monotonic()
+            if self.reporter is None or (self.last_report is not None and now - self.last_report < self.report_interval):
+                return
+            self.last_report = now
+            since, self.unknown_since_report = self.unknown_since_report, 0
+            common = self.unknown.most_common(5)
+            total = sum(self.unknown.values())
+        self.reporter('pdp11: %d unknown opcodes since last report (%d total), most common: %s' % (
+            since, total, ', '.join('%s mode %d x%d' % (bits, mode, n) for (bits, mode), n in common)))
+
+    def snapshot(self):
+        with self.lock:
+            result = {
+                'enabled': self.enabled,
+                'counters': dict(self.counters),
+                'timers': dict((name, {'calls': calls, 'seconds': total, 'max_seconds': longest, 'mean_seconds': total / calls})
+                               for name, (calls, total, longest) in self.timers.items()),
+                'unknown_ops': [{'bits': bits, 'mode': mode, 'count': n} for (bits, mode), n in self.unknown.most_common()],
+            }
+        for name, stats in self.sources.items():
+            result[name] = stats()
+        return result
+
+    def dump(self, path=None):
+        # JSON to path, or returned as a string without one
+        out = json.dumps(self.snapshot(), indent=2)
+        if path is None:
+            return out
+        with open(path, 'w') as f:
+            f.write(out + '\n')
+
+    def report(self):
+        snap = self.snapshot()
+        lines = []
+        for name, timer in sorted(snap['timers'].items()):
+            lines.append('%-24s %8d calls %10.3f ms total %8.1f us mean' % (name, timer['calls'], timer['seconds'] * 1e3, timer['mean_seconds'] * 1e6))
+        for name, n in sorted(snap['counters'].items()):
+            lines.append('%-24s %8d' % (name, n))
+        for name in self.sources:
+            lines.append('%-24s %s' % (name, ' '.join('%s=%s' % item for item in snap[name].items())))
+        if snap['unknown_ops']:
+            lines.append('unknown opcodes:')
+            for entry in snap['unknown_ops'][:20]:
+                lines.append('  %s mode %d %8d' % (entry['bits'], entry['mode'], entry['count']))
+        return '\n'.join(lines)
+
+metrics = Metrics()
+if os.environ.get('PDP11_METRICS'):
+    metrics.enable()
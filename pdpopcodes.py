@@ -1,5 +1,4 @@
-from binaryninja import *
-from struct import unpack
+from struct import unpack_from
 
 REGISTERS = [
     'R0', 'R1', 'R2', 'R3', 'R4', 'R5', 'SP', 'PC'
@@ -12,255 +11,503 @@ def sign_extend(value, bits):
     return (value & (sign_bit - 1)) - (value & sign_bit)
 
 
+def read_instr_words(data):
+    # Instruction word and the two words that may follow it, reading as zero past the end of data.
+    # Only short buffers at the end of a segment need the padded copy
+    if len(data) >= 6:
+        return unpack_from('<HHH', data)
+    return unpack_from('<HHH', bytes(data[:6]).ljust(6, b'\x00'))
+
 class OpGroup:
-    def __init__(self, shift, args):
+    # Everything that shares an operand layout, whatever the opcode. shift is the width of the
+    # operand fields, layout the operands in assembly order, each with the bit position of its
+    # field. Immediate words follow the instruction in the same order, so a source's immediate
+    # comes first
+    def __init__(self, shift, layout):
         self.shift = shift
-        self.args = args
+        self.layout = tuple(layout)
     
     def parse_args(self, data):
-        if len(data) < 6:
-            data = data + b'\x00\x00\x00\x00'
+        instr, imm, next_imm = read_instr_words(data)
+        return self.parse_words(instr, imm, next_imm)
+
+    def parse_words(self, instr, imm, next_imm):
         parsed = []
-        instr, = unpack('<H', data[:2])
         imm_idx = 0
-        imm, = unpack('<H', data[2:4])
-        if len(self.args) > 1:
-            parsed.append(self.args[1]())
-            parsed[0].parse(instr, imm, 0)
-            instr = instr >> parsed[-1].bit_width()
-        if len(self.args) > 0:
-            if len(parsed) > 0 and parsed[0].has_imm():
-                imm, = unpack('<H', data[4:6])
-                imm_idx = 1
-            parsed.insert(0, self.args[0]())
-            parsed[0].parse(instr, imm, 0)
-        
-        # Hack
-        if len(self.args) == 2 and type(self.args[0]) == AddressedArg and type(self.args[1]) == AddressedArg:
-            parsed[0], parsed[1] = parsed[1], parsed[0]
-
-        return parsed
+        for arg_type, pos in self.layout:
+            arg = arg_type.decode(instr >> pos, next_imm if imm_idx else imm, imm_idx)
+            if arg.imm_word:
+                imm_idx += 1
+            parsed.append(arg)
+        return tuple(parsed)
 
+# Operands render to plain (token type, text, value) tuples so decoding doesn't depend on binja,
+# see pdprender.py for the conversion to InstructionTextTokens
+#
+# Operands are immutable once built. Those that don't carry an immediate are built once up front
+# and shared by every instruction that encodes them, decode() only allocates for immediates
 class AddressedArg:
-    def parse(self, instr, imm, imm_idx):
-        self.reg_idx = instr & 0b111
-        self.mode = (instr >> 3) & 0b111
-        self.imm = sign_extend(imm, 16)
+    __slots__ = ('reg_idx', 'mode', 'imm', 'imm_idx', 'imm_word')
+
+    def __init__(self, reg_idx, mode, imm=0, imm_idx=0):
+        self.reg_idx = reg_idx
+        self.mode = mode
+        self.imm = imm
         self.imm_idx = imm_idx
+        self.imm_word = (reg_idx == 7 and mode in [2, 3, 6, 7]) or mode in [6, 7]
+
+    @classmethod
+    def decode(cls, field, imm, imm_idx):
+        field &= 0b111111
+        arg = cls.shared[field]
+        if arg is None:
+            arg = cls(field & 0b111, field >> 3, sign_extend(imm, 16), imm_idx)
+        return arg
 
     def render(self, addr):
         if self.reg_idx == 7 and self.mode in [2, 3, 6, 7]:
             result = []
             if self.mode == 2:
-                result.append(InstructionTextToken(InstructionTextTokenType.TextToken, '#'))
-                result.append(InstructionTextToken(InstructionTextTokenType.IntegerToken, hex(self.imm), value=self.imm, size=2))
+                result.append(('TextToken', '#', None))
+                result.append(('IntegerToken', hex(self.imm), self.imm))
             elif self.mode == 3:
-                result.append(InstructionTextToken(InstructionTextTokenType.TextToken, '@#'))
-                result.append(InstructionTextToken(InstructionTextTokenType.IntegerToken, hex(self.imm), value=self.imm, size=2))
+                result.append(('TextToken', '@#', None))
+                result.append(('IntegerToken', hex(self.imm), self.imm))
             elif self.mode == 6:
-                result.append(InstructionTextToken(InstructionTextTokenType.CodeRelativeAddressToken, hex(self.imm), value=addr+self.imm, size=2))
+                result.append(('CodeRelativeAddressToken', hex(self.imm), addr+self.imm))
             elif self.mode == 7:
-                result.append(InstructionTextToken(InstructionTextTokenType.TextToken, '@'))
-                result.append(InstructionTextToken(InstructionTextTokenType.IntegerToken, hex(self.imm), value=self.imm, size=2))
+                result.append(('TextToken', '@', None))
+                result.append(('IntegerToken', hex(self.imm), self.imm))
             return result
         
         prefix = []
         suffix = []
         if self.mode == 1:
-            prefix.append(InstructionTextToken(InstructionTextTokenType.BeginMemoryOperandToken, '('))
-            suffix.append(InstructionTextToken(InstructionTextTokenType.EndMemoryOperandToken, ')'))
+            prefix.append(('BeginMemoryOperandToken', '(', None))
+            suffix.append(('EndMemoryOperandToken', ')', None))
         elif self.mode == 2:
-            prefix.append(InstructionTextToken(InstructionTextTokenType.BeginMemoryOperandToken, '('))
-            suffix.append(InstructionTextToken(InstructionTextTokenType.EndMemoryOperandToken, ')+'))
+            prefix.append(('BeginMemoryOperandToken', '(', None))
+            suffix.append(('EndMemoryOperandToken', ')+', None))
         if self.mode == 3:
-            prefix.append(InstructionTextToken(InstructionTextTokenType.BeginMemoryOperandToken, '@('))
-            suffix.append(InstructionTextToken(InstructionTextTokenType.EndMemoryOperandToken, ')+'))
+            prefix.append(('BeginMemoryOperandToken', '@(', None))
+            suffix.append(('EndMemoryOperandToken', ')+', None))
         if self.mode == 4:
-            prefix.append(InstructionTextToken(InstructionTextTokenType.BeginMemoryOperandToken, '-('))
-            suffix.append(InstructionTextToken(InstructionTextTokenType.EndMemoryOperandToken, ')'))
+            prefix.append(('BeginMemoryOperandToken', '-(', None))
+            suffix.append(('EndMemoryOperandToken', ')', None))
         if self.mode == 5:
-            prefix.append(InstructionTextToken(InstructionTextTokenType.BeginMemoryOperandToken, '@-('))
-            suffix.append(InstructionTextToken(InstructionTextTokenType.EndMemoryOperandToken, ')'))
+            prefix.append(('BeginMemoryOperandToken', '@-(', None))
+            suffix.append(('EndMemoryOperandToken', ')', None))
         if self.mode == 6:
-            prefix.append(InstructionTextToken(InstructionTextTokenType.IntegerToken, oct(self.imm)[2:], value=self.imm, size=2))
-            prefix.append(InstructionTextToken(InstructionTextTokenType.BeginMemoryOperandToken, '('))
-            suffix.append(InstructionTextToken(InstructionTextTokenType.EndMemoryOperandToken, ')'))
+            prefix.append(('IntegerToken', oct(self.imm)[2:], self.imm))
+            prefix.append(('BeginMemoryOperandToken', '(', None))
+            suffix.append(('EndMemoryOperandToken', ')', None))
         if self.mode == 7:
-            prefix.append(InstructionTextToken(InstructionTextTokenType.TextToken, '@'))
-            prefix.append(InstructionTextToken(InstructionTextTokenType.IntegerToken, oct(self.imm)[2:], value=self.imm, size=2))
-            prefix.append(InstructionTextToken(InstructionTextTokenType.BeginMemoryOperandToken, '('))
-            suffix.append(InstructionTextToken(InstructionTextTokenType.EndMemoryOperandToken, ')'))
-        return prefix + [InstructionTextToken(InstructionTextTokenType.RegisterToken, REGISTERS[self.reg_idx])] + suffix
+            prefix.append(('TextToken', '@', None))
+            prefix.append(('IntegerToken', oct(self.imm)[2:], self.imm))
+            prefix.append(('BeginMemoryOperandToken', '(', None))
+            suffix.append(('EndMemoryOperandToken', ')', None))
+        return prefix + [('RegisterToken', REGISTERS[self.reg_idx], None)] + suffix
 
     def has_imm(self):
-        if (self.reg_idx == 7 and self.mode in [2, 3, 6, 7]) or self.mode in [6, 7]:
-            return True
-        return False
+        return self.imm_word
     
-    def get_value(self, addr, length):
+    def get_value(self, pc):
+        # 16-bit effective address for the PC modes that have a static one, which is what JMP and
+        # JSR go to: the immediate word itself for (PC)+, the address it holds for @(PC)+. pc is
+        # the PC this operand sees, see operand_pc
         if self.reg_idx == 7:
             if self.mode == 2:
-                return self.imm
+                return (pc - 2) & 0xffff
             if self.mode == 3:
-                return addr + (self.imm_idx + 1) * 2
+                return self.imm & 0xffff
             if self.mode == 6:
-                return addr + length + self.imm
-            if self.mode == 7:
-                return None # ?
+                return (pc + self.imm) & 0xffff
         return None
-    
-    def bit_width(self):
+
+    @classmethod
+    def bit_width(cls):
         return 6
 
 class RegArg:
-    def parse(self, instr, imm, imm_idx):
-        self.reg_idx = instr & 0b111
+    __slots__ = ('reg_idx',)
+    imm_word = False
+
+    def __init__(self, reg_idx):
+        self.reg_idx = reg_idx
+
+    @classmethod
+    def decode(cls, field, imm, imm_idx):
+        return cls.shared[field & 0b111]
     
     def render(self, addr):
-        return [InstructionTextToken(InstructionTextTokenType.RegisterToken, REGISTERS[self.reg_idx])]
+        return [('RegisterToken', REGISTERS[self.reg_idx], None)]
 
     def has_imm(self):
         return False
     
-    def bit_width(self):
+    @classmethod
+    def bit_width(cls):
         return 3
 
 class Const8Arg:
-    def parse(self, instr, imm, imm_idx):
-        self.value = sign_extend(instr & 0b11111111, 8)
+    __slots__ = ('value',)
+    imm_word = False
+
+    def __init__(self, value):
+        self.value = value
+
+    @classmethod
+    def decode(cls, field, imm, imm_idx):
+        return cls.shared[field & 0b11111111]
     
     def render(self, addr):
-        return [InstructionTextToken(InstructionTextTokenType.CodeRelativeAddressToken, hex(self.value), value=addr+2*self.value, size=2)]
+        return [('CodeRelativeAddressToken', hex(self.value), addr+2*self.value)]
 
     def has_imm(self):
         return False
 
-    def bit_width(self):
+    @classmethod
+    def bit_width(cls):
         return 8
 
 class Const6Arg:
-    def parse(self, instr, imm, imm_idx):
-        self.value = instr & 0b111111
+    __slots__ = ('value',)
+    imm_word = False
+
+    def __init__(self, value):
+        self.value = value
+
+    @classmethod
+    def decode(cls, field, imm, imm_idx):
+        return cls.shared[field & 0b111111]
     
     def render(self, addr):
-        return [InstructionTextToken(InstructionTextTokenType.CodeRelativeAddressToken, hex(self.value), value=addr-2*self.value, size=2)]
+        return [('CodeRelativeAddressToken', hex(self.value), addr-2*self.value)]
 
     def has_imm(self):
         return False
 
-    def bit_width(self):
+    @classmethod
+    def bit_width(cls):
         return 6
 
 class Const4Arg:
-    def parse(self, instr, imm, imm_idx):
-        self.value = instr & 0b1111
+    __slots__ = ('value',)
+    imm_word = False
+
+    def __init__(self, value):
+        self.value = value
+
+    @classmethod
+    def decode(cls, field, imm, imm_idx):
+        return cls.shared[field & 0b1111]
     
     def render(self, addr):
-        return [InstructionTextToken(InstructionTextTokenType.IntegerToken, hex(self.value), value=self.value, size=2)]
+        return [('IntegerToken', hex(self.value), self.value)]
 
     def has_imm(self):
         return False
 
-    def bit_width(self):
+    @classmethod
+    def bit_width(cls):
         return 4
 
-DOUBLE_ADDRESSED_GROUP = OpGroup(shift=12, args=[AddressedArg, AddressedArg]) # Two addressed operands
-ADDRESSED_REG_GROUP = OpGroup(shift=9, args=[RegArg, AddressedArg]) # One register operand, one addressed operand
-ADDRESSED_GROUP = OpGroup(shift=6, args=[AddressedArg]) # One addressed operand
-BRANCH_GROUP = OpGroup(shift=8, args=[Const8Arg]) # Branch instructions
-SOB_GROUP = OpGroup(shift=9, args=[RegArg, Const6Arg]) # SOB instruction
-RTS_GROUP = OpGroup(shift=3, args=[RegArg]) # RTS instruction
-MARK_GROUP = OpGroup(shift=6, args=[Const6Arg]) # MARK instruction
-NO_OPERAND_GROUP = OpGroup(shift=0, args=[]) # No operands
-CONDITION_CODE_GROUP = OpGroup(shift=4, args=[Const4Arg]) # CCC/SCC instructions
-
-pdp11_ops = [
-    ('MOV', 0o01, DOUBLE_ADDRESSED_GROUP),
-    ('MOVB', 0o11, DOUBLE_ADDRESSED_GROUP),
-    ('CMP', 0o02, DOUBLE_ADDRESSED_GROUP),
-    ('CMPB', 0o12, DOUBLE_ADDRESSED_GROUP),
-    ('BIT', 0o03, DOUBLE_ADDRESSED_GROUP),
-    ('BITB', 0o13, DOUBLE_ADDRESSED_GROUP),
-    ('BIC', 0o04, DOUBLE_ADDRESSED_GROUP),
-    ('BICB', 0o14, DOUBLE_ADDRESSED_GROUP),
-    ('BIS', 0o05, DOUBLE_ADDRESSED_GROUP),
-    ('BISB', 0o15, DOUBLE_ADDRESSED_GROUP),
-    ('ADD', 0o06, DOUBLE_ADDRESSED_GROUP),
-    ('SUB', 0o16, DOUBLE_ADDRESSED_GROUP),
-
-    ('JSR', 0o004, ADDRESSED_REG_GROUP),
-    ('MUL', 0o070, ADDRESSED_REG_GROUP),
-    ('DIV', 0o071, ADDRESSED_REG_GROUP),
-    ('ASH', 0o072, ADDRESSED_REG_GROUP),
-    ('ASHC', 0o073, ADDRESSED_REG_GROUP),
-    ('XOR', 0o074, ADDRESSED_REG_GROUP),
-
-    ('JMP', 0o0001, ADDRESSED_GROUP),
-    ('SWAB', 0o0003, ADDRESSED_GROUP),
-    ('CLR', 0o0050, ADDRESSED_GROUP),
-    ('CLRB', 0o1050, ADDRESSED_GROUP),
-    ('COM', 0o0051, ADDRESSED_GROUP),
-    ('COMB', 0o1051, ADDRESSED_GROUP),
-    ('INC', 0o0052, ADDRESSED_GROUP),
-    ('INCB', 0o1052, ADDRESSED_GROUP),
-    ('DEC', 0o0053, ADDRESSED_GROUP),
-    ('DECB', 0o1053, ADDRESSED_GROUP),
-    ('NEG', 0o0054, ADDRESSED_GROUP),
-    ('NEGB', 0o1054, ADDRESSED_GROUP),
-    ('ADC', 0o0055, ADDRESSED_GROUP),
-    ('ADCB', 0o1055, ADDRESSED_GROUP),
-    ('SBC', 0o0056, ADDRESSED_GROUP),
-    ('SBCB', 0o1056, ADDRESSED_GROUP),
-    ('TST', 0o0057, ADDRESSED_GROUP),
-    ('TSTB', 0o1057, ADDRESSED_GROUP),
-    ('ROR', 0o0060, ADDRESSED_GROUP),
-    ('RORB', 0o1060, ADDRESSED_GROUP),
-    ('ROL', 0o0061, ADDRESSED_GROUP),
-    ('ROLB', 0o1061, ADDRESSED_GROUP),
-    ('ASR', 0o0062, ADDRESSED_GROUP),
-    ('ASRB', 0o1062, ADDRESSED_GROUP),
-    ('ASL', 0o0063, ADDRESSED_GROUP),
-    ('ASLB', 0o1063, ADDRESSED_GROUP),
-    ('MTPS', 0o1064, ADDRESSED_GROUP),
-    ('MFPI', 0o0065, ADDRESSED_GROUP),
-    ('MFPD', 0o1065, ADDRESSED_GROUP),
-    ('MTPI', 0o0066, ADDRESSED_GROUP),
-    ('MTPD', 0o1066, ADDRESSED_GROUP),
-    ('SXT', 0o0067, ADDRESSED_GROUP),
-    ('MFPS', 0o1067, ADDRESSED_GROUP),
-
-    ('BR', (0o000 << 1) | 1, BRANCH_GROUP),
-    ('BNE', (0o001 << 1) | 0, BRANCH_GROUP),
-    ('BEQ', (0o001 << 1) | 1, BRANCH_GROUP),
-    ('BGE', (0o002 << 1) | 0, BRANCH_GROUP),
-    ('BLT', (0o002 << 1) | 1, BRANCH_GROUP),
-    ('BGT', (0o003 << 1) | 0, BRANCH_GROUP),
-    ('BLE', (0o003 << 1) | 1, BRANCH_GROUP),
-    ('BPL', (0o100 << 1) | 0, BRANCH_GROUP),
-    ('BMI', (0o100 << 1) | 1, BRANCH_GROUP),
-    ('BHI', (0o101 << 1) | 0, BRANCH_GROUP),
-    ('BLOS', (0o101 << 1) | 1, BRANCH_GROUP),
-    ('BVC', (0o102 << 1) | 0, BRANCH_GROUP),
-    ('BVS', (0o102 << 1) | 1, BRANCH_GROUP),
-    ('BCC', (0o103 << 1) | 0, BRANCH_GROUP),
-    ('BCS', (0o103 << 1) | 1, BRANCH_GROUP),
-    ('EMT', (0o104 << 1) | 0, BRANCH_GROUP),
-    ('TRAP', (0o104 << 1) | 1, BRANCH_GROUP),
-
-    ('SOB', 0o077, SOB_GROUP),
-
-    ('RTS', 0o00020, RTS_GROUP),
-
-    ('MARK', 0o0064, MARK_GROUP),
-
-    ('HALT', 0o000000, NO_OPERAND_GROUP),
-    ('WAIT', 0o000001, NO_OPERAND_GROUP),
-    ('RTI', 0o000002, NO_OPERAND_GROUP),
-    ('BPT', 0o000003, NO_OPERAND_GROUP),
-    ('IOT', 0o000004, NO_OPERAND_GROUP),
-    ('RESET', 0o000005, NO_OPERAND_GROUP),
-    ('RTT', 0o000006, NO_OPERAND_GROUP),
-
-    ('CCC', 0o00012, CONDITION_CODE_GROUP),
-    ('SCC', 0o00013, CONDITION_CODE_GROUP),
-]
\ No newline at end of file
+class FloatAddressedArg(AddressedArg):
+    # FPP operand, mode 0 names a floating point accumulator rather than a general register
+    __slots__ = ()
+
+    def render(self, addr):
+        if self.mode == 0:
+            return [('RegisterToken', 'AC%d' % self.reg_idx, None)]
+        return AddressedArg.render(self, addr)
+
+class FacArg:
+    # FPP accumulator field, only AC0-AC3 can be named here
+    __slots__ = ('reg_idx',)
+    imm_word = False
+
+    def __init__(self, reg_idx):
+        self.reg_idx = reg_idx
+
+    @classmethod
+    def decode(cls, field, imm, imm_idx):
+        return cls.shared[field & 0b11]
+
+    def render(self, addr):
+        return [('RegisterToken', 'AC%d' % self.reg_idx, None)]
+
+    def has_imm(self):
+        return False
+
+    @classmethod
+    def bit_width(cls):
+        return 2
+
+class Const3Arg:
+    __slots__ = ('value',)
+    imm_word = False
+
+    def __init__(self, value):
+        self.value = value
+
+    @classmethod
+    def decode(cls, field, imm, imm_idx):
+        return cls.shared[field & 0b111]
+
+    def render(self, addr):
+        return [('IntegerToken', hex(self.value), self.value)]
+
+    def has_imm(self):
+        return False
+
+    @classmethod
+    def bit_width(cls):
+        return 3
+
+AddressedArg.shared = [None if AddressedArg(field & 0b111, field >> 3).imm_word else AddressedArg(field & 0b111, field >> 3) for field in range(64)]
+FloatAddressedArg.shared = [None if arg is None else FloatAddressedArg(arg.reg_idx, arg.mode) for arg in AddressedArg.shared]
+RegArg.shared = [RegArg(reg_idx) for reg_idx in range(8)]
+FacArg.shared = [FacArg(reg_idx) for reg_idx in range(4)]
+Const8Arg.shared = [Const8Arg(sign_extend(field, 8)) for field in range(256)]
+Const6Arg.shared = [Const6Arg(field) for field in range(64)]
+Const4Arg.shared = [Const4Arg(field) for field in range(16)]
+Const3Arg.shared = [Const3Arg(field) for field in range(8)]
+
+# Operand kinds as they're written in the opcode table
+OPERAND_KINDS = {
+    'addr': AddressedArg,       # mode and register, 6 bits
+    'faddr': FloatAddressedArg, # same, with mode 0 naming an accumulator
+    'reg': RegArg,              # register, 3 bits
+    'fac': FacArg,              # accumulator, 2 bits
+    'off8': Const8Arg,          # signed word offset for branches
+    'off6': Const6Arg,          # unsigned word count, backwards for SOB
+    'cc': Const4Arg,            # condition code bits for CCC/SCC
+    'pri': Const3Arg,           # priority for SPL
+}
+
+# Instruction set options. Each entry in the table belongs to one of these, and a CPU model is
+# the set of options it decodes:
+#   base:  common to every model listed here
+#   eis:   MUL/DIV/ASH/ASHC, the KE11-E option on the 11/40 and standard on the 11/45 and 11/70
+#   fis:   KE11-F floating instruction set, 11/40 only
+#   fpp:   FP11 floating point, 11/45 and 11/70
+#   mmu:   supervisor mode and split I/D space, 11/45 and 11/70
+#   psw:   MTPS/MFPS, LSI-11 and 11/34
+#   later: 11/44 and J-11 additions
+CPU_MODELS = {
+    'all': ('base', 'eis', 'fis', 'fpp', 'mmu', 'psw', 'later'),
+    '11/40': ('base', 'eis', 'fis'),
+    '11/45': ('base', 'eis', 'fpp', 'mmu'),
+    '11/70': ('base', 'eis', 'fpp', 'mmu'),
+}
+DEFAULT_CPU_MODEL = 'all'
+
+# The instruction set. Each entry is (mnemonic, opcode, mask, operands, flow, option): the word
+# decodes as mnemonic when word & mask == opcode, operands are 'kind@bit' in assembly order and
+# flow is how the instruction changes control flow, see pdp11_branches. Decode tables, operand
+# layouts and branch info are all generated from this at import time
+#
+# Entries are never reordered or removed, an op id is an index into the table and op ids are
+# stored in the analysis cache. New instructions go at the end
+pdp11_opcodes = [
+    ('MOV', 0o010000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('MOVB', 0o110000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('CMP', 0o020000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('CMPB', 0o120000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('BIT', 0o030000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('BITB', 0o130000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('BIC', 0o040000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('BICB', 0o140000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('BIS', 0o050000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('BISB', 0o150000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('ADD', 0o060000, 0o170000, 'addr@6 addr@0', None, 'base'),
+    ('SUB', 0o160000, 0o170000, 'addr@6 addr@0', None, 'base'),
+
+    ('JSR', 0o004000, 0o177000, 'reg@6 addr@0', 'call', 'base'),
+    ('MUL', 0o070000, 0o177000, 'reg@6 addr@0', None, 'eis'),
+    ('DIV', 0o071000, 0o177000, 'reg@6 addr@0', None, 'eis'),
+    ('ASH', 0o072000, 0o177000, 'reg@6 addr@0', None, 'eis'),
+    ('ASHC', 0o073000, 0o177000, 'reg@6 addr@0', None, 'eis'),
+    ('XOR', 0o074000, 0o177000, 'reg@6 addr@0', None, 'base'),
+
+    ('JMP', 0o000100, 0o177700, 'addr@0', 'jump', 'base'),
+    ('SWAB', 0o000300, 0o177700, 'addr@0', None, 'base'),
+    ('CLR', 0o005000, 0o177700, 'addr@0', None, 'base'),
+    ('CLRB', 0o105000, 0o177700, 'addr@0', None, 'base'),
+    ('COM', 0o005100, 0o177700, 'addr@0', None, 'base'),
+    ('COMB', 0o105100, 0o177700, 'addr@0', None, 'base'),
+    ('INC', 0o005200, 0o177700, 'addr@0', None, 'base'),
+    ('INCB', 0o105200, 0o177700, 'addr@0', None, 'base'),
+    ('DEC', 0o005300, 0o177700, 'addr@0', None, 'base'),
+    ('DECB', 0o105300, 0o177700, 'addr@0', None, 'base'),
+    ('NEG', 0o005400, 0o177700, 'addr@0', None, 'base'),
+    ('NEGB', 0o105400, 0o177700, 'addr@0', None, 'base'),
+    ('ADC', 0o005500, 0o177700, 'addr@0', None, 'base'),
+    ('ADCB', 0o105500, 0o177700, 'addr@0', None, 'base'),
+    ('SBC', 0o005600, 0o177700, 'addr@0', None, 'base'),
+    ('SBCB', 0o105600, 0o177700, 'addr@0', None, 'base'),
+    ('TST', 0o005700, 0o177700, 'addr@0', None, 'base'),
+    ('TSTB', 0o105700, 0o177700, 'addr@0', None, 'base'),
+    ('ROR', 0o006000, 0o177700, 'addr@0', None, 'base'),
+    ('RORB', 0o106000, 0o177700, 'addr@0', None, 'base'),
+    ('ROL', 0o006100, 0o177700, 'addr@0', None, 'base'),
+    ('ROLB', 0o106100, 0o177700, 'addr@0', None, 'base'),
+    ('ASR', 0o006200, 0o177700, 'addr@0', None, 'base'),
+    ('ASRB', 0o106200, 0o177700, 'addr@0', None, 'base'),
+    ('ASL', 0o006300, 0o177700, 'addr@0', None, 'base'),
+    ('ASLB', 0o106300, 0o177700, 'addr@0', None, 'base'),
+    ('MTPS', 0o106400, 0o177700, 'addr@0', None, 'psw'),
+    ('MFPI', 0o006500, 0o177700, 'addr@0', None, 'base'),
+    ('MFPD', 0o106500, 0o177700, 'addr@0', None, 'mmu'),
+    ('MTPI', 0o006600, 0o177700, 'addr@0', None, 'base'),
+    ('MTPD', 0o106600, 0o177700, 'addr@0', None, 'mmu'),
+    ('SXT', 0o006700, 0o177700, 'addr@0', None, 'base'),
+    ('MFPS', 0o106700, 0o177700, 'addr@0', None, 'psw'),
+
+    ('BR', 0o000400, 0o177400, 'off8@0', 'branch', 'base'),
+    ('BNE', 0o001000, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BEQ', 0o001400, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BGE', 0o002000, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BLT', 0o002400, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BGT', 0o003000, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BLE', 0o003400, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BPL', 0o100000, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BMI', 0o100400, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BHI', 0o101000, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BLOS', 0o101400, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BVC', 0o102000, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BVS', 0o102400, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BCC', 0o103000, 0o177400, 'off8@0', 'cond', 'base'),
+    ('BCS', 0o103400, 0o177400, 'off8@0', 'cond', 'base'),
+    ('EMT', 0o104000, 0o177400, 'off8@0', None, 'base'),
+    ('TRAP', 0o104400, 0o177400, 'off8@0', None, 'base'),
+
+    ('SOB', 0o077000, 0o177000, 'reg@6 off6@0', 'sob', 'base'),
+
+    ('RTS', 0o000200, 0o177770, 'reg@0', 'return', 'base'),
+
+    ('MARK', 0o006400, 0o177700, 'off6@0', 'return', 'base'),
+
+    ('HALT', 0o000000, 0o177777, '', 'return', 'base'),
+    ('WAIT', 0o000001, 0o177777, '', None, 'base'),
+    ('RTI', 0o000002, 0o177777, '', 'return', 'base'),
+    ('BPT', 0o000003, 0o177777, '', None, 'base'),
+    ('IOT', 0o000004, 0o177777, '', None, 'base'),
+    ('RESET', 0o000005, 0o177777, '', None, 'base'),
+    ('RTT', 0o000006, 0o177777, '', 'return', 'base'),
+
+    ('CCC', 0o000240, 0o177760, 'cc@0', None, 'base'),
+    ('SCC', 0o000260, 0o177760, 'cc@0', None, 'base'),
+
+    ('SPL', 0o000230, 0o177770, 'pri@0', None, 'mmu'),
+    ('MFPT', 0o000007, 0o177777, '', None, 'later'),
+    ('CSM', 0o007000, 0o177700, 'addr@0', None, 'later'),
+    ('TSTSET', 0o007200, 0o177700, 'addr@0', None, 'later'),
+    ('WRTLCK', 0o007300, 0o177700, 'addr@0', None, 'later'),
+
+    ('FADD', 0o075000, 0o177770, 'reg@0', None, 'fis'),
+    ('FSUB', 0o075010, 0o177770, 'reg@0', None, 'fis'),
+    ('FMUL', 0o075020, 0o177770, 'reg@0', None, 'fis'),
+    ('FDIV', 0o075030, 0o177770, 'reg@0', None, 'fis'),
+
+    ('CFCC', 0o170000, 0o177777, '', None, 'fpp'),
+    ('SETF', 0o170001, 0o177777, '', None, 'fpp'),
+    ('SETI', 0o170002, 0o177777, '', None, 'fpp'),
+    ('SETD', 0o170011, 0o177777, '', None, 'fpp'),
+    ('SETL', 0o170012, 0o177777, '', None, 'fpp'),
+    ('LDFPS', 0o170100, 0o177700, 'addr@0', None, 'fpp'),
+    ('STFPS', 0o170200, 0o177700, 'addr@0', None, 'fpp'),
+    ('STST', 0o170300, 0o177700, 'addr@0', None, 'fpp'),
+    ('CLRF', 0o170400, 0o177700, 'faddr@0', None, 'fpp'),
+    ('TSTF', 0o170500, 0o177700, 'faddr@0', None, 'fpp'),
+    ('ABSF', 0o170600, 0o177700, 'faddr@0', None, 'fpp'),
+    ('NEGF', 0o170700, 0o177700, 'faddr@0', None, 'fpp'),
+    ('MULF', 0o171000, 0o177400, 'faddr@0 fac@6', None, 'fpp'),
+    ('MODF', 0o171400, 0o177400, 'faddr@0 fac@6', None, 'fpp'),
+    ('ADDF', 0o172000, 0o177400, 'faddr@0 fac@6', None, 'fpp'),
+    ('LDF', 0o172400, 0o177400, 'faddr@0 fac@6', None, 'fpp'),
+    ('SUBF', 0o173000, 0o177400, 'faddr@0 fac@6', None, 'fpp'),
+    ('CMPF', 0o173400, 0o177400, 'faddr@0 fac@6', None, 'fpp'),
+    ('STF', 0o174000, 0o177400, 'fac@6 faddr@0', None, 'fpp'),
+    ('DIVF', 0o174400, 0o177400, 'faddr@0 fac@6', None, 'fpp'),
+    ('STEXP', 0o175000, 0o177400, 'fac@6 addr@0', None, 'fpp'),
+    ('STCFI', 0o175400, 0o177400, 'fac@6 addr@0', None, 'fpp'),
+    ('STCFD', 0o176000, 0o177400, 'fac@6 faddr@0', None, 'fpp'),
+    ('LDEXP', 0o176400, 0o177400, 'addr@0 fac@6', None, 'fpp'),
+    ('LDCIF', 0o177000, 0o177400, 'addr@0 fac@6', None, 'fpp'),
+    ('LDCDF', 0o177400, 0o177400, 'faddr@0 fac@6', None, 'fpp'),
+]
+
+def parse_operands(mnem, opcode, mask, operands):
+    # 'kind@bit ...' to a layout, checking each field fits in the bits the mask leaves free
+    free = ~mask & 0xffff
+    if free & (free + 1):
+        raise ValueError('%s: operand bits in mask %06o are not the low bits' % (mnem, mask))
+    used = 0
+    layout = []
+    for operand in operands.split():
+        kind, _, pos = operand.partition('@')
+        arg = OPERAND_KINDS[kind]
+        pos = int(pos)
+        field = ((1 << arg.bit_width()) - 1) << pos
+        if field & ~free or field & used:
+            raise ValueError('%s: operand %s does not fit mask %06o' % (mnem, operand, mask))
+        used |= field
+        layout.append((arg, pos))
+    if opcode & free or used != free:
+        raise ValueError('%s: opcode %06o and operands do not match mask %06o' % (mnem, opcode, mask))
+    return tuple(layout)
+
+def build_ops(opcodes):
+    # (mnemonic, opcode >> shift, group) per table entry, with entries that share a layout
+    # sharing a group
+    groups = {}
+    ops = []
+    for mnem, opcode, mask, operands, _, _ in opcodes:
+        layout = parse_operands(mnem, opcode, mask, operands)
+        shift = (~mask & 0xffff).bit_length()
+        group = groups.get((shift, layout))
+        if group is None:
+            group = groups[(shift, layout)] = OpGroup(shift, layout)
+        ops.append((mnem, opcode >> shift, group))
+    return ops
+
+pdp11_ops = build_ops(pdp11_opcodes)
+# mnemonic -> flow, for the instructions that change control flow
+pdp11_flows = dict((mnem, flow) for mnem, _, _, _, flow, _ in pdp11_opcodes if flow is not None)
+
+def build_op_table(ops, enabled=None):
+    # Dispatch table indexed directly by the instruction word. Where encodings overlap the
+    # earlier entry in ops wins, same as a linear scan over ops would. enabled is a set of op
+    # ids to include, None for all of them
+    table = [None] * 0x10000
+    for op_id, (mnem, bits, group) in enumerate(ops):
+        if enabled is not None and op_id not in enabled:
+            continue
+        start = bits << group.shift
+        for word in range(start, start + (1 << group.shift)):
+            if table[word] is None:
+                table[word] = (op_id, mnem, group)
+    return table
+
+def model_op_ids(model):
+    options = CPU_MODELS[model]
+    return set(op_id for op_id, entry in enumerate(pdp11_opcodes) if entry[5] in options)
+
+pdp11_op_table = build_op_table(pdp11_ops)
+cpu_model = DEFAULT_CPU_MODEL
+# Called with the new model name whenever it changes, for anything holding decoded instructions
+cpu_model_hooks = []
+
+def set_cpu_model(model):
+    # Selects which instructions decode. The table is rebuilt in place, since the decoders hold
+    # a reference to it, and op ids don't change between models
+    global cpu_model
+    if model not in CPU_MODELS:
+        raise ValueError('unknown PDP-11 model %r' % model)
+    if model == cpu_model:
+        return
+    pdp11_op_table[:] = build_op_table(pdp11_ops, model_op_ids(model))
+    cpu_model = model
+    for hook in cpu_model_hooks:
+        hook(model)
@@ -0,0 +1,29 @@
+from binaryninja import *
+from .pdpdisasm import *
+from .pdpmetrics import metrics
+from time import perf_counter
+
+# Unknown opcode summaries go to the binja log, rate limited
+metrics.reporter = log_warn
+
+def render_tokens(tokens):
+    result = []
+    for token_type, text, value in tokens:
+        token_type = getattr(InstructionTextTokenType, token_type)
+        if value is None:
+            result.append(InstructionTextToken(token_type, text))
+        else:
+            result.append(InstructionTextToken(token_type, text, value=value, size=2))
+    return result
+
+def pdp11_disasm(instr_data, addr):
+    instr, _ = pdp11_cache.decode(instr_data, addr)
+    if instr == None:
+        # Counted and reported by the decode cache
+        return None
+    if not metrics.enabled:
+        return render_tokens(pdp11_tokens(instr, addr)), instr.length
+    start = perf_counter()
+    tokens = render_tokens(pdp11_tokens(instr, addr))
+    metrics.add_time('render', perf_counter() - start)
+    return tokens, instr.length
@@ -0,0 +1,255 @@
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from struct import pack
+import hashlib
+import os
+import sqlite3
+
+from .pdpaout import *
+from .pdpcache import content_hash, default_cache_dir
+from .pdpdisasm import pdp11_branches
+from .pdpdiscover import discover_code, decode_at, in_text
+from . import pdpopcodes
+
+# Function signatures for naming stripped binaries after unstripped ones linked against the same
+# libraries. A function's signature is a hash of the instructions reachable from its start without
+# following calls, in address order, with every immediate and PC-relative word zeroed, since those
+# are what relocation changes. Signatures from indexed binaries are kept in SQLite with the names
+# they were seen under:
+#
+#   python -m pdp11 index --db sigs.db /usr/lib/bin
+#   python -m pdp11 lookup --db sigs.db a.out
+#
+# or bv.apply_signatures('sigs.db') from the binja console
+
+# Shorter functions say too little about themselves to name anything
+MIN_INSTRUCTIONS = 4
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS binaries (
+    sha1 TEXT PRIMARY KEY,
+    path TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    hash TEXT NOT NULL,
+    name TEXT NOT NULL,
+    instructions INTEGER NOT NULL,
+    binaries INTEGER NOT NULL,
+    PRIMARY KEY (hash, name)
+) WITHOUT ROWID;
+'''
+
+def default_index_path():
+    return os.path.join(default_cache_dir(), 'signatures.db')
+
+def function_body(text, base, start, addresses=None):
+    # Addresses and instructions reachable from start through branches, but not calls, sorted
+    body = {}
+    worklist = [start]
+    while worklist:
+        addr = worklist.pop()
+        while in_text(text, base, addr) and addr not in body:
+            instr = decode_at(text, base, addr)
+            if instr is None:
+                break
+            body[addr] = instr
+            falls_through = True
+            for branch_type, target in pdp11_branches(instr, addr, addresses):
+                if branch_type in ('TrueBranch', 'FalseBranch', 'UnconditionalBranch'):
+                    if in_text(text, base, target):
+                        worklist.append(target)
+                    falls_through = False
+                elif branch_type == 'FunctionReturn' or (branch_type == 'IndirectBranch' and instr.mnem == 'JMP'):
+                    falls_through = False
+            if not falls_through:
+                break
+            addr += instr.length
+    return sorted(body.items())
+
+def word_at(text, offset):
+    # Immediates past the end of text read as zero, same as the decoder
+    if offset + 2 > len(text):
+        return 0
+    return text[offset] | (text[offset + 1] << 8)
+
+def normalized_words(text, base, body):
+    # The instruction words of body, with immediates and PC-relative offsets zeroed. Index
+    # offsets off other registers (stack frames, structure members) are kept
+    words = []
+    for addr, instr in body:
+        offset = addr - base
+        words.append(word_at(text, offset))
+        imm_offset = offset + 2
+        for arg in instr.args:
+            if not arg.imm_word:
+                continue
+            words.append(0 if arg.reg_idx == 7 else word_at(text, imm_offset))
+            imm_offset += 2
+    return words
+
+def function_signature(text, base, start, addresses=None):
+    # (hash, instruction count) for the function at start, addresses resolves branch targets as
+    # in pdp11_branches
+    text = memoryview(text).cast('B')
+    body = function_body(text, base, start, addresses)
+    words = normalized_words(text, base, body)
+    return hashlib.sha1(pack('<%dH' % len(words), *words)).hexdigest(), len(body)
+
+def text_segments(data, header):
+    return [(seg, memoryview(data)[seg.file_offset:seg.file_offset + seg.file_size])
+            for seg in header.segments() if seg.kind == 'text']
+
+def named_functions(header, syms):
+    # View address -> name for every text symbol, external names winning over local ones
+    names = {}
+    for n_name, n_type, n_ovly, n_value in syms:
+        if (n_type & N_TYPE) != N_TEXT:
+            continue
+        addr = header.symbol_address(n_type, n_ovly, n_value)
+        if addr not in names or n_type & N_EXT:
+            names[addr] = n_name
+    return names
+
+def binary_signatures(data):
+    # [(hash, name, instruction count)] for the named functions in an unstripped a.out
+    header = AOutHeader(data)
+    names = named_functions(header, read_symbols(data, header))
+    addresses = AddressMap(header)
+    result = []
+    for seg, text in text_segments(data, header):
+        for addr in sorted(names):
+            if seg.vaddr <= addr < seg.vaddr + seg.size:
+                digest, count = function_signature(text, seg.vaddr, addr, addresses)
+                if count >= MIN_INSTRUCTIONS:
+                    result.append((digest, names[addr], count))
+    return result
+
+def discovered_functions(data, header, named):
+    # Function starts in the base text, found from the entry point and any named functions the
+    # way the view finds them
+    text = memoryview(data)[header.txtoff():header.txtoff() + header.a_text]
+    data_seg = memoryview(data)[header.dataoff():header.dataoff() + header.a_data]
+    starts, _ = discover_code(text, 0, [header.a_entry] + sorted(named), data_seg, header.data_vaddr(), AddressMap(header))
+    return text, starts
+
+def index_file(path):
+    # Pool worker: (path, sha1, signatures) or (path, None, error message)
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        return path, content_hash(data), binary_signatures(data)
+    except (OSError, ValueError) as e:
+        return path, None, str(e)
+
+def is_aout(path):
+    try:
+        with open(path, 'rb') as f:
+            magic = f.read(2)
+    except OSError:
+        return False
+    return len(magic) == 2 and (magic[0] | (magic[1] << 8)) in A_MAGICS
+
+def find_aouts(paths):
+    # Files given directly, plus every a.out under any directories, in a stable order
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            found.extend(p for p in (os.path.join(root, name) for name in sorted(files)) if is_aout(p))
+    return found
+
+class SignatureIndex:
+    def __init__(self, path=None):
+        self.path = path or default_index_path()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def has_binary(self, sha1):
+        return self.db.execute('SELECT 1 FROM binaries WHERE sha1 = ?', (sha1,)).fetchone() is not None
+
+    def add_binary(self, sha1, path, signatures):
+        # A binary's signatures are only counted once, however many copies of it get indexed
+        with self.db:
+            if self.has_binary(sha1):
+                return False
+            self.db.execute('INSERT INTO binaries VALUES (?, ?)', (sha1, path))
+            self.db.executemany(
+                'INSERT INTO signatures VALUES (?, ?, ?, 1) '
+                'ON CONFLICT (hash, name) DO UPDATE SET binaries = binaries + 1',
+                set(signatures))
+        return True
+
+    def names(self, hashes):
+        # hash -> name, for the hashes only ever seen under one name
+        found = defaultdict(set)
+        hashes = list(set(hashes))
+        # Stay under SQLite's bound parameter limit
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            query = 'SELECT hash, name FROM signatures WHERE hash IN (%s)' % ','.join('?' * len(chunk))
+            for digest, name in self.db.execute(query, chunk):
+                found[digest].add(name)
+        return dict((digest, names.pop()) for digest, names in found.items() if len(names) == 1)
+
+    def stats(self):
+        binaries, = self.db.execute('SELECT COUNT(*) FROM binaries').fetchone()
+        signatures, = self.db.execute('SELECT COUNT(*) FROM signatures').fetchone()
+        return {'binaries': binaries, 'signatures': signatures}
+
+def index_binaries(index, paths, jobs=None, progress=None):
+    # Signatures are computed in a process pool and written from this process, since SQLite
+    # wants a single writer. progress, if given, is called with (path, error or None) per file.
+    # Returns the number of binaries added
+    added = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=pdpopcodes.set_cpu_model, initargs=(pdpopcodes.cpu_model,)) as pool:
+        for path, sha1, result in pool.map(index_file, find_aouts(paths), chunksize=4):
+            if sha1 is None:
+                if progress is not None:
+                    progress(path, result)
+                continue
+            if index.add_binary(sha1, path, result):
+                added += 1
+            if progress is not None:
+                progress(path, None)
+    return added
+
+def lookup_names(index, text, base, starts, named=()):
+    # addr -> name for the functions at starts that match the index. Addresses in named already
+    # have a name, and a name that matches more than one function isn't used
+    signatures = {}
+    for addr in starts:
+        if addr in named:
+            continue
+        digest, count = function_signature(text, base, addr)
+        if count >= MIN_INSTRUCTIONS:
+            signatures[addr] = digest
+    names = index.names(signatures.values())
+    matches = dict((addr, names[digest]) for addr, digest in signatures.items() if digest in names)
+    claimed = defaultdict(int)
+    for name in matches.values():
+        claimed[name] += 1
+    return dict((addr, name) for addr, name in matches.items() if claimed[name] == 1)
+
+def lookup_file(index, path):
+    # addr -> name for the unnamed functions discovery finds in an a.out
+    with open(path, 'rb') as f:
+        data = f.read()
+    header = AOutHeader(data)
+    named = named_functions(header, read_symbols(data, header))
+    text, starts = discovered_functions(data, header, named)
+    return lookup_names(index, text, 0, starts, named)
@@ -1,18 +1,114 @@
 from binaryninja import *
-from .typebuilder import *
-from struct import unpack
-import zlib
+from .pdpaout import *
+from .pdpcache import AnalysisCache, AnalysisEntry, cache_key, content_hash
+from .pdpdiscover import *
+from .pdpemu import Emulator
+from . import pdpopcodes
+from .pdpmetrics import metrics
+from .pdpfs import *
+from .pdpsigs import SignatureIndex, lookup_names
+from bisect import bisect_left
+from struct import unpack, unpack_from
+import mmap
+import os
+
+def map_file(data):
+    # Maps the file behind a raw parent view read-only, so reads are slices of the page cache
+    # rather than copies. Falls back to a single read when there's no plain file behind it. Only
+    # for raw images: the file on disk isn't necessarily what the parent view holds (it may have
+    # been edited since, or patched in a .bndb), so a.out views read through the parent view
+    path = data.file.original_filename
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == len(data):
+                return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, TypeError, ValueError):
+        pass
+    return memoryview(data.read(0, len(data)))
+
+def not_flareon_xt(name):
+    # Hack for flare-on
+    return not name.endswith('_xt')
+
+class OverlayNotification(BinaryDataNotification):
+    # Loads an overlay the first time a function gets created in it, whether by analysis or by hand
+    def __init__(self, view):
+        BinaryDataNotification.__init__(self)
+        self.view = view
+        self.pending = set()
+
+    def function_added(self, view, func):
+        ovly = self.view.overlay_at(func.start)
+        if ovly and ovly not in self.view.loaded_overlays and ovly not in self.pending:
+            # Can't define symbols from inside an analysis callback, so wait for the current
+            # pass to finish
+            self.pending.add(ovly)
+            event = view.add_analysis_completion_event(lambda: self.view.load_overlay(ovly))
+            self.view.overlay_events.append(event)
+
+def task_cancelled(task, progress):
+    # Reports progress on a load task and says whether it's been cancelled. Without a task the
+    # load is running inline and can't be
+    if task is None:
+        return False
+    task.progress = 'PDP-11: %s' % progress
+    return task.cancelled
+
+def nearest_first(items, focus, batch_size):
+    # Batches of (addr, ...) items, each taken from around whatever address focus() returns at
+    # the time, so wherever the user is looking gets done first even if they move mid-load
+    items = sorted(items)
+    addrs = [item[0] for item in items]
+    while items:
+        i = bisect_left(addrs, focus())
+        lo = max(0, min(i - batch_size // 2, len(items) - batch_size))
+        yield items[lo:lo + batch_size]
+        del items[lo:lo + batch_size]
+        del addrs[lo:lo + batch_size]
+
+class LoadTask(BackgroundTaskThread):
+    # One of a view's load stages, run off the UI thread so the view can open straight away.
+    # stage gets the task, to report progress and notice cancellation through
+    def __init__(self, title, stage):
+        BackgroundTaskThread.__init__(self, title, True)
+        self.stage = stage
+
+    def run(self):
+        self.stage(self)
 
 class PDP11View(BinaryView):
     name = 'PDP-11'
     long_name = 'PDP-11 Executable'
 
+    # Predicate on symbol names, text symbols it rejects don't get a function created
+    function_filter = staticmethod(not_flareon_xt)
+    # Names function_filter in the analysis cache key. Give a different filter its own id, or
+    # discovery cached under the old filter gets replayed
+    function_filter_id = 'not_flareon_xt'
+    # How data symbols get typed: 'define' types them while loading symbols, 'defer' types them
+    # once the initial analysis has finished so first paint happens sooner, 'skip' only names them
+    data_symbols = 'define'
+    # Load symbols, functions and data types in cancellable background tasks after init has
+    # mapped the segments. Off does it all before init returns
+    background_load = True
+    # Symbols, functions and data types are defined this many at a time, nearest the current
+    # offset first
+    load_batch_size = 256
+    # Replay the symbol table and discovery from the on-disk analysis cache (see pdpcache) when
+    # the same file has been opened before
+    analysis_cache = True
+    # Where cache entries are kept, None for $PDP11_CACHE_DIR or ~/.cache/pdp11
+    cache_dir = None
+    # Signature index (see pdpsigs) to name the functions of binaries without function symbols
+    # from, once discovery has found them. None to leave them unnamed, bv.apply_signatures can
+    # still be called by hand
+    signature_index = None
+
     @classmethod
     def is_valid_for_data(self, data):
-        # There are bunch of possible magic numbers, but I'm just doing this for Flare-On, so only checking normal one
         # See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/sys/h/exec.h#L39-L44
         magic = data.read(0, 2)
-        return magic == b'\x07\x01'
+        return len(magic) == 2 and unpack('<H', magic)[0] in A_MAGICS
     
     def __init__(self, data):
         BinaryView.__init__(self, parent_view=data, file_metadata=data.file)
@@ -20,6 +116,13 @@ class PDP11View(BinaryView):
         self.data = data
         self.arch = Architecture['pdp11']
         self.platform = Platform['2.11bsd']
+        self.load_task = None
+        self.stage_tasks = []
+        # Filled in by define_symbols, on the load task when loads are in the background
+        self.overlay_functions = {}
+        self.loaded_overlays = set()
+        self.named_functions = set()
+        self.function_starts = []
     
     def perform_is_executable(self):
         return True
@@ -28,100 +131,376 @@ class PDP11View(BinaryView):
         return 2
     
     def perform_get_entry_point(self):
-        return 0x20
+        return self.a_entry
     
     def init(self):
-        # See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/sys/h/exec.h#L14C1-L23C3
-        self.a_text, = unpack('<H', self.data.read(2, 2))
-        self.a_data, = unpack('<H', self.data.read(4, 2))
-        self.a_bss, = unpack('<H', self.data.read(6, 2))
-        self.a_syms, = unpack('<H', self.data.read(8, 2))
-        self.a_entry, = unpack('<H', self.data.read(10, 2))
-        self.a_flag, = unpack('<H', self.data.read(14, 2))
-
-        log_info('a_text=%x' % self.a_text)
-        log_info('a_data=%x' % self.a_data)
-        log_info('a_bss=%x' % self.a_bss)
-        log_info('a_syms=%x' % self.a_syms)
-        log_info('a_entry=%x' % self.a_entry)
-        log_info('a_flag=%x' % self.a_flag)
-        log_info('txtoff=%x' % self.txtoff())
-        log_info('symoff=%x' % self.symoff())
-        log_info('stroff=%x' % self.stroff())
-        
-        strsiz, = unpack('<H', self.data.read(self.stroff() + 2, 2))
-
-        hdrsiz = 0x10
-
-        self.add_auto_segment(self.txtoff() - hdrsiz, self.a_text, self.txtoff(), self.a_text, SegmentFlag.SegmentContainsCode|SegmentFlag.SegmentReadable|SegmentFlag.SegmentExecutable)
-        self.add_auto_segment(self.dataoff() - hdrsiz, self.a_data, self.dataoff(), self.a_data, SegmentFlag.SegmentContainsData|SegmentFlag.SegmentReadable|SegmentFlag.SegmentWritable)
-        self.add_auto_segment(self.symoff() - hdrsiz, self.a_syms, self.symoff(), self.a_syms, SegmentFlag.SegmentContainsData|SegmentFlag.SegmentReadable)
-        self.add_auto_segment(self.stroff() - hdrsiz, strsiz, self.stroff(), strsiz, SegmentFlag.SegmentContainsData|SegmentFlag.SegmentReadable)
-
-        self.add_auto_section('.text', self.txtoff() - hdrsiz, self.a_text, SectionSemantics.ReadOnlyCodeSectionSemantics)
-        self.add_auto_section('.data', self.dataoff() - hdrsiz, self.a_data, SectionSemantics.ReadWriteDataSectionSemantics)
-        self.add_auto_section('.syms', self.symoff() - hdrsiz, self.a_syms, SectionSemantics.ReadOnlyDataSectionSemantics)
-        self.add_auto_section('.strtab', self.stroff() - hdrsiz, strsiz, SectionSemantics.ReadOnlyDataSectionSemantics)
-
-        nsyms = self.a_syms // 8
-        syms = []
-        br = self.data.reader(self.symoff())
-        for _ in range(nsyms):
-            pad = br.read16()
-            n_strx = br.read16()
-            n_name = self.read_cstr(self.stroff() + n_strx)
-            n_type = br.read8()
-            n_ovly = br.read8()
-            n_value = br.read16()
-            #log_info('n_name=%s, n_type=%i, n_value=%i' % (n_name, n_type, n_value))
-            syms.append((n_name, n_type, n_ovly, n_value))
-        
-        self.define_symbols(syms)
-
+        # Only the header and segments are done here. Symbols, functions and data types follow in
+        # a background task, see load_symbols
+        with metrics.timer('view_init'):
+            self.map_aout()
+        if self.background_load:
+            self.load_task = LoadTask('PDP-11: loading symbols', self.load_symbols)
+            self.load_task.start()
+        else:
+            self.load_symbols()
         return True
 
+    def map_aout(self):
+        # One read of the whole file, headers, symbols and discovery all slice this
+        self.image = memoryview(self.parent_view.read(0, len(self.parent_view)))
+        self.header = AOutHeader(self.image[:AOutHeader.max_size])
+        self.a_text = self.header.a_text
+        self.a_data = self.header.a_data
+        self.a_bss = self.header.a_bss
+        self.a_syms = self.header.a_syms
+        self.a_entry = self.header.a_entry
+        self.a_flag = self.header.a_flag
+
+        log_info('pdp11: a.out magic=%o text=%x data=%x bss=%x syms=%x entry=%x flag=%x' % (
+            self.header.a_magic, self.a_text, self.a_data, self.a_bss, self.a_syms, self.a_entry, self.a_flag))
+
+        self.segments_by_ovly = {}
+        for seg in self.header.segments():
+            if seg.kind == 'text':
+                flags = SegmentFlag.SegmentContainsCode|SegmentFlag.SegmentReadable|SegmentFlag.SegmentExecutable
+                semantics = SectionSemantics.ReadOnlyCodeSectionSemantics
+                self.segments_by_ovly[seg.ovly] = seg
+            else:
+                flags = SegmentFlag.SegmentContainsData|SegmentFlag.SegmentReadable|SegmentFlag.SegmentWritable
+                semantics = SectionSemantics.ReadWriteDataSectionSemantics
+            self.add_auto_segment(seg.vaddr, seg.size, seg.file_offset, seg.file_size, flags)
+            self.add_auto_section(seg.name, seg.vaddr, seg.size, semantics)
+
+        # Before anything gets decoded, decode tables and the address map are shared by every view
+        self.select_cpu_model()
+        self.addresses = AddressMap(self.header)
+        set_address_map(self.addresses)
+
+    def load_symbols(self, task=None):
+        # Reads the symbol table, or replays it from the analysis cache, then defines symbols,
+        # functions and data types. task is the LoadTask running it, None when run inline
+        with metrics.timer('load_symbols'):
+            if task_cancelled(task, 'reading symbols'):
+                return
+            cached = self.read_symbol_table()
+            self.define_symbols(self.symtab, cached, task)
+
+    def read_symbol_table(self):
+        # Sets self.symtab, returning the analysis cache entry it came from or None. The function
+        # filter decides which symbols seed discovery and the CPU model what decodes, so both are
+        # part of the cache key
+        self.cache = None
+        cached = None
+        if self.analysis_cache:
+            self.cache = AnalysisCache(self.cache_dir)
+            self.cache_key = cache_key(content_hash(self.image), self.function_filter_id, pdpopcodes.cpu_model)
+            cached = self.cache.load(self.cache_key)
+            metrics.count('analysis_cache_hit' if cached is not None else 'analysis_cache_miss')
+
+        if cached is not None:
+            log_info('replaying analysis from cache')
+            self.symtab = cached.symtab
+        else:
+            # Symbol and string tables are parsed straight out of the mapped file. Stripped files
+            # end where the symbols would start, with no string table at all
+            symtab = strtab = b''
+            if self.a_syms and self.stroff() + 4 <= len(self.image):
+                strsiz, = unpack_from('<H', self.image, self.stroff() + 2)
+                symtab = self.image[self.symoff():self.symoff() + self.a_syms]
+                strtab = self.image[self.stroff():self.stroff() + strsiz]
+            self.symtab = SymbolTable(symtab, strtab)
+        return cached
+
+    def select_cpu_model(self):
+        model = Settings().get_string('pdp11.cpuModel', self)
+        if model in CPU_MODELS:
+            set_cpu_model(model)
+        else:
+            log_warn('pdp11: unknown CPU model %r, decoding for %s' % (model, pdpopcodes.cpu_model))
+
     def txtoff(self):
-        # See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/include/a.out.h#L46-L48
-        return 0x10 # sizeof(exec)
+        return self.header.txtoff()
 
     def symoff(self):
-        # See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/lib/libc/pdp/gen/nsym.c#L79
-        l = self.txtoff()
-        sum = self.a_text + self.a_data
-        l += sum
-        if (self.a_flag & 1) == 0:
-            l += sum
-        return l
+        return self.header.symoff()
 
     def stroff(self):
-        return self.symoff() + self.a_syms
+        return self.header.stroff()
     
     def dataoff(self):
-        return 0x10 + self.a_text
-    
-    def read_cstr(self, addr):
-        s = ''
-        while True:
-            c = self.data.read(addr, 1)
-            if c[0] == 0:
-                break
-            s += c.decode()
-            addr += 1
-        return s
+        return self.header.dataoff()
     
-    def define_symbols(self, syms):
+    def define_symbols(self, syms, cached=None, task=None):
+        functions = []
+        data_vars = []
+        # Overlay text symbols, keyed by overlay number. They're only defined once something in
+        # the overlay gets looked at, see load_overlay
+        self.overlay_functions = {}
+        self.loaded_overlays = set()
         for sym in syms:
-            n_name, n_type, _, n_value = sym
+            n_name, n_type, n_ovly, n_value = sym
 
             # See: https://github.com/RetroBSD/2.11BSD/blob/master/usr/include/nlist.h#L66-L78
-            # n_ext = n_type & 0x20
-            n_type = n_type & 0x1f
-            if n_type == 0x2: # t/T
-                # Hack for flare-on
-                if n_name.endswith('_xt'):
+            # n_ext = n_type & N_EXT
+            addr = self.header.symbol_address(n_type, n_ovly, n_value)
+            n_type = n_type & N_TYPE
+            if n_type == N_TEXT: # t/T
+                if not self.function_filter(n_name):
                     continue
-                self.add_function(n_value)
-                self.define_auto_symbol(Symbol(SymbolType.FunctionSymbol, n_value, n_name))
-            elif n_type == 0x3: # d/D
-                # Don't know data type, so just assume int16_t, since binja doesn't allow labelling untyped addresses
-                self.define_data_var(n_value, 'int16_t', n_name)
\ No newline at end of file
+                if n_ovly:
+                    self.overlay_functions.setdefault(n_ovly, []).append((addr, n_name))
+                else:
+                    functions.append((addr, n_name))
+            elif n_type == N_DATA: # d/D
+                data_vars.append((addr, n_name))
+        self.named_functions = set(addr for addr, _ in functions)
+        self.function_starts = []
+
+        # Hold analysis while everything goes in, otherwise every definition can trigger its own
+        # analysis update. Analysis gets kicked off once everything is in, or the load is cancelled
+        self.set_analysis_hold(True)
+        try:
+            finished = self.seed_functions(syms, cached, functions, data_vars, task)
+        finally:
+            self.set_analysis_hold(False)
+
+        if finished and self.data_symbols == 'defer':
+            # Keep a reference to the event, it's dropped otherwise
+            self.data_types_event = self.add_analysis_completion_event(lambda: self.run_stage('PDP-11: typing data', lambda task: self.define_data_types(data_vars, task)))
+        if self.overlay_functions:
+            self.overlay_events = []
+            self.overlay_notification = OverlayNotification(self)
+            self.register_notification(self.overlay_notification)
+        self.update_analysis()
+
+    def seed_functions(self, syms, cached, functions, data_vars, task):
+        # The load stages that run under the analysis hold. False if the task was cancelled
+        symbols = [(addr, n_name, SymbolType.FunctionSymbol) for addr, n_name in functions]
+        symbols += [(addr, n_name, SymbolType.DataSymbol) for addr, n_name in data_vars]
+        if not self.in_batches(task, 'defining symbols', symbols, self.define_symbol_batch):
+            return False
+
+        if task_cancelled(task, 'finding functions'):
+            return False
+        if cached is None:
+            with metrics.timer('discover'):
+                starts, jump_tables = self.discover_functions([addr for addr, _ in functions])
+            if self.cache is not None:
+                self.cache.store(self.cache_key, AnalysisEntry(syms, starts, jump_tables))
+        else:
+            starts, jump_tables = cached.functions, cached.jump_tables
+        if not self.in_batches(task, 'adding functions', [(addr,) for addr in starts], self.add_function_batch):
+            return False
+        self.define_jump_tables(jump_tables)
+        self.function_starts = starts
+
+        if self.signature_index is not None and not functions:
+            if task_cancelled(task, 'matching signatures'):
+                return False
+            self.name_from_signatures(self.signature_index)
+        if self.data_symbols == 'define':
+            return self.define_data_types(data_vars, task)
+        return True
+
+    def run_stage(self, title, stage):
+        # Runs stage(task) in a background task, or inline with no task when loads aren't in
+        # the background
+        if not self.background_load:
+            stage(None)
+            return
+        task = LoadTask(title, stage)
+        self.stage_tasks.append(task)
+        task.start()
+
+    def in_batches(self, task, what, items, define):
+        # Calls define on batches of (addr, ...) items, those nearest the current offset first,
+        # reporting progress as it goes. False if the task was cancelled part way
+        done = 0
+        for batch in nearest_first(items, lambda: self.file.offset, self.load_batch_size):
+            if task_cancelled(task, '%s %d/%d' % (what, done, len(items))):
+                log_info('pdp11: %s cancelled after %d of %d' % (what, done, len(items)))
+                return False
+            define(batch)
+            done += len(batch)
+        return True
+
+    def define_symbol_batch(self, batch):
+        self.begin_bulk_modify_symbols()
+        try:
+            for addr, n_name, sym_type in batch:
+                self.define_auto_symbol(Symbol(sym_type, addr, n_name))
+        finally:
+            self.end_bulk_modify_symbols()
+
+    def add_function_batch(self, batch):
+        for addr, in batch:
+            self.add_function(addr)
+
+    def wait_for_load(self):
+        # Blocks until the background load has defined the symbols and functions, which the
+        # methods scripts call rely on. Returns straight away when loads run inline
+        if self.load_task is not None:
+            self.load_task.join()
+
+    def apply_signatures(self, path=None):
+        # Names the unnamed functions in the base text that match the signature index at path,
+        # or the default one. Returns {address: name} for what got named
+        self.wait_for_load()
+        return self.name_from_signatures(path)
+
+    def name_from_signatures(self, path):
+        text = self.image[self.txtoff():self.txtoff() + self.a_text]
+        starts = set(self.function_starts)
+        starts.update(func.start for func in self.functions if func.start < self.a_text)
+        with SignatureIndex(path) as index:
+            names = lookup_names(index, text, 0, sorted(starts), self.named_functions)
+        log_info('pdp11: named %d functions from signatures' % len(names))
+        self.begin_bulk_modify_symbols()
+        try:
+            for addr, name in sorted(names.items()):
+                self.define_auto_symbol(Symbol(SymbolType.FunctionSymbol, addr, name))
+        finally:
+            self.end_bulk_modify_symbols()
+        self.named_functions.update(names)
+        return names
+
+    def emulator(self, argv=('a.out',), stdin=b''):
+        # Emulator loaded with this binary, emu.snapshot(bv) copies its memory back in here
+        return Emulator.from_aout(self.image, argv, stdin)
+
+    def overlay_at(self, addr):
+        for ovly, seg in self.segments_by_ovly.items():
+            if ovly and seg.vaddr <= addr < seg.vaddr + seg.size:
+                return ovly
+        return 0
+
+    def load_overlay(self, ovly):
+        # Define an overlay's symbols and functions, on first use
+        self.wait_for_load()
+        if ovly in self.loaded_overlays:
+            return
+        self.loaded_overlays.add(ovly)
+        functions = self.overlay_functions.get(ovly, [])
+        log_info('loading overlay %d (%d symbols)' % (ovly, len(functions)))
+        self.begin_bulk_modify_symbols()
+        try:
+            for addr, n_name in functions:
+                self.define_auto_symbol(Symbol(SymbolType.FunctionSymbol, addr, n_name))
+        finally:
+            self.end_bulk_modify_symbols()
+        seg = self.segments_by_ovly[ovly]
+        text = self.image[seg.file_offset:seg.file_offset + seg.file_size]
+        data = self.image[self.dataoff():self.dataoff() + self.a_data]
+        starts, jump_tables = discover_code(text, seg.vaddr, [addr for addr, _ in functions], data, self.header.data_vaddr(), self.addresses)
+        for addr in starts:
+            self.add_function(addr)
+        self.define_jump_tables(jump_tables)
+        self.update_analysis()
+
+    def discover_functions(self, starts):
+        # Recursive descent pre-pass from the entry point and symbols, so stripped binaries get
+        # their functions too and analysis starts out with the full set. Only covers the base
+        # text, overlays get theirs when loaded
+        text = self.image[self.txtoff():self.txtoff() + self.a_text]
+        data = self.image[self.dataoff():self.dataoff() + self.a_data]
+        return discover_code(text, 0, [self.a_entry] + starts, data, self.header.data_vaddr(), self.addresses)
+
+    def define_jump_tables(self, jump_tables):
+        for addr, (func_addr, targets) in jump_tables.items():
+            func = self.get_function_at(func_addr)
+            if func is not None:
+                func.set_auto_indirect_branches(addr, [(self.arch, target) for target in targets])
+
+    def define_data_types(self, data_vars, task=None):
+        return self.in_batches(task, 'typing data', data_vars, self.define_data_batch)
+
+    def define_data_batch(self, batch):
+        # Don't know data type, so just assume int16_t, since binja doesn't allow labelling untyped addresses
+        for n_value, n_name in batch:
+            self.define_data_var(n_value, 'int16_t', n_name)
+
+class PDP11ImageView(BinaryView):
+    name = 'PDP-11 Image'
+    long_name = 'PDP-11 Core/Disk Image'
+
+    # Raw images have no header to recognise them by, so they only open here when picked in Open
+    # with Options, or by file name when the pdp11.matchImageNames setting is on
+    image_extensions = ('.core', '.dmp', '.dsk', '.img', '.rk05', '.rl02')
+    # Address the start of the image gets mapped at
+    load_base = 0
+    # Byte offset of the file system in a disk image, for images holding a partition table or
+    # boot blocks in front of it
+    fs_offset = 0
+
+    @classmethod
+    def is_force_loadable(self):
+        return True
+
+    @classmethod
+    def is_valid_for_data(self, data):
+        if not Settings().get_bool('pdp11.matchImageNames'):
+            return False
+        path = data.file.original_filename or ''
+        return os.path.basename(path) == 'core' or path.lower().endswith(self.image_extensions)
+
+    def __init__(self, data):
+        BinaryView.__init__(self, parent_view=data, file_metadata=data.file)
+
+        self.data = data
+        self.arch = Architecture['pdp11']
+        self.platform = Platform['2.11bsd']
+        self.fs = None
+
+    def perform_is_executable(self):
+        return True
+
+    def perform_get_address_size(self):
+        return 2
+
+    def perform_get_entry_point(self):
+        return self.load_base
+
+    def init(self):
+        # The whole image is one segment backed by the file, nothing in it is read here. File
+        # systems get parsed on demand, see filesystem
+        self.image = map_file(self.data)
+        set_address_map(AddressMap())
+        length = len(self.image)
+        log_info('image size=%x load_base=%x' % (length, self.load_base))
+        self.add_auto_segment(self.load_base, length, 0, length, SegmentFlag.SegmentContainsCode|SegmentFlag.SegmentContainsData|SegmentFlag.SegmentReadable|SegmentFlag.SegmentWritable|SegmentFlag.SegmentExecutable)
+        self.add_auto_section('.image', self.load_base, length, SectionSemantics.DefaultSectionSemantics)
+        return True
+
+    def filesystem(self):
+        # V7 or 2.11BSD file system at fs_offset, or None
+        if self.fs is None:
+            self.fs = FileSystem.detect(self.image, self.fs_offset)
+            if self.fs is not None:
+                log_info('%s file system, %d inodes' % (self.fs.layout.name, self.fs.ninodes()))
+        return self.fs
+
+    def file_extents(self, path):
+        # Where a file's contents are in the view, as (address, length) runs
+        fs = self.filesystem()
+        if fs is None:
+            raise ValueError('no file system in image')
+        return [(self.load_base + start, length) for start, length in fs.extents(fs.lookup(path)) if start is not None]
+
+    def read_file(self, path):
+        fs = self.filesystem()
+        if fs is None:
+            raise ValueError('no file system in image')
+        return fs.read(fs.lookup(path))
+
+    def define_file(self, path):
+        # Labels a file's blocks with its path so it can be found in the image
+        extents = self.file_extents(path)
+        for i, (addr, _) in enumerate(extents):
+            name = path if i == 0 else '%s+%x' % (path, i)
+            self.define_auto_symbol(Symbol(SymbolType.DataSymbol, addr, name))
+        return extents
+
+    def instructions(self, start, end):
+        # Decodes straight out of the mapped image, yields (address, Instruction or None)
+        offset = start - self.load_base
+        return pdp11_disasm_iter(self.image[offset:end - self.load_base], start)
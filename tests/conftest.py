@@ -0,0 +1,20 @@
+import os
+import sys
+
+# The plugin is imported as the 'pdp11' package against the stand-in binaryninja module, the same
+# way the benchmarks run it, so the tests run headless
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'bench'))
+from plugin import load_plugin
+
+load_plugin()
+
+import pytest
+
+@pytest.fixture(autouse=True)
+def flat_address_map():
+    # Views set the shared address map, so every test starts out with the flat one
+    from pdp11.pdpaout import AddressMap
+    from pdp11.pdpdisasm import set_address_map
+    set_address_map(AddressMap())
+    yield
+    set_address_map(AddressMap())
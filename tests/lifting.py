@@ -0,0 +1,130 @@
+from struct import pack
+
+from pdp11.pdplift import pdp11_lift
+
+# Lifts instructions into plain tuples and runs the result, so lifter tests can check what the IL
+# computes rather than how it's spelled
+
+class RecordingIL:
+    # Builds every IL expression as a (name, operands...) tuple and records what gets appended
+    def __init__(self):
+        self.out = []
+
+    def append(self, expr):
+        self.out.append(expr)
+
+    def get_label_for_address(self, arch, addr):
+        return None
+
+    def mark_label(self, label):
+        self.out.append(('label', label))
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: (name,) + args
+
+def lift(*words, addr=0o1000):
+    il = RecordingIL()
+    length = pdp11_lift(None, pack('<%dH' % len(words), *words) + bytes(6), addr, il)
+    return length, il.out
+
+def mask(size):
+    return (1 << (size * 8)) - 1 if size else 1
+
+def signed(value, size):
+    sign = 1 << (size * 8 - 1)
+    return (value & (sign - 1)) - (value & sign)
+
+def size_of(expr):
+    name = expr[0]
+    if name == 'reg_split':
+        return expr[1] * 2
+    if name == 'flag' or name.startswith('compare'):
+        return 0
+    return expr[1]
+
+class Machine:
+    # Registers, flags and word-addressed memory, all as plain ints
+    def __init__(self, regs=None, flags=None, memory=None):
+        self.regs = dict(regs or {})
+        self.flags = dict(flags or {})
+        self.memory = dict(memory or {})
+
+    def value(self, expr):
+        name, args = expr[0], expr[1:]
+        if name == 'flag':
+            return self.flags[args[0]]
+        size = args[0]
+        if name in ('const', 'const_pointer'):
+            return args[1] & mask(size)
+        if name == 'reg':
+            return self.regs.get(args[1], 0) & mask(size)
+        if name == 'reg_split':
+            return (self.regs.get(args[1], 0) << (size * 8)) | self.regs.get(args[2], 0)
+        if name == 'load':
+            return self.memory.get(self.value(args[1]), 0) & mask(size)
+        if name in ('low_part', 'zero_extend'):
+            return self.value(args[1]) & mask(size)
+        if name == 'sign_extend':
+            return signed(self.value(args[1]), size_of(args[1])) & mask(size)
+        if name == 'bool_to_int':
+            return self.value(args[1])
+        if name == 'not_expr':
+            return ~self.value(args[1]) & mask(size)
+        if name == 'neg_expr':
+            return -self.value(args[1]) & mask(size)
+        a = self.value(args[1])
+        b = self.value(args[2])
+        if name == 'compare_equal':
+            return int(a == b)
+        if name == 'compare_not_equal':
+            return int(a != b)
+        if name == 'compare_signed_less_than':
+            return int(signed(a, size) < signed(b, size))
+        if name == 'rotate_right_carry':
+            return ((a >> 1) | (self.value(args[3]) << (size * 8 - 1))) & mask(size)
+        if name == 'rotate_left_carry':
+            return ((a << 1) | self.value(args[3])) & mask(size)
+        if name in ('div_signed', 'mod_signed'):
+            quotient = abs(signed(a, size)) // abs(signed(b, size))
+            if (signed(a, size) < 0) != (signed(b, size) < 0):
+                quotient = -quotient
+            if name == 'div_signed':
+                return quotient & mask(size)
+            return (signed(a, size) - quotient * signed(b, size)) & mask(size)
+        ops = {
+            'add': lambda: a + b,
+            'sub': lambda: a - b,
+            'mult': lambda: a * b,
+            'and_expr': lambda: a & b,
+            'or_expr': lambda: a | b,
+            'xor_expr': lambda: a ^ b,
+            'shift_left': lambda: a << b,
+            'arith_shift_right': lambda: signed(a, size) >> b,
+        }
+        return ops[name]() & mask(size)
+
+    def run(self, out):
+        # Runs lifted statements, returning the first one that leaves the instruction (jump, call,
+        # ...) or None if it falls through
+        labels = dict((stmt[1], i) for i, stmt in enumerate(out) if stmt[0] == 'label')
+        i = 0
+        while i < len(out):
+            name, args = out[i][0], out[i][1:]
+            i += 1
+            if name == 'set_reg':
+                self.regs[args[1]] = self.value(args[2]) & mask(args[0])
+            elif name == 'set_reg_split':
+                value = self.value(args[3])
+                self.regs[args[1]] = value >> (args[0] * 8)
+                self.regs[args[2]] = value & mask(args[0])
+            elif name == 'set_flag':
+                self.flags[args[0]] = self.value(args[1])
+            elif name == 'store':
+                self.memory[self.value(args[1])] = self.value(args[2]) & mask(args[0])
+            elif name == 'if_expr':
+                i = labels[args[1] if self.value(args[0]) else args[2]]
+            elif name == 'goto':
+                i = labels[args[0]]
+            elif name not in ('label', 'nop'):
+                return out[i - 1]
+        return None
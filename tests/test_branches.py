@@ -0,0 +1,30 @@
+from struct import pack
+
+from pdp11.pdpdisasm import pdp11_branches, pdp11_decode
+from pdp11.pdpdiscover import discover_code
+
+def words(*ws):
+    return pack('<%dH' % len(ws), *ws)
+
+def branches(*ws):
+    return pdp11_branches(pdp11_decode(words(*ws, 0, 0), 0), 0)
+
+def test_jsr_absolute_calls_the_immediate():
+    # jsr pc,@#10
+    assert branches(0o004737, 0o10) == [('CallDestination', 0o10)]
+
+def test_jsr_immediate_calls_the_immediate_word():
+    # jsr pc,(pc)+ calls the word after the instruction
+    assert branches(0o004727, 0o10) == [('CallDestination', 2)]
+
+def test_mov_into_pc_returns():
+    # mov (sp)+,pc
+    assert branches(0o012607) == [('FunctionReturn', None)]
+
+def test_rti_returns():
+    assert branches(0o000002) == [('FunctionReturn', None)]
+
+def test_mov_store_through_pc_falls_through():
+    # mov r0,100(pc); jsr pc,f; rts pc; f: clr r0; rts pc
+    text = words(0o010067, 0o100, 0o004767, 2, 0o000207, 0o005000, 0o000207)
+    assert discover_code(text, 0, [0]) == ([0, 10], {})
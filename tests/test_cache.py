@@ -0,0 +1,19 @@
+from pdp11.pdpaout import SymbolTable
+from pdp11.pdpcache import AnalysisCache, AnalysisEntry, cache_key, decoder_fingerprint
+
+def test_cache_key_is_a_safe_file_name():
+    assert cache_key('ab12', '<lambda>', '11/40') == 'ab12-_lambda_-11_40'
+
+def test_entry_round_trip(tmp_path):
+    cache = AnalysisCache(str(tmp_path))
+    entry = AnalysisEntry(SymbolTable(b'', b''), [0, 6, 0x20], {8: (0, [14, 16, 18])})
+    assert cache.store('ab12-filter-all', entry)
+    loaded = cache.load('ab12-filter-all')
+    assert (loaded.functions, loaded.jump_tables, list(loaded.symtab)) == (entry.functions, entry.jump_tables, [])
+
+def test_fingerprint_covers_flow_and_option():
+    opcodes = [('RTI', 0o000002, 0o177777, '', 'return', 'base')]
+    fingerprint = decoder_fingerprint(opcodes, 'all', ('base',))
+    assert decoder_fingerprint([('RTI', 0o000002, 0o177777, '', None, 'base')], 'all', ('base',)) != fingerprint
+    assert decoder_fingerprint([('RTI', 0o000002, 0o177777, '', 'return', 'eis')], 'all', ('base',)) != fingerprint
+    assert decoder_fingerprint(opcodes, '11/40', ('base',)) != fingerprint
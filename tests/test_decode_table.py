@@ -0,0 +1,28 @@
+import pytest
+
+from pdp11 import pdpopcodes
+from pdp11.pdpopcodes import CPU_MODELS, DEFAULT_CPU_MODEL, model_op_ids, pdp11_op_table, pdp11_ops, set_cpu_model
+
+def linear_scan(word, enabled):
+    # The decoder before the dispatch table: the first entry in pdp11_ops whose opcode bits match
+    for op_id, (mnem, bits, group) in enumerate(pdp11_ops):
+        if op_id in enabled and word >> group.shift == bits:
+            return op_id, mnem, group
+    return None
+
+@pytest.fixture
+def model():
+    yield set_cpu_model
+    set_cpu_model(DEFAULT_CPU_MODEL)
+
+@pytest.mark.parametrize('name', list(CPU_MODELS))
+def test_table_matches_linear_scan(model, name):
+    model(name)
+    enabled = model_op_ids(name)
+    for word in range(0x10000):
+        assert pdp11_op_table[word] == linear_scan(word, enabled), '%06o' % word
+
+def test_table_entries_match_their_masks():
+    for op_id, (mnem, opcode, mask, _, _, _) in enumerate(pdpopcodes.pdp11_opcodes):
+        entry = pdp11_op_table[opcode]
+        assert entry is not None and entry[0] == op_id, mnem
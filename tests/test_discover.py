@@ -0,0 +1,22 @@
+from struct import pack
+
+from pdp11.pdpaout import AOutHeader, AddressMap
+from pdp11.pdpdiscover import discover_code
+
+def words(*ws):
+    return pack('<%dH' % len(ws), *ws)
+
+# cmp r0,#2; bhi 14; asl r0; jmp *0(r0); halt; 14: rts pc; 16: rts pc; 18: rts pc
+TEXT = words(0o020027, 2, 0o101003, 0o006300, 0o000170, 0, 0o000000, 0o000207, 0o000207, 0o000207)
+TABLE = words(14, 16, 18)
+SPLIT = AddressMap(AOutHeader(words(0o411, len(TEXT), len(TABLE), 0, 0, 0, 0, 1)))
+
+def test_split_jump_table_reads_data_space():
+    # With split I&D the table at 0 is in D space, mapped at 0x10000
+    _, tables = discover_code(TEXT, 0, [0], TABLE, 0x10000, SPLIT)
+    assert tables == {8: (0, [14, 16, 18])}
+
+def test_shared_jump_table_reads_text():
+    # Without split I&D address 0 is the text, which isn't a table of code addresses here
+    _, tables = discover_code(TEXT, 0, [0], TABLE, 0x10000)
+    assert tables[8][1] != [14, 16, 18]
@@ -0,0 +1,42 @@
+from struct import pack
+
+from pdp11.pdpemu import Emulator
+
+def run(words, regs=(), c=0, max_instructions=100):
+    emu = Emulator(False)
+    emu.imem[0:2 * len(words)] = pack('<%dH' % len(words), *words)
+    for i, value in enumerate(regs):
+        emu.r[i] = value
+    emu.c = c
+    count = emu.run(max_instructions=max_instructions)
+    return emu, count
+
+def test_sbc_borrows_through_zero():
+    emu, _ = run([0o005600], regs=[0], c=1)
+    assert (emu.r[0], bool(emu.c)) == (0xffff, True)
+
+def test_sbc_without_carry():
+    emu, _ = run([0o005600], regs=[5], c=0)
+    assert (emu.r[0], bool(emu.c)) == (5, False)
+
+def test_sbc_double_word_subtract():
+    # r0:r1 = 1:5; sub #1,r1; sbc r0
+    emu, _ = run([0o162701, 1, 0o005600], regs=[1, 5], max_instructions=2)
+    assert (emu.r[0], emu.r[1], bool(emu.c)) == (1, 4, False)
+
+def test_write_into_running_block():
+    # inc r0; mov #240,@#10 (the inc below becomes a nop); inc r0; inc r0; halt
+    emu, count = run([0o005200, 0o012737, 0o000240, 0o000010, 0o005200, 0o005200, 0o000000], regs=[3])
+    assert emu.r[0] == 5
+    assert count == 5
+    assert emu.halted
+
+def test_pc_source_before_an_immediate_destination():
+    # mov pc,@#100; halt stores the address of the mov's second word
+    emu, _ = run([0o010737, 0o100, 0o000000])
+    assert emu.read_word(0o100) == 2
+
+def test_pc_relative_source_before_an_immediate_destination():
+    # mov (pc),@#100 reads the word after the mov instruction word, its own destination address
+    emu, _ = run([0o011737, 0o100, 0o000000])
+    assert emu.read_word(0o100) == 0o100
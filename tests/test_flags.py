@@ -0,0 +1,102 @@
+from lifting import Machine, lift
+from pdp11.pdparch import PDP11
+from pdp11.pdplift import FLAG_WRITES
+
+def flags_written(mnem):
+    return PDP11.flags_written_by_flag_write_type[FLAG_WRITES[mnem]]
+
+def test_inc_dec_leave_carry_and_compute_overflow():
+    for mnem in ['INC', 'INCB', 'DEC', 'DECB']:
+        assert flags_written(mnem) == ['n', 'z', 'v']
+        assert FLAG_WRITES[mnem] not in ['nzv', 'zv']
+
+def test_overflow_cleared_for_moves_and_logical_ops():
+    class IL:
+        def const(self, size, value):
+            return ('const', size, value)
+    for mnem in ['MOV', 'MOVB', 'BIT', 'BIC', 'BIS', 'XOR', 'COM', 'SXT', 'MTPI', 'MTPD']:
+        write_type = FLAG_WRITES[mnem]
+        assert 'c' not in PDP11.flags_written_by_flag_write_type[write_type]
+        assert PDP11.get_flag_write_low_level_il(None, None, 0, write_type, 'v', [], IL()) == ('const', 0, 0)
+
+SAMPLES = sorted(set(range(0, 0x10000, 97)) | {0, 1, 0x7f, 0x80, 0xff, 0x7fff, 0x8000, 0x8001, 0xffff})
+
+def shifted(kind, d, c, bits):
+    # Reference result and flags for ASR/ASL/ROR/ROL, from the handbook
+    top = 1 << (bits - 1)
+    all_bits = (1 << bits) - 1
+    if kind == 'asr':
+        t, c = (d >> 1) | (d & top), d & 1
+    elif kind == 'asl':
+        t, c = (d << 1) & all_bits, int(d & top != 0)
+    elif kind == 'ror':
+        t, c = (d >> 1) | (top if c else 0), d & 1
+    else:
+        t, c = ((d << 1) | c) & all_bits, int(d & top != 0)
+    n = int(t & top != 0)
+    return t, {'n': n, 'z': int(t == 0), 'v': n ^ c, 'c': c}
+
+def run(words, regs, flags=None):
+    _, out = lift(*words)
+    machine = Machine(regs, flags)
+    assert machine.run(out) is None
+    return machine
+
+def signed16(value):
+    return value - 0x10000 if value & 0x8000 else value
+
+def test_shifts_and_rotates():
+    for kind, word in [('ror', 0o006000), ('rol', 0o006100), ('asr', 0o006200), ('asl', 0o006300)]:
+        for byte in (False, True):
+            bits = 8 if byte else 16
+            for d in SAMPLES:
+                for c in (0, 1):
+                    machine = run([word | (0o100000 if byte else 0)], {'r0': d}, {'c': c})
+                    t, flags = shifted(kind, d & ((1 << bits) - 1), c, bits)
+                    if byte:
+                        t |= d & 0xff00
+                    assert (machine.regs['r0'], machine.flags) == (t, flags), (kind, byte, d, c)
+
+def test_mul():
+    for a, b in [(3, 4), (-3, 4), (0, 5), (0x7fff, 1), (0x100, 0x80), (-0x8000, 1), (-0x8000, -1), (0x7fff, 0x7fff)]:
+        product = a * b
+        # mul r1,r0: r0:r1 gets the product
+        machine = run([0o070001], {'r0': a & 0xffff, 'r1': b & 0xffff})
+        assert machine.regs['r0'] == (product >> 16) & 0xffff and machine.regs['r1'] == product & 0xffff
+        assert machine.flags == {'n': int(product < 0), 'z': int(product == 0), 'v': 0,
+                                 'c': int(not -0x8000 <= product < 0x8000)}, (a, b)
+
+def test_div():
+    # div r2,r0: r0:r1 / r2
+    for dividend, divisor in [(7, 2), (-7, 2), (7, -2), (0, 3), (0x7fff * 3, 3)]:
+        machine = run([0o071002], {'r0': (dividend >> 16) & 0xffff, 'r1': dividend & 0xffff, 'r2': divisor & 0xffff})
+        quotient = int(dividend / divisor)
+        assert signed16(machine.regs['r0']) == quotient
+        assert signed16(machine.regs['r1']) == dividend - quotient * divisor
+        assert machine.flags == {'n': int(quotient < 0), 'z': int(quotient == 0), 'v': 0, 'c': 0}
+
+def test_div_by_zero_and_overflow_leave_registers():
+    for divisor, flags in [(0, {'v': 1, 'c': 1}), (1, {'v': 1, 'c': 0})]:
+        regs = {'r0': 1, 'r1': 0, 'r2': divisor}
+        machine = run([0o071002], regs)
+        assert dict((reg, machine.regs[reg]) for reg in regs) == regs and machine.flags == flags
+
+def test_ash_ashc():
+    for count in [0, 1, 3, 15, 16, 17, -1, -3, -15, -16, -32]:
+        for value in [0, 1, 5, 0x1234, 0x4000, 0x7fff, -1, -2, -0x4000, -0x8000]:
+            # ash #count,r0
+            machine = run([0o072027, count & 0o77], {'r0': value & 0xffff})
+            result = value << count if count >= 0 else value >> -count
+            carry = (result >> 16) & 1 if count > 0 else (value >> (-count - 1)) & 1 if count < 0 else 0
+            t = result & 0xffff
+            assert machine.regs['r0'] == t
+            assert machine.flags == {'n': t >> 15, 'z': int(t == 0), 'v': int(not -0x8000 <= result < 0x8000), 'c': carry}, (count, value)
+
+            # ashc #count,r0 on r0:r1
+            wide = value * 0x10000 + 0x8421
+            machine = run([0o073027, count & 0o77], {'r0': (wide >> 16) & 0xffff, 'r1': wide & 0xffff})
+            result = wide << count if count >= 0 else wide >> -count
+            carry = (result >> 32) & 1 if count > 0 else (wide >> (-count - 1)) & 1 if count < 0 else 0
+            t = result & 0xffffffff
+            assert (machine.regs['r0'], machine.regs['r1']) == (t >> 16, t & 0xffff)
+            assert machine.flags == {'n': t >> 31, 'z': int(t == 0), 'v': int(not -0x80000000 <= result < 0x80000000), 'c': carry}, (count, value)
@@ -0,0 +1,14 @@
+from lifting import Machine, lift
+
+def test_pc_source_before_an_immediate_destination():
+    # mov pc,@#2000 stores the address of its second word
+    length, out = lift(0o010737, 0o2000)
+    machine = Machine()
+    assert length == 4 and machine.run(out) is None
+    assert machine.memory == {0o2000: 0o1002}
+
+def test_pc_source_after_an_immediate_source():
+    # add #4,pc adds to the address past the immediate, and jumps
+    length, out = lift(0o062707, 4)
+    assert length == 4
+    assert out == [('jump', ('add', 2, ('const_pointer', 2, 0o1004), ('const', 2, 4)))]
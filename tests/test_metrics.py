@@ -0,0 +1,14 @@
+from pdp11.pdpmetrics import Metrics
+
+def test_first_unknown_op_reported_then_rate_limited():
+    metrics = Metrics()
+    reports = []
+    metrics.reporter = reports.append
+    metrics.unknown_op(0o170000)
+    assert len(reports) == 1
+    metrics.unknown_op(0o170000)
+    assert len(reports) == 1
+    metrics.report_interval = 0
+    metrics.unknown_op(0o170011)
+    assert len(reports) == 2
+    assert '2 unknown opcodes since last report (3 total)' in reports[1]
@@ -0,0 +1,104 @@
+from struct import pack
+
+import binaryninja
+
+from lifting import lift
+from pdp11.pdpaout import N_EXT, N_TEXT, NOVL
+from pdp11.pdpdisasm import pdp11_branches, pdp11_decode
+from pdp11.pdpview import LoadTask, PDP11ImageView, PDP11View
+
+def load(image, monkeypatch, filename=None):
+    monkeypatch.setattr(PDP11View, 'analysis_cache', False)
+    monkeypatch.setattr(PDP11View, 'background_load', False)
+    view = PDP11View(binaryninja.BufferView(image, filename))
+    view.init()
+    return view
+
+def test_stripped_aout_loads(monkeypatch):
+    # jsr pc,f; sys exit; f: clr r0; rts pc, with no symbols or string table
+    text = pack('<5H', 0o004767, 2, 0o104401, 0o005000, 0o000207)
+    image = pack('<8H', 0o407, len(text), 0, 0, 0, 0, 0, 1) + text
+    view = load(image, monkeypatch)
+    assert [f.start for f in view.functions] == [0, 6]
+
+def test_images_not_matched_by_name_by_default():
+    data = binaryninja.BufferView(bytes(512), 'disk.img')
+    assert not PDP11ImageView.is_valid_for_data(data)
+    assert PDP11ImageView.is_force_loadable()
+
+def test_images_matched_by_name_when_enabled(monkeypatch):
+    monkeypatch.setitem(binaryninja.Settings.values, 'pdp11.matchImageNames', True)
+    assert PDP11ImageView.is_valid_for_data(binaryninja.BufferView(bytes(512), '/tmp/core'))
+    assert not PDP11ImageView.is_valid_for_data(binaryninja.BufferView(bytes(512), 'notes.txt'))
+
+def test_reopen_replays_from_cache(monkeypatch, tmp_path):
+    text = pack('<5H', 0o004767, 2, 0o104401, 0o005000, 0o000207)
+    image = pack('<8H', 0o407, len(text), 0, 0, 0, 0, 0, 1) + text
+    monkeypatch.setattr(PDP11View, 'cache_dir', str(tmp_path))
+    monkeypatch.setattr(PDP11View, 'background_load', False)
+    first = PDP11View(binaryninja.BufferView(image))
+    first.init()
+    second = PDP11View(binaryninja.BufferView(image))
+    second.init()
+    assert second.read_symbol_table() is not None
+    assert [f.start for f in second.functions] == [f.start for f in first.functions] == [0, 6]
+
+def test_aout_reads_parent_view_not_file(monkeypatch, tmp_path):
+    # The file on disk has the same size but different contents, as after patching in a .bndb
+    text = pack('<5H', 0o004767, 2, 0o104401, 0o005000, 0o000207)
+    image = pack('<8H', 0o407, len(text), 0, 0, 0, 0, 0, 1) + text
+    path = tmp_path / 'a.out'
+    path.write_bytes(pack('<8H', 0o407, len(text), 0, 0, 0, 0, 0, 1) + bytes(len(text)))
+    view = load(image, monkeypatch, str(path))
+    assert bytes(view.image) == image
+    assert [f.start for f in view.functions] == [0, 6]
+
+def test_scripts_wait_for_background_load(monkeypatch, tmp_path):
+    # The load task hasn't run yet when init returns, joining it runs it
+    monkeypatch.setattr(LoadTask, 'start', lambda task: None)
+    monkeypatch.setattr(LoadTask, 'join', lambda task: task.finished or (task.run(), task.finish()))
+    monkeypatch.setattr(PDP11View, 'analysis_cache', False)
+    text = pack('<5H', 0o004767, 2, 0o104401, 0o005000, 0o000207)
+    image = pack('<8H', 0o407, len(text), 0, 0, 0, 0, 0, 1) + text
+    view = PDP11View(binaryninja.BufferView(image))
+    view.init()
+    assert view.overlay_functions == {} and view.function_starts == []
+    assert view.apply_signatures(str(tmp_path / 'sigs.db')) == {}
+    assert view.function_starts == [0, 6]
+
+def aout(magic, text, data=b'', ovlys=(), syms=()):
+    # a.out without relocation, syms as (name, n_type, n_ovly, n_value)
+    header = pack('<8H', magic, len(text), len(data), 0, 12 * len(syms), 0, 0, 1)
+    if ovlys:
+        sizes = [len(ovly) for ovly in ovlys] + [0] * (NOVL - len(ovlys))
+        header += pack('<%dH' % (1 + NOVL), max(sizes), *sizes)
+    symtab = strtab = b''
+    for name, n_type, n_ovly, n_value in syms:
+        symtab += pack('<HHBBH4x', 0, 4 + len(strtab), n_type, n_ovly, n_value)
+        strtab += name.encode() + b'\x00'
+    return header + text + b''.join(ovlys) + data + symtab + pack('<HH', 0, 4 + len(strtab)) + strtab
+
+def test_overlay_calls_resolve_by_bank(monkeypatch):
+    # Base text: jsr pc,f; sys exit; f: rts pc. Overlay 1 is linked at 20000:
+    # ovf: jsr pc,@#f; jsr pc,g; rts pc; nop; g: rts pc
+    text = pack('<4H', 0o004767, 2, 0o104401, 0o000207)
+    ovly = pack('<7H', 0o004737, 6, 0o004767, 4, 0o000207, 0o000240, 0o000207)
+    image = aout(0o430, text, ovlys=[ovly], syms=[('ovf', N_TEXT | N_EXT, 1, 0o20000)])
+    view = load(image, monkeypatch)
+    ovf = 0x20000 + 0o20000
+    view.load_overlay(1)
+    assert [f.start for f in view.functions] == [0, 6, ovf, ovf + 12]
+
+    # Calls into base text leave the bank, calls within the overlay stay in it
+    assert pdp11_branches(pdp11_decode(ovly, ovf), ovf) == [('CallDestination', 6)]
+    assert pdp11_branches(pdp11_decode(ovly[4:], ovf + 4), ovf + 4) == [('CallDestination', ovf + 12)]
+    assert lift(0o004737, 6, addr=ovf)[1] == [('call', ('const_pointer', 2, 6))]
+    assert lift(0o004767, 4, addr=ovf + 4)[1] == [('call', ('const_pointer', 2, ovf + 12))]
+
+def test_split_data_references_go_to_d_space(monkeypatch):
+    # mov @#2,r0; mov 2,r0 (pc relative); rts pc, with data at D space 0
+    text = pack('<5H', 0o013700, 2, 0o016700, 0o177776, 0o000207)
+    view = load(aout(0o411, text, pack('<2H', 1, 2)), monkeypatch)
+    assert [f.start for f in view.functions] == [0]
+    for words in [(0o013700, 2), (0o016700, 0o177776)]:
+        assert lift(*words, addr=0)[1] == [('set_reg', 2, 'r0', ('load', 2, ('const_pointer', 2, 0x10002)))]